@@ -0,0 +1,214 @@
+"""Adaptive concurrency limit and priority-aware load shedding at ingress"""
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Priority classes, most important first
+CRITICAL = 0
+NORMAL = 1
+LOW = 2
+CLASS_NAMES = {CRITICAL: "critical", NORMAL: "normal", LOW: "low"}
+
+# (method or "*", path prefix, priority class, latency feeds the limit).
+# First match wins; other /api routes are NORMAL and measured. Routes that
+# wait on Claude are not measured: their latency says nothing about this
+# worker's load, and the Claude limiter already bounds them.
+ROUTE_RULES: List[Tuple[str, str, int, bool]] = [
+    ("POST", "/api/chat", CRITICAL, False),
+    ("POST", "/api/checkins", CRITICAL, False),
+    ("*", "/api/coach/alerts", CRITICAL, True),
+    ("POST", "/api/auth/", CRITICAL, True),
+    ("GET", "/api/validations", LOW, True),
+    ("GET", "/api/community/presence", LOW, True),
+    ("GET", "/api/messages/unread-count", LOW, True),
+]
+
+# Seconds a shed client is asked to wait, per class
+RETRY_AFTER = {CRITICAL: 1, NORMAL: 2, LOW: 10}
+
+SHED_MESSAGE = "Hay mucha actividad en este momento. Intenta de nuevo en unos segundos."
+
+
+def classify(method: str, path: str) -> Tuple[Optional[int], bool]:
+    """
+    Priority class of a request
+
+    Args:
+        method: HTTP method
+        path: Request path
+
+    Returns:
+        (class, measured); class is None for requests that are never shed
+        (probes, metrics, CORS preflight)
+    """
+    if method == "OPTIONS" or not path.startswith("/api"):
+        return None, False
+    for rule_method, prefix, priority, measured in ROUTE_RULES:
+        if (rule_method == "*" or rule_method == method) and path.startswith(prefix):
+            return priority, measured
+    return NORMAL, True
+
+
+class AdaptiveLimit:
+    """
+    Concurrency limit tuned by AIMD on observed latency
+
+    Every measured request that completes under ``target_latency`` grows
+    the limit by ``1 / limit`` (about +1 per limit's worth of requests),
+    but only while the limit is actually being approached. A request over
+    the target shrinks it by ``backoff``, at most once per
+    ``decrease_interval`` so one slow burst does not collapse it.
+
+    Classes see different shares of the limit: LOW requests are admitted
+    only below ``low_share`` of it, NORMAL up to the limit, and CRITICAL
+    (crisis check-ins, chat, login) up to ``critical_burst`` times it. The
+    headroom above the limit is kept for them, so polling is shed first
+    and chat is shed last.
+    """
+
+    def __init__(
+        self,
+        initial: float = 64,
+        min_limit: float = 8,
+        max_limit: float = 1000,
+        target_latency: float = 0.3,
+        backoff: float = 0.9,
+        decrease_interval: float = 1.0,
+        low_share: float = 0.7,
+        critical_burst: float = 1.5
+    ):
+        """
+        Args:
+            initial: Starting limit
+            min_limit: The limit never goes below this
+            max_limit: The limit never goes above this
+            target_latency: Seconds; slower measured requests shrink the limit
+            backoff: Multiplier applied on a slow request
+            decrease_interval: Minimum seconds between two decreases
+            low_share: Fraction of the limit available to LOW requests
+            critical_burst: Multiple of the limit available to CRITICAL requests
+        """
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.decrease_interval = decrease_interval
+        self.low_share = low_share
+        self.critical_burst = critical_burst
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self.admitted: Dict[int, int] = {c: 0 for c in CLASS_NAMES}
+        self.shed: Dict[int, int] = {c: 0 for c in CLASS_NAMES}
+        self.decreases = 0
+
+    def capacity(self, priority: int) -> float:
+        """Concurrency up to which a class is admitted"""
+        if priority == CRITICAL:
+            return self.limit * self.critical_burst
+        if priority == LOW:
+            return self.limit * self.low_share
+        return self.limit
+
+    def try_acquire(self, priority: int) -> bool:
+        """
+        Admit a request of a class if there is room for it
+
+        Args:
+            priority: CRITICAL, NORMAL or LOW
+
+        Returns:
+            True if admitted (``release`` must follow), False if shed
+        """
+        if self.in_flight >= self.capacity(priority):
+            self.shed[priority] += 1
+            return False
+        self.in_flight += 1
+        self.admitted[priority] += 1
+        return True
+
+    def release(self, latency: Optional[float] = None) -> None:
+        """
+        Finish an admitted request
+
+        Args:
+            latency: Seconds the request took, or None when it should not
+                influence the limit
+        """
+        in_flight = self.in_flight
+        self.in_flight -= 1
+        if latency is None:
+            return
+        if latency > self.target_latency:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.decrease_interval:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+                self.decreases += 1
+        elif in_flight >= self.limit * self.low_share:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def snapshot(self) -> dict:
+        """Current limit, load and per-class counters, for the metrics endpoint"""
+        return {
+            "limit": round(self.limit, 1),
+            "in_flight": self.in_flight,
+            "target_latency_ms": self.target_latency * 1000,
+            "decreases": self.decreases,
+            "admitted": {CLASS_NAMES[c]: n for c, n in self.admitted.items()},
+            "shed": {CLASS_NAMES[c]: n for c, n in self.shed.items()},
+        }
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware admitting requests through an ``AdaptiveLimit``
+
+    Shed requests get an immediate 503 with ``Retry-After`` instead of
+    queueing behind work the worker cannot finish in time. Registered
+    inside CORS so browsers can read the 503.
+    """
+
+    def __init__(self, app, limiter: AdaptiveLimit, enabled: bool = True):
+        """
+        Args:
+            app: Wrapped ASGI application
+            limiter: Shared limit (also read by the metrics endpoint)
+            enabled: When False every request passes through untouched
+        """
+        self.app = app
+        self.limiter = limiter
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        priority, measured = classify(scope["method"], scope["path"])
+        if priority is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not self.limiter.try_acquire(priority):
+            body = json.dumps({"detail": SHED_MESSAGE}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(RETRY_AFTER[priority]).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        started = time.monotonic()
+        failed = True
+        try:
+            await self.app(scope, receive, send)
+            failed = False
+        finally:
+            # A request that raised is not a latency sample
+            self.limiter.release(None if failed or not measured else time.monotonic() - started)
@@ -0,0 +1,73 @@
+"""Background queue for AI generation that does not need to block a request"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, List
+
+logger = logging.getLogger(__name__)
+
+AIJob = Callable[[], Awaitable[None]]
+
+
+class AIJobQueue:
+    """
+    Bounded queue of AI jobs processed by a few worker tasks
+
+    Jobs are zero-argument coroutine functions that generate a response and
+    write it back themselves. The queue is bounded so a burst of synced
+    entries cannot grow memory without limit. When it is full ``submit``
+    returns False and the entry stays marked as pending, to be picked up
+    again on the next startup sweep.
+    """
+
+    def __init__(self, workers: int = 2, maxsize: int = 1000):
+        """
+        Args:
+            workers: Number of concurrent worker tasks
+            maxsize: Maximum number of queued jobs
+        """
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Start the worker tasks (call from the running event loop)"""
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancel the workers; queued jobs stay pending in the database"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, job: AIJob) -> bool:
+        """
+        Queue a job without waiting
+
+        Args:
+            job: Coroutine function to run in the background
+
+        Returns:
+            True if queued, False if the queue is full
+        """
+        try:
+            self._queue.put_nowait(job)
+            return True
+        except asyncio.QueueFull:
+            logger.warning("AI job queue full - job left pending")
+            return False
+
+    @property
+    def depth(self) -> int:
+        """Number of jobs waiting to run"""
+        return self._queue.qsize()
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await job()
+            except Exception as e:
+                logger.error(f"Background AI job failed: {e}")
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,141 @@
+"""Local stand-in for the Anthropic Messages and Message Batches endpoints
+
+Answers the calls made by ClaudeClient and MessageBatchRunner with canned
+text, so the nightly summary batch can be exercised without an API key or
+network access. Batches stay ``in_progress`` for ``--delay`` seconds, and
+``--fail-every`` makes every Nth entry come back as ``errored``.
+
+Run from the backend folder: ``python -m ai.batch_standin --port 8089``, then
+start the server with ``ANTHROPIC_BASE_URL=http://localhost:8089``,
+``ANTHROPIC_API_KEY=standin`` and ``BITACORA_SUMMARY_MODE=batch``.
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+BATCHES = {}
+LOCK = threading.Lock()
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _message(model: str, messages: list) -> dict:
+    """A Messages API response summarizing the last user message"""
+    content = messages[-1]["content"] if messages else ""
+    if isinstance(content, list):
+        content = " ".join(block.get("text", "") for block in content)
+    first_line = content.strip().splitlines()[0] if content.strip() else ""
+    return {
+        "id": f"msg_{uuid.uuid4().hex}",
+        "type": "message",
+        "role": "assistant",
+        "model": model,
+        "content": [{"type": "text", "text": f"[stand-in] {first_line[:120]}"}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": len(content) // 4, "output_tokens": 20},
+    }
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    delay = 5.0
+    fail_every = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: str, content_type: str = "application/json"):
+        data = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _batch_view(self, batch: dict) -> dict:
+        ended = time.time() >= batch["ends_at"]
+        counts = {"processing": 0, "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0}
+        if ended:
+            for result in batch["results"]:
+                counts[result["result"]["type"]] += 1
+        else:
+            counts["processing"] = len(batch["results"])
+        host = self.headers.get("Host", "localhost")
+        return {
+            "id": batch["id"],
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": counts,
+            "created_at": _iso(batch["created_at"]),
+            "expires_at": _iso(batch["created_at"] + 24 * 3600),
+            "ended_at": _iso(batch["ends_at"]) if ended else None,
+            "cancel_initiated_at": None,
+            "archived_at": None,
+            "results_url": f"http://{host}/v1/messages/batches/{batch['id']}/results" if ended else None,
+        }
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+
+        if path == "/v1/messages":
+            self._send(200, json.dumps(_message(body.get("model", ""), body.get("messages", []))))
+        elif path == "/v1/messages/batches":
+            batch_id = f"msgbatch_{uuid.uuid4().hex}"
+            results = []
+            for index, request in enumerate(body.get("requests", []), 1):
+                if self.fail_every and index % self.fail_every == 0:
+                    result = {"type": "errored", "error": {"type": "error", "error": {
+                        "type": "api_error", "message": "stand-in failure"}}}
+                else:
+                    params = request["params"]
+                    result = {"type": "succeeded", "message": _message(params["model"], params["messages"])}
+                results.append({"custom_id": request["custom_id"], "result": result})
+            now = time.time()
+            batch = {"id": batch_id, "created_at": now, "ends_at": now + self.delay, "results": results}
+            with LOCK:
+                BATCHES[batch_id] = batch
+            self._send(200, json.dumps(self._batch_view(batch)))
+        else:
+            self._send(404, json.dumps({"type": "error", "error": {"type": "not_found_error", "message": path}}))
+
+    def do_GET(self):
+        parts = urlparse(self.path).path.strip("/").split("/")
+        batch = None
+        if len(parts) >= 4 and parts[:3] == ["v1", "messages", "batches"]:
+            with LOCK:
+                batch = BATCHES.get(parts[3])
+        if batch is None:
+            self._send(404, json.dumps({"type": "error", "error": {"type": "not_found_error", "message": self.path}}))
+        elif len(parts) == 5 and parts[4] == "results":
+            lines = "\n".join(json.dumps(result) for result in batch["results"])
+            self._send(200, lines + "\n", "application/binary")
+        else:
+            self._send(200, json.dumps(self._batch_view(batch)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--delay", type=float, default=5.0, help="Seconds a batch stays in progress")
+    parser.add_argument("--fail-every", type=int, default=0, help="Make every Nth batch entry error")
+    args = parser.parse_args()
+
+    StandInHandler.delay = args.delay
+    StandInHandler.fail_every = args.fail_every
+    server = ThreadingHTTPServer((args.host, args.port), StandInHandler)
+    print(f"Anthropic stand-in listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Circuit breaker guarding calls to the Claude API"""
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Stop calling a failing dependency for a cool-down period
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    callers should skip the dependency (and use their fallback) until
+    ``reset_timeout`` seconds have passed. The next call is then let through as
+    a probe and the others are still rejected until it reports back: success
+    closes the circuit, failure opens it again. A probe that never reports
+    back is replaced by a new one after another ``reset_timeout``.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Args:
+            failure_threshold: Consecutive failures before opening the circuit
+            reset_timeout: Seconds to wait before probing again
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_started_at = None
+
+    @property
+    def state(self) -> str:
+        """Current circuit state: closed, open or half_open"""
+        if self.opened_at is None:
+            return CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return OPEN
+
+    def allow_request(self) -> bool:
+        """Whether a call should be attempted right now (in half_open, only the probe)"""
+        state = self.state
+        if state != HALF_OPEN:
+            return state == CLOSED
+        now = time.monotonic()
+        if self.probe_started_at is not None and now - self.probe_started_at < self.reset_timeout:
+            return False
+        self.probe_started_at = now
+        return True
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful call"""
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_started_at = None
+
+    def record_failure(self) -> None:
+        """Count a failed call, opening the circuit past the threshold"""
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self.probe_started_at = None
+
+    def snapshot(self) -> dict:
+        """Get the circuit state for health checks and metrics"""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+        }
@@ -1,13 +1,14 @@
 """Claude AI client using direct Anthropic SDK"""
 import os
 import logging
+import time
 from typing import List, Optional
-from anthropic import AsyncAnthropic
 
-logger = logging.getLogger(__name__)
+from ai.circuit_breaker import CircuitBreaker
+from ai.priority import PRIORITY_INTERACTIVE, PriorityLimiter
+from ai.routing import ROUTE_CHAT, ModelRoute, RouteMetrics, load_routes
 
-# Get API key from environment
-ANTHROPIC_API_KEY = os.environ.get('ANTHROPIC_API_KEY', '')
+logger = logging.getLogger(__name__)
 
 
 class ClaudeClient:
@@ -20,20 +21,47 @@ class ClaudeClient:
         Args:
             api_key: Anthropic API key (uses env var if not provided)
         """
-        self.api_key = api_key or ANTHROPIC_API_KEY
-        if not self.api_key or self.api_key == 'your_anthropic_api_key_here':
+        self.api_key = api_key or os.environ.get('ANTHROPIC_API_KEY', '')
+        self.enabled = bool(self.api_key) and self.api_key != 'your_anthropic_api_key_here'
+        if not self.enabled:
             logger.warning("Anthropic API key not configured - AI features will return fallback messages")
-            self.client = None
-        else:
-            self.client = AsyncAnthropic(api_key=self.api_key)
+        self._client = None
+        self.circuit = CircuitBreaker(
+            int(os.environ.get('CLAUDE_CIRCUIT_FAILURE_THRESHOLD', '5')),
+            float(os.environ.get('CLAUDE_CIRCUIT_RESET_SECONDS', '30'))
+        )
+        # Concurrent requests per worker; waiters are served by priority
+        self.limiter = PriorityLimiter(int(os.environ.get('CLAUDE_MAX_CONCURRENCY', '8')))
+        # Call type -> model, max_tokens and latency budget (see ai.routing)
+        self.routes = load_routes()
+        self.route_metrics = RouteMetrics()
+        # Calls arriving with this many requests already waiting use the fast model
+        self.downgrade_queue_depth = int(
+            os.environ.get('CLAUDE_DOWNGRADE_QUEUE_DEPTH', str(self.limiter.limit))
+        )
+        # Every Nth budget-driven downgrade still calls the primary model so
+        # its latency estimate keeps up to date
+        self.probe_every = 20
+        self._budget_downgrades = {}
+    
+    @property
+    def client(self):
+        """Anthropic SDK client, imported and built on first use to keep startup fast"""
+        if self._client is None and self.enabled:
+            from anthropic import AsyncAnthropic
+            self._client = AsyncAnthropic(api_key=self.api_key)
+        return self._client
         
     async def send_message(
         self,
         system_prompt: str,
         user_message: str,
         conversation_history: Optional[List[dict]] = None,
-        model: str = "claude-sonnet-4-20250514",
-        max_tokens: int = 500
+        route: str = ROUTE_CHAT,
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        fallback_message: Optional[str] = None
     ) -> str:
         """
         Send a message to Claude and get response
@@ -42,15 +70,22 @@ class ClaudeClient:
             system_prompt: System prompt defining Claude's behavior
             user_message: User's message
             conversation_history: Previous messages in format [{"role": "user", "content": "..."}, ...]
-            model: Claude model to use
-            max_tokens: Maximum tokens in response
+            route: Call type selecting model, max_tokens and latency budget
+            model: Claude model to use (overrides the route, never downgraded)
+            max_tokens: Maximum tokens in response (overrides the route)
+            priority: Queue position when all request slots are busy (see ai.priority)
+            fallback_message: Returned instead of the generic fallback on failure
             
         Returns:
             Claude's response text
         """
         if not self.client:
             logger.error("Claude client not initialized - API key missing")
-            return self._get_fallback_message()
+            return fallback_message or self._get_fallback_message()
+        
+        if not self.circuit.allow_request():
+            logger.warning("Claude circuit open - returning fallback message")
+            return fallback_message or self._get_fallback_message()
         
         try:
             # Build messages array
@@ -71,24 +106,79 @@ class ClaudeClient:
                 "content": user_message
             })
             
+            model_route = self.routes.get(route) or self.routes[ROUTE_CHAT]
+            queue_depth = self.limiter.waiting
+            started = time.perf_counter()
+            chosen_model = model
+            called = None
+            
             # Call Claude API
-            response = await self.client.messages.create(
-                model=model,
-                max_tokens=max_tokens,
-                system=system_prompt,
-                messages=messages
+            try:
+                async with self.limiter.slot(priority):
+                    if chosen_model is None:
+                        waited_ms = (time.perf_counter() - started) * 1000
+                        chosen_model = self._choose_model(model_route, queue_depth, waited_ms)
+                    called = time.perf_counter()
+                    response = await self.client.messages.create(
+                        model=chosen_model,
+                        max_tokens=max_tokens or model_route.max_tokens,
+                        system=system_prompt,
+                        messages=messages
+                    )
+            except Exception:
+                self.route_metrics.record(
+                    model_route, chosen_model or model_route.model,
+                    (time.perf_counter() - started) * 1000, failed=True
+                )
+                raise
+            
+            finished = time.perf_counter()
+            usage = getattr(response, "usage", None)
+            self.route_metrics.record(
+                model_route,
+                chosen_model,
+                (finished - started) * 1000,
+                (finished - called) * 1000,
+                getattr(usage, "input_tokens", 0) or 0,
+                getattr(usage, "output_tokens", 0) or 0
             )
+            self.circuit.record_success()
             
             # Extract text from response
             if response.content and len(response.content) > 0:
                 return response.content[0].text
             else:
                 logger.error("Empty response from Claude API")
-                return self._get_fallback_message()
+                return fallback_message or self._get_fallback_message()
                 
         except Exception as e:
+            self.circuit.record_failure()
             logger.error(f"Error calling Claude API: {e}")
-            return self._get_fallback_message()
+            return fallback_message or self._get_fallback_message()
+    
+    def _choose_model(self, route: ModelRoute, queue_depth: int, waited_ms: float) -> str:
+        """
+        Pick the route's model, or its faster fallback when the budget is at risk
+        
+        Args:
+            route: Route of the call
+            queue_depth: Requests already waiting when the call arrived
+            waited_ms: Time spent waiting for a request slot
+            
+        Returns:
+            Model name to call
+        """
+        if not route.fallback_model:
+            return route.model
+        if queue_depth >= self.downgrade_queue_depth:
+            return route.fallback_model
+        expected_ms = self.route_metrics.expected_latency_ms(route.name, route.model)
+        if expected_ms is not None and waited_ms + expected_ms > route.latency_budget_ms:
+            count = self._budget_downgrades.get(route.name, 0) + 1
+            self._budget_downgrades[route.name] = count
+            if count % self.probe_every:
+                return route.fallback_model
+        return route.model
     
     def _get_fallback_message(self) -> str:
         """Return a fallback message when AI is unavailable"""
@@ -0,0 +1,115 @@
+"""Submit Claude requests through the Message Batches API"""
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+from ai.routing import ROUTE_CHAT
+
+logger = logging.getLogger(__name__)
+
+
+class MessageBatchRunner:
+    """
+    Send many requests as one Message Batch and collect the results
+
+    Batches are processed asynchronously by Anthropic at a reduced price and
+    do not use the worker's real-time request slots. Point
+    ``ANTHROPIC_BASE_URL`` at ``python -m ai.batch_standin`` to exercise the
+    whole flow locally.
+    """
+
+    def __init__(self, claude_client, poll_interval: float = 60.0, max_wait: float = 24 * 3600):
+        """
+        Args:
+            claude_client: ClaudeClient providing the SDK client and routing table
+            poll_interval: Seconds between status checks
+            max_wait: Give up waiting for a batch after this many seconds
+        """
+        self.claude_client = claude_client
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+
+    @property
+    def batches(self):
+        return self.claude_client.client.beta.messages.batches
+
+    def build_request(self, custom_id: str, system_prompt: str, user_message: str, route: str = ROUTE_CHAT) -> dict:
+        """
+        Build one batch entry using the route's primary model and max_tokens
+
+        Args:
+            custom_id: Identifier echoed back with the result
+            system_prompt: System prompt of the call
+            user_message: User message of the call
+            route: Call type in the routing table
+
+        Returns:
+            Batch request dict
+        """
+        model_route = self.claude_client.routes.get(route) or self.claude_client.routes[ROUTE_CHAT]
+        return {
+            "custom_id": custom_id,
+            "params": {
+                "model": model_route.model,
+                "max_tokens": model_route.max_tokens,
+                "system": system_prompt,
+                "messages": [{"role": "user", "content": user_message}],
+            },
+        }
+
+    async def submit(self, requests: List[dict]) -> str:
+        """
+        Create a batch
+
+        Args:
+            requests: Entries from ``build_request``
+
+        Returns:
+            The batch id
+        """
+        batch = await self.batches.create(requests=requests)
+        logger.info(f"Submitted message batch {batch.id} with {len(requests)} requests")
+        return batch.id
+
+    async def wait(self, batch_id: str) -> bool:
+        """
+        Poll a batch until it has ended
+
+        Args:
+            batch_id: Batch to wait for
+
+        Returns:
+            True once ended, False if ``max_wait`` ran out first
+        """
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            batch = await self.batches.retrieve(batch_id)
+            if batch.processing_status == "ended":
+                return True
+            if time.monotonic() >= deadline:
+                logger.warning(f"Message batch {batch_id} still {batch.processing_status} - giving up for now")
+                return False
+            await asyncio.sleep(self.poll_interval)
+
+    async def results(self, batch_id: str) -> Dict[str, Optional[str]]:
+        """
+        Read the results of an ended batch
+
+        Args:
+            batch_id: Ended batch
+
+        Returns:
+            Dictionary of custom_id -> response text, None for entries that
+            errored, expired or were canceled
+        """
+        texts: Dict[str, Optional[str]] = {}
+        async for entry in await self.batches.results(batch_id):
+            result = entry.result
+            text = None
+            if result.type == "succeeded" and result.message.content:
+                text = result.message.content[0].text
+            else:
+                logger.warning(f"Batch {batch_id} entry {entry.custom_id} {result.type}")
+            texts[entry.custom_id] = text
+        return texts
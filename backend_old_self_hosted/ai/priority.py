@@ -0,0 +1,74 @@
+"""Priority-ordered concurrency limit for Claude calls"""
+import asyncio
+import heapq
+import itertools
+from contextlib import asynccontextmanager
+from typing import List, Tuple
+
+# Lower value = served first
+PRIORITY_CRISIS = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_BACKGROUND = 2
+
+
+class PriorityLimiter:
+    """
+    Semaphore whose waiters are woken by priority, then arrival order
+
+    Caps how many Claude requests a worker has in flight. When the cap is
+    reached, a crisis message waiting for a slot goes ahead of queued chat
+    replies, which in turn go ahead of background generation.
+    """
+
+    def __init__(self, limit: int = 8):
+        """
+        Args:
+            limit: Maximum concurrent holders
+        """
+        self.limit = limit
+        self.active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_INTERACTIVE):
+        """
+        Hold one slot for the duration of the ``async with`` block
+
+        Args:
+            priority: PRIORITY_CRISIS, PRIORITY_INTERACTIVE or PRIORITY_BACKGROUND
+        """
+        if self.active < self.limit and not self.waiting:
+            self.active += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+            try:
+                await future
+            except asyncio.CancelledError:
+                # Cancelled right after being handed a slot: pass it on
+                if future.done() and not future.cancelled():
+                    self._release()
+                raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        """Hand the slot to the best live waiter, or free it"""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    @property
+    def waiting(self) -> int:
+        """Number of callers waiting for a slot"""
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    def snapshot(self) -> dict:
+        """Current usage, for the metrics endpoint"""
+        return {"limit": self.limit, "active": self.active, "waiting": self.waiting}
@@ -0,0 +1,197 @@
+"""Routing of Claude calls to models, token limits and latency budgets"""
+import os
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+LARGE_MODEL = "claude-sonnet-4-20250514"
+FAST_MODEL = "claude-3-5-haiku-20241022"
+
+# Call types used by server.py
+ROUTE_CHAT = "chat"
+ROUTE_CRISIS = "crisis"
+ROUTE_VALIDATION = "validation"
+ROUTE_BITACORA_SUMMARY = "bitacora_summary"
+
+
+class ModelRoute:
+    """Model settings for one type of call"""
+
+    def __init__(
+        self,
+        name: str,
+        model: str,
+        max_tokens: int,
+        latency_budget_ms: float,
+        fallback_model: Optional[str] = None
+    ):
+        """
+        Args:
+            name: Call type
+            model: Model used when there is time for it
+            max_tokens: Maximum tokens in the response
+            latency_budget_ms: Target time for the whole call, including queueing
+            fallback_model: Faster model used when the budget is at risk
+                (None never downgrades)
+        """
+        self.name = name
+        self.model = model
+        self.max_tokens = max_tokens
+        self.latency_budget_ms = latency_budget_ms
+        self.fallback_model = fallback_model
+
+    def as_dict(self) -> dict:
+        """Route settings for the metrics endpoint"""
+        return {
+            "model": self.model,
+            "max_tokens": self.max_tokens,
+            "latency_budget_ms": self.latency_budget_ms,
+            "fallback_model": self.fallback_model,
+        }
+
+
+DEFAULT_ROUTES = {
+    # Free-form chat keeps the large model unless the worker is saturated
+    ROUTE_CHAT: ModelRoute(ROUTE_CHAT, LARGE_MODEL, 500, 8000, FAST_MODEL),
+    # Crisis replies are never downgraded; their wait is bounded by the caller
+    ROUTE_CRISIS: ModelRoute(ROUTE_CRISIS, LARGE_MODEL, 500, 6000),
+    # Two-sentence check-in validation does not need the large model
+    ROUTE_VALIDATION: ModelRoute(ROUTE_VALIDATION, FAST_MODEL, 200, 3000),
+    # Coach summaries are read later; quality matters more than latency
+    ROUTE_BITACORA_SUMMARY: ModelRoute(ROUTE_BITACORA_SUMMARY, LARGE_MODEL, 300, 20000, FAST_MODEL),
+}
+
+
+def load_routes() -> Dict[str, ModelRoute]:
+    """
+    Build the routing table, applying env overrides
+
+    Each route can be tuned with ``CLAUDE_ROUTE_<NAME>_MODEL``,
+    ``_MAX_TOKENS``, ``_BUDGET_MS`` and ``_FALLBACK_MODEL`` (an empty
+    fallback disables downgrades), e.g. ``CLAUDE_ROUTE_CHAT_BUDGET_MS=5000``.
+
+    Returns:
+        Dictionary of call type -> ModelRoute
+    """
+    routes = {}
+    for name, default in DEFAULT_ROUTES.items():
+        prefix = f"CLAUDE_ROUTE_{name.upper()}_"
+        fallback = os.environ.get(prefix + "FALLBACK_MODEL", default.fallback_model or "")
+        routes[name] = ModelRoute(
+            name,
+            os.environ.get(prefix + "MODEL", default.model),
+            int(os.environ.get(prefix + "MAX_TOKENS", default.max_tokens)),
+            float(os.environ.get(prefix + "BUDGET_MS", default.latency_budget_ms)),
+            fallback or None
+        )
+    return routes
+
+
+class RouteMetrics:
+    """
+    Latency and token usage per route and model
+
+    Keeps an exponentially weighted moving average of API call time per
+    (route, model), used to predict whether the primary model fits in the
+    remaining budget, plus a window of recent end-to-end latencies
+    (queueing included) for percentiles.
+    """
+
+    def __init__(self, window: int = 200, alpha: float = 0.2):
+        """
+        Args:
+            window: Recent latencies kept per route for percentiles
+            alpha: Weight of the newest sample in the moving average
+        """
+        self.window = window
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._routes: Dict[str, dict] = {}
+        self._ewma_ms: Dict[tuple, float] = {}
+
+    def _route(self, name: str) -> dict:
+        stats = self._routes.get(name)
+        if stats is None:
+            stats = {
+                "calls": 0,
+                "failures": 0,
+                "downgrades": 0,
+                "budget_exceeded": 0,
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "models": {},
+                "latencies": deque(maxlen=self.window),
+            }
+            self._routes[name] = stats
+        return stats
+
+    def expected_latency_ms(self, route: str, model: str) -> Optional[float]:
+        """Moving average API call time of a model on a route (None until measured)"""
+        return self._ewma_ms.get((route, model))
+
+    def record(
+        self,
+        route: ModelRoute,
+        model: str,
+        latency_ms: float,
+        service_ms: Optional[float] = None,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        failed: bool = False
+    ) -> None:
+        """
+        Record one finished call
+
+        Args:
+            route: Route the call was made for
+            model: Model actually used
+            latency_ms: Total time including queueing
+            service_ms: Time spent in the API call itself
+            input_tokens: Prompt tokens reported by the API
+            output_tokens: Response tokens reported by the API
+            failed: Whether the call raised
+        """
+        with self._lock:
+            stats = self._route(route.name)
+            stats["calls"] += 1
+            stats["models"][model] = stats["models"].get(model, 0) + 1
+            if failed:
+                stats["failures"] += 1
+                return
+            if model != route.model:
+                stats["downgrades"] += 1
+            if latency_ms > route.latency_budget_ms:
+                stats["budget_exceeded"] += 1
+            stats["input_tokens"] += input_tokens
+            stats["output_tokens"] += output_tokens
+            stats["latencies"].append(latency_ms)
+            key = (route.name, model)
+            previous = self._ewma_ms.get(key)
+            sample = latency_ms if service_ms is None else service_ms
+            self._ewma_ms[key] = sample if previous is None else (
+                self.alpha * sample + (1 - self.alpha) * previous
+            )
+
+    def snapshot(self) -> dict:
+        """Per-route counters and latency percentiles for the metrics endpoint"""
+        with self._lock:
+            result = {}
+            for name, stats in self._routes.items():
+                ordered = sorted(stats["latencies"])
+
+                def percentile(pct):
+                    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct))], 1) if ordered else None
+
+                successes = stats["calls"] - stats["failures"]
+                result[name] = {
+                    **{k: v for k, v in stats.items() if k not in ("latencies", "models")},
+                    "models": dict(stats["models"]),
+                    "latency_p50_ms": percentile(0.5),
+                    "latency_p95_ms": percentile(0.95),
+                    "avg_output_tokens": round(stats["output_tokens"] / successes, 1) if successes else None,
+                    "ewma_ms": {
+                        model: round(value, 1)
+                        for (route, model), value in self._ewma_ms.items() if route == name
+                    },
+                }
+            return result
@@ -4,10 +4,22 @@ from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
 
-# Get configuration from environment
-JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
-JWT_ALGORITHM = os.environ.get('JWT_ALGORITHM', 'HS256')
-JWT_ACCESS_TOKEN_EXPIRE_DAYS = int(os.environ.get('JWT_ACCESS_TOKEN_EXPIRE_DAYS', '7'))
+
+def _jwt_settings() -> tuple:
+    """
+    Read JWT configuration from the environment at call time
+
+    Reading lazily means values from .env apply even though this module is
+    imported before the app factory loads it.
+
+    Returns:
+        Tuple of (secret key, algorithm, access token lifetime in days)
+    """
+    return (
+        os.environ.get('JWT_SECRET_KEY', 'your-secret-key-change-in-production'),
+        os.environ.get('JWT_ALGORITHM', 'HS256'),
+        int(os.environ.get('JWT_ACCESS_TOKEN_EXPIRE_DAYS', '7'))
+    )
 
 
 def create_access_token(user_id: str, email: str) -> str:
@@ -21,14 +33,15 @@ def create_access_token(user_id: str, email: str) -> str:
     Returns:
         JWT token string
     """
-    expire = datetime.now(timezone.utc) + timedelta(days=JWT_ACCESS_TOKEN_EXPIRE_DAYS)
+    secret_key, algorithm, expire_days = _jwt_settings()
+    expire = datetime.now(timezone.utc) + timedelta(days=expire_days)
     to_encode = {
         "sub": user_id,
         "email": email,
         "exp": expire,
         "iat": datetime.now(timezone.utc)
     }
-    encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, secret_key, algorithm=algorithm)
     return encoded_jwt
 
 
@@ -42,8 +55,9 @@ def verify_token(token: str) -> Optional[dict]:
     Returns:
         Decoded token payload if valid, None otherwise
     """
+    secret_key, algorithm, _ = _jwt_settings()
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+        payload = jwt.decode(token, secret_key, algorithms=[algorithm])
         user_id: str = payload.get("sub")
         email: str = payload.get("email")
         
@@ -0,0 +1,105 @@
+"""Compare app launch via GET /api/bootstrap against the sequential calls it replaces
+
+Runs against a live server. Logs in (or uses --token), then for each
+iteration times:
+
+- sequential: /auth/me, /bitacora/today, /messages/unread-count,
+  /messages/coach-id, /validations/random and /community/presence one after
+  another, as the app did on launch
+- bootstrap: a single GET /api/bootstrap
+
+``--rtt-ms`` adds a fixed delay per request to approximate a mobile network
+round trip (e.g. 300 for a poor 3G connection) on a local server.
+
+Run from the backend folder:
+``python -m benchmarks.bootstrap_benchmark --email ... --password ...``
+"""
+import argparse
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+
+LAUNCH_PATHS = [
+    "/auth/me",
+    "/bitacora/today",
+    "/messages/unread-count",
+    "/messages/coach-id",
+    "/validations/random",
+    "/community/presence",
+]
+
+
+def _request(base_url: str, path: str, token: str = None, body: dict = None, rtt_ms: float = 0.0):
+    """Send one request and return the decoded JSON body (None on HTTP errors)"""
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(base_url + path, data=data, headers=headers)
+    if rtt_ms:
+        time.sleep(rtt_ms / 1000)
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return json.loads(response.read() or b"null")
+    except urllib.error.HTTPError:
+        return None
+
+
+def _percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def run(base_url: str, token: str, iterations: int, rtt_ms: float) -> dict:
+    """
+    Time both launch strategies
+
+    Returns:
+        Dictionary of strategy name -> list of durations in ms
+    """
+    results = {"sequential": [], "bootstrap": []}
+    for _ in range(iterations):
+        started = time.perf_counter()
+        for path in LAUNCH_PATHS:
+            _request(base_url, path, token, rtt_ms=rtt_ms)
+        results["sequential"].append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        payload = _request(base_url, "/bootstrap", token, rtt_ms=rtt_ms)
+        results["bootstrap"].append((time.perf_counter() - started) * 1000)
+        if payload and payload.get("errors"):
+            print(f"bootstrap partial failure: {payload['errors']}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000/api")
+    parser.add_argument("--token", help="JWT to use instead of logging in")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="Simulated network round trip per request")
+    args = parser.parse_args()
+
+    token = args.token
+    if not token:
+        if not (args.email and args.password):
+            parser.error("pass --token or --email and --password")
+        login = _request(args.base_url, "/auth/login", body={"email": args.email, "password": args.password})
+        if not login:
+            parser.error("login failed")
+        token = login["access_token"]
+
+    results = run(args.base_url, token, args.iterations, args.rtt_ms)
+    for name, samples in results.items():
+        print(f"{name:<11} median {statistics.median(samples):8.1f} ms   "
+              f"p95 {_percentile(samples, 0.95):8.1f} ms   ({len(samples)} runs)")
+    speedup = statistics.median(results["sequential"]) / statistics.median(results["bootstrap"])
+    print(f"bootstrap is {speedup:.1f}x faster at the median")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Compare the document-per-message and bucketed chat layouts
+
+Seeds a scratch database with the same synthetic chat history in both
+layouts (``chat_messages`` and ``chat_buckets``) and reports, for each:
+
+- storage size, index size and document count from ``collStats``
+- latency of ``history()`` for the latest N messages of random sessions
+
+The scratch database is dropped first, so never point ``--db`` at real data.
+
+Run from the backend folder:
+``python -m benchmarks.chat_storage_benchmark --messages 1000000``
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from db.migrate_chat_buckets import build_buckets
+from messaging.chat_store import BucketChatStore, DocumentChatStore
+
+INSERT_BATCH = 5000
+
+
+def _percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def _session_messages(session_id: str, user_id: str, count: int, started: datetime) -> list:
+    """Alternating user/assistant turns one minute apart"""
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "session_id": session_id,
+            "user_id": user_id,
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"Mensaje {i} de la sesión " + "x" * random.randint(40, 400),
+            "created_at": started + timedelta(minutes=i)
+        }
+        for i in range(count)
+    ]
+
+
+async def seed(db, messages: int, per_session: int, bucket_size: int) -> list:
+    """
+    Write the same synthetic history into both layouts
+
+    Returns:
+        List of (session_id, user_id) pairs that were created
+    """
+    await db.chat_messages.create_index([("session_id", 1), ("created_at", 1)])
+    await db.chat_messages.create_index([("user_id", 1), ("created_at", -1)])
+    await db.chat_buckets.create_index([("session_id", 1), ("user_id", 1), ("first_at", -1)])
+    await db.chat_buckets.create_index([("session_id", 1), ("user_id", 1), ("count", 1)])
+
+    sessions = []
+    docs, buckets = [], []
+    started = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    written = 0
+    while written < messages:
+        count = min(per_session, messages - written)
+        key = (str(uuid.uuid4()), f"user-{len(sessions) % 5000}")
+        session = _session_messages(key[0], key[1], count, started)
+        docs.extend(session)
+        buckets.extend(build_buckets(key[0], key[1], session, bucket_size))
+        sessions.append(key)
+        written += count
+        if len(docs) >= INSERT_BATCH:
+            await db.chat_messages.insert_many(docs, ordered=False)
+            await db.chat_buckets.insert_many(buckets, ordered=False)
+            docs, buckets = [], []
+            print(f"  seeded {written}/{messages} messages", end="\r")
+    if docs:
+        await db.chat_messages.insert_many(docs, ordered=False)
+        await db.chat_buckets.insert_many(buckets, ordered=False)
+    print()
+    return sessions
+
+
+async def measure_reads(store, sessions: list, reads: int, limit: int) -> list:
+    """Time history() for random sessions, in ms"""
+    samples = []
+    for session_id, user_id in random.sample(sessions, min(reads, len(sessions))):
+        started = time.perf_counter()
+        await store.history(session_id, user_id, limit)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+async def run(args):
+    client = AsyncIOMotorClient(args.mongo_url)
+    db = client[args.db]
+    await client.drop_database(args.db)
+
+    print(f"Seeding {args.messages} messages ({args.per_session} per session)...")
+    sessions = await seed(db, args.messages, args.per_session, args.bucket_size)
+
+    stores = {
+        "documents": (DocumentChatStore(db), "chat_messages"),
+        "buckets": (BucketChatStore(db, args.bucket_size), "chat_buckets"),
+    }
+    for name, (store, collection) in stores.items():
+        # Warm-up pass so both layouts are measured with a hot cache
+        await measure_reads(store, sessions, min(args.reads, 100), args.limit)
+        samples = await measure_reads(store, sessions, args.reads, args.limit)
+        stats = await db.command("collStats", collection)
+        print(f"{name:<10} docs {stats['count']:>9}   data {stats['size'] / 2**20:8.1f} MiB   "
+              f"storage {stats['storageSize'] / 2**20:8.1f} MiB   indexes {stats['totalIndexSize'] / 2**20:7.1f} MiB")
+        print(f"{'':<10} history({args.limit}) p50 {statistics.median(samples):6.2f} ms   "
+              f"p95 {_percentile(samples, 0.95):6.2f} ms   ({len(samples)} reads)")
+
+    if not args.keep:
+        await client.drop_database(args.db)
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-url", default=os.environ.get('MONGO_URL', 'mongodb://localhost:27017'))
+    parser.add_argument("--db", default="chat_storage_benchmark", help="Scratch database (dropped)")
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--per-session", type=int, default=200)
+    parser.add_argument("--bucket-size", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=50, help="Messages per history read")
+    parser.add_argument("--reads", type=int, default=1000)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database afterwards")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
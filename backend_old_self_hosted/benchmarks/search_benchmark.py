@@ -0,0 +1,150 @@
+"""Latency of coach search over a large synthetic corpus
+
+Seeds a scratch database with bitácora notes, check-in brain dumps and
+direct messages spread over many users (``--documents`` in total), builds
+the search indexes of ``text_index_models`` and times ``CoachSearch.search``
+for one coach's caseload with:
+
+- a common term that appears in most entries of every user ("bebé")
+- a rarer term and a quoted phrase
+
+Every query is measured after a warm-up pass. ``--target-ms`` fails (exit
+code 1) when the p95 of any query is above it.
+
+The scratch database is dropped first, so never point ``--db`` at real data.
+
+Run from the backend folder:
+``python -m benchmarks.search_benchmark --documents 1000000 --target-ms 50``
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from messaging.search import CoachSearch, text_index_models
+
+INSERT_BATCH = 5000
+COACH_ID = "coach-benchmark"
+
+WORDS = [
+    "noche", "siesta", "llanto", "cansada", "dormir", "comió", "pecho", "biberón",
+    "cólico", "tranquila", "despertó", "cuna", "paseo", "abuela", "guardería",
+    "agotada", "sola", "feliz", "rutina", "baño", "dientes", "fiebre", "médico",
+]
+QUERIES = {
+    "common term": "bebé",
+    "rare term": "guardería",
+    "phrase": '"muy cansada"',
+}
+
+
+def _percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def _text() -> str:
+    """A short Spanish entry; most of them mention the baby"""
+    words = random.choices(WORDS, k=random.randint(8, 30))
+    if random.random() < 0.8:
+        words.insert(random.randrange(len(words)), "bebé")
+    if random.random() < 0.05:
+        words.insert(random.randrange(len(words)), "muy cansada")
+    return " ".join(words).capitalize() + "."
+
+
+async def seed(db, documents: int, users: int) -> None:
+    """Write ``documents`` entries split over the three sources and ``users`` users"""
+    started = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    batches = {"bitacoras": [], "checkins": [], "direct_messages": []}
+    for i in range(documents):
+        user_id = f"user-{i % users}"
+        created_at = started + timedelta(minutes=i)
+        collection = random.choice(list(batches))
+        doc = {"id": str(uuid.uuid4()), "created_at": created_at}
+        if collection == "bitacoras":
+            doc.update(user_id=user_id, date=created_at.date().isoformat(), notes=_text())
+        elif collection == "checkins":
+            doc.update(user_id=user_id, mood=random.randint(1, 5), brain_dump=_text())
+        else:
+            sender, receiver = (user_id, COACH_ID) if random.random() < 0.5 else (COACH_ID, user_id)
+            doc.update(sender_id=sender, receiver_id=receiver, content=_text())
+        batches[collection].append(doc)
+        if len(batches[collection]) >= INSERT_BATCH:
+            await db[collection].insert_many(batches[collection], ordered=False)
+            batches[collection] = []
+            print(f"  seeded {i + 1}/{documents} entries", end="\r")
+    for collection, docs in batches.items():
+        if docs:
+            await db[collection].insert_many(docs, ordered=False)
+    print()
+
+
+async def measure(search: CoachSearch, caseload: list, query: str, runs: int, limit: int) -> list:
+    """Time search() over the whole caseload, in ms"""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await search.search(COACH_ID, caseload, query, limit=limit)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+async def run(args) -> bool:
+    client = AsyncIOMotorClient(args.mongo_url)
+    db = client[args.db]
+    await client.drop_database(args.db)
+
+    print(f"Seeding {args.documents} entries over {args.users} users...")
+    await seed(db, args.documents, args.users)
+    print("Building search indexes...")
+    for collection, models in text_index_models().items():
+        await db[collection].create_indexes(models)
+
+    search = CoachSearch(db)
+    caseload = [f"user-{i}" for i in random.sample(range(args.users), min(args.caseload, args.users))]
+    passed = True
+    for name, query in QUERIES.items():
+        await measure(search, caseload, query, min(args.runs, 10), args.limit)
+        samples = await measure(search, caseload, query, args.runs, args.limit)
+        p95 = _percentile(samples, 0.95)
+        print(f"{name:<12} {query:<16} p50 {statistics.median(samples):7.2f} ms   "
+              f"p95 {p95:7.2f} ms   ({len(samples)} searches, {len(caseload)} clients)")
+        if args.target_ms is not None and p95 > args.target_ms:
+            passed = False
+
+    if not args.keep:
+        await client.drop_database(args.db)
+    client.close()
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-url", default=os.environ.get('MONGO_URL', 'mongodb://localhost:27017'))
+    parser.add_argument("--db", default="search_benchmark", help="Scratch database (dropped)")
+    parser.add_argument("--documents", type=int, default=1_000_000, help="Entries over all three sources")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--caseload", type=int, default=30, help="Clients of the searching coach")
+    parser.add_argument("--limit", type=int, default=20, help="Hits per search")
+    parser.add_argument("--runs", type=int, default=200, help="Searches timed per query")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed of the corpus and caseload")
+    parser.add_argument("--target-ms", type=float, default=None, help="Fail when a query's p95 exceeds this")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database afterwards")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    if not asyncio.run(run(args)):
+        print(f"FAIL: above target of {args.target_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
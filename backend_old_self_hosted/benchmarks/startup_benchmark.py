@@ -0,0 +1,157 @@
+"""Cold-start benchmark for server.py workers
+
+Measures two things from a fresh interpreter:
+
+1. ``python -X importtime -c "import server"``: total import time and the
+   slowest modules imported directly by server.py, so heavy imports are
+   easy to spot
+2. Time from spawning ``uvicorn server:app`` until ``GET /api/`` returns 200
+
+Run from the backend folder: ``python -m benchmarks.startup_benchmark``
+Use ``--target-ms`` to fail (exit code 1) when time-to-first-200 is too slow.
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _benchmark_env() -> dict:
+    """Environment for child processes; Mongo is never contacted by /api/"""
+    env = dict(os.environ)
+    env.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+    return env
+
+
+def import_time_breakdown(top: int = 15) -> tuple:
+    """
+    Import server.py with -X importtime and rank what it imports
+
+    Costs are aggregated over the direct children of ``server`` (one level
+    of indentation below it), each with the cumulative time of everything it
+    pulled in. The ``server`` line itself is the total; interpreter startup
+    (``site``, ``encodings``) is left out.
+
+    Args:
+        top: Number of modules to return
+
+    Returns:
+        Tuple of (total import time in ms, list of (module, cumulative ms))
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=BACKEND_DIR, env=_benchmark_env(), capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing server failed:\n{result.stderr[-2000:]}")
+    return parse_import_times(result.stderr, "server", top)
+
+
+def parse_import_times(output: str, root: str, top: int = 15) -> tuple:
+    """
+    Aggregate ``-X importtime`` output over the direct children of a module
+
+    A module's line comes after the lines of the modules it imported, which
+    are indented one more level (two spaces) than it.
+
+    Args:
+        output: stderr of ``python -X importtime``
+        root: Top-level module whose children are ranked
+        top: Number of modules to return
+
+    Returns:
+        Tuple of (root's cumulative ms, list of (module, cumulative ms))
+    """
+    children = {}
+    pending = {}
+    total_us = 0
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        # One space follows the separator, then two per nesting level
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        module = name.strip()
+        if depth == 1:
+            pending[module] = pending.get(module, 0) + int(cumulative_us)
+        elif depth == 0:
+            if module == root:
+                total_us = int(cumulative_us)
+                children = pending
+            pending = {}
+
+    ranked = sorted(children.items(), key=lambda item: item[1], reverse=True)[:top]
+    return total_us / 1000, [(module, us / 1000) for module, us in ranked]
+
+
+def _free_port() -> int:
+    """Ask the OS for an unused local port"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_200(timeout: float = 30.0) -> float:
+    """
+    Start a uvicorn worker and time how long until GET /api/ returns 200
+
+    Args:
+        timeout: Seconds to wait before giving up
+
+    Returns:
+        Elapsed time in milliseconds
+    """
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/api/"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=_benchmark_env()
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError("uvicorn exited before serving a request")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        raise TimeoutError(f"No 200 from {url} within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3, help="Cold starts to average")
+    parser.add_argument("--top", type=int, default=15, help="Modules to list in the import breakdown")
+    parser.add_argument("--target-ms", type=float, default=None, help="Fail when time-to-first-200 exceeds this")
+    args = parser.parse_args()
+
+    total_ms, ranked = import_time_breakdown(args.top)
+    print(f"import server: {total_ms:.1f} ms")
+    for module, ms in ranked:
+        print(f"  {module:<30} {ms:8.1f} ms")
+
+    samples = [time_to_first_200() for _ in range(args.runs)]
+    average = sum(samples) / len(samples)
+    print(f"time to first 200 on /api/: avg {average:.1f} ms, "
+          f"min {min(samples):.1f} ms, max {max(samples):.1f} ms ({args.runs} runs)")
+
+    if args.target_ms is not None and average > args.target_ms:
+        print(f"FAIL: above target of {args.target_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
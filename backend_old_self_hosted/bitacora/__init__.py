@@ -0,0 +1 @@
+# Bitácora module
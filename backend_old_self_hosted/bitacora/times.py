@@ -0,0 +1,162 @@
+"""Compact clock times and dates for bitácora entries"""
+import re
+from datetime import date, datetime
+from typing import Iterable, Optional, Tuple
+
+# (string field, minutes field) pairs of each bitácora model
+NAP_CLOCK_FIELDS = [
+    ("laid_down_time", "laid_down_min"),
+    ("fell_asleep_time", "fell_asleep_min"),
+    ("woke_up_time", "woke_up_min"),
+]
+NIGHT_WAKING_CLOCK_FIELDS = [("time", "time_min")]
+BITACORA_CLOCK_FIELDS = [
+    ("previous_day_wake_time", "previous_day_wake_min"),
+    ("relaxing_routine_start", "relaxing_routine_start_min"),
+    ("last_feeding_time", "last_feeding_min"),
+    ("laid_down_for_bed", "laid_down_for_bed_min"),
+    ("fell_asleep_at", "fell_asleep_at_min"),
+    ("morning_wake_time", "morning_wake_min"),
+]
+NAP_FIELDS = ("nap_1", "nap_2", "nap_3")
+
+# "21:30", "9:30 pm", "9pm", "21h30", "21.30", "21:30:00"
+_CLOCK = re.compile(
+    r"^\s*(\d{1,2})(?:\s*[:h.]\s*(\d{2})(?::\d{2})?)?\s*h?\s*(?:([ap])\.?\s*m?\.?)?\s*$",
+    re.IGNORECASE
+)
+
+
+def parse_clock(value: Optional[str]) -> Optional[int]:
+    """
+    Parse a clock time into minutes since midnight
+
+    Args:
+        value: Time as typed or picked in the app (24h or am/pm)
+
+    Returns:
+        0-1439, or None when the value is empty or not a time
+    """
+    if not value:
+        return None
+    # ISO timestamps keep only their time part
+    if "T" in value:
+        value = value.split("T", 1)[1][:5]
+    match = _CLOCK.match(value)
+    if not match:
+        return None
+    hour = int(match.group(1))
+    minute = int(match.group(2) or 0)
+    meridiem = (match.group(3) or "").lower()
+    if minute > 59:
+        return None
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem == "p" else 0)
+    elif hour == 24 and minute == 0:
+        hour = 0
+    elif hour > 23:
+        return None
+    return hour * 60 + minute
+
+
+def format_clock(minutes: int) -> str:
+    """Format minutes since midnight as HH:MM"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def normalize_date(value: str) -> Optional[str]:
+    """
+    Normalize a calendar date to YYYY-MM-DD
+
+    Accepts ISO dates and timestamps and day-first dates (DD/MM/YYYY or
+    DD-MM-YYYY), as written in Spanish.
+
+    Args:
+        value: Date string
+
+    Returns:
+        The ISO date, or None when it cannot be parsed
+    """
+    value = (value or "").strip()
+    try:
+        return date.fromisoformat(value[:10]).isoformat()
+    except ValueError:
+        pass
+    for pattern in ("%d/%m/%Y", "%d-%m-%Y", "%d/%m/%y"):
+        try:
+            return datetime.strptime(value, pattern).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def fill_clock_fields(entry, fields: Iterable[Tuple[str, str]]):
+    """
+    Keep string times and their minute counterparts in sync on a model
+
+    A string without minutes gets them parsed; minutes without a string get
+    the HH:MM text, so old and new clients see the same entry.
+
+    Args:
+        entry: Model instance
+        fields: (string field, minutes field) pairs
+
+    Returns:
+        The same entry
+    """
+    for text_field, minutes_field in fields:
+        text = getattr(entry, text_field)
+        minutes = getattr(entry, minutes_field)
+        if minutes is None and text:
+            setattr(entry, minutes_field, parse_clock(text))
+        elif minutes is not None and not text:
+            setattr(entry, text_field, format_clock(minutes))
+    return entry
+
+
+def clock_updates(doc: dict) -> dict:
+    """
+    Compute the minute fields missing from a stored bitácora document
+
+    Args:
+        doc: Raw document from the bitacoras collection
+
+    Returns:
+        ``$set`` fields (dotted paths for naps); empty when up to date
+    """
+    updates = {}
+
+    def missing(entry: dict, fields, prefix: str = ""):
+        for text_field, minutes_field in fields:
+            if entry.get(minutes_field) is None and entry.get(text_field):
+                minutes = parse_clock(entry[text_field])
+                if minutes is not None:
+                    updates[prefix + minutes_field] = minutes
+
+    missing(doc, BITACORA_CLOCK_FIELDS)
+    for nap_field in NAP_FIELDS:
+        if isinstance(doc.get(nap_field), dict):
+            missing(doc[nap_field], NAP_CLOCK_FIELDS, f"{nap_field}.")
+
+    wakings = doc.get("night_wakings")
+    if isinstance(wakings, list):
+        converted = []
+        changed = False
+        for waking in wakings:
+            waking = dict(waking or {})
+            if waking.get("time_min") is None and waking.get("time"):
+                minutes = parse_clock(waking["time"])
+                if minutes is not None:
+                    waking["time_min"] = minutes
+                    changed = True
+            converted.append(waking)
+        if changed:
+            updates["night_wakings"] = converted
+
+    if isinstance(doc.get("date"), str):
+        normalized = normalize_date(doc["date"])
+        if normalized and normalized != doc["date"]:
+            updates["date"] = normalized
+    return updates
@@ -0,0 +1 @@
+# Community module for presence tracking
\ No newline at end of file
@@ -0,0 +1,169 @@
+"""Community presence from time-bucketed HyperLogLog distinct counters"""
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import time
+from typing import Dict, Optional
+
+from state.base import StateBackend
+
+logger = logging.getLogger(__name__)
+
+
+class HyperLogLog:
+    """
+    Approximate distinct counter with a fixed memory footprint
+
+    Uses ``2**precision`` one-byte registers (1 KiB at the default precision
+    of 10, about 3% standard error) regardless of how many items are added.
+    Two sketches merge by taking the register-wise maximum, which is how
+    buckets and workers are combined.
+    """
+
+    def __init__(self, precision: int = 10, registers: Optional[bytes] = None):
+        """
+        Args:
+            precision: Number of index bits (4-16)
+            registers: Existing register contents to load
+        """
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.size)
+
+    def add(self, item: str) -> None:
+        """Add an item to the sketch"""
+        x = int.from_bytes(hashlib.blake2b(item.encode(), digest_size=8).digest(), "big")
+        index = x >> (64 - self.precision)
+        remaining_bits = 64 - self.precision
+        rank = remaining_bits - (x & ((1 << remaining_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """Fold another sketch of the same precision into this one"""
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def count(self) -> int:
+        """Estimate the number of distinct items added"""
+        m = self.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class PresenceTracker:
+    """
+    Counts distinct active users over a sliding window of time buckets
+
+    ``record`` is called on every authenticated request and only hashes the
+    user_id into the current bucket's sketch. Buckets older than the window
+    are dropped, so memory stays at ``window_buckets + 1`` sketches.
+
+    A background task (``run``) periodically merges the window into
+    ``online_count``. With a shared state backend each worker also publishes
+    its own sketches and merges everyone else's, so the count covers users
+    served by any worker. The presence endpoint just reads ``online_count``.
+    """
+
+    def __init__(
+        self,
+        bucket_seconds: int = 60,
+        window_buckets: int = 15,
+        refresh_seconds: float = 10.0,
+        precision: int = 10
+    ):
+        """
+        Args:
+            bucket_seconds: Width of one time bucket
+            window_buckets: Buckets counted as "online now"
+            refresh_seconds: How often the aggregate is recomputed
+            precision: HyperLogLog precision of each bucket
+        """
+        self.bucket_seconds = bucket_seconds
+        self.window_buckets = window_buckets
+        self.refresh_seconds = refresh_seconds
+        self.precision = precision
+        self.worker_id = str(os.getpid())
+        self._buckets: Dict[int, HyperLogLog] = {}
+        self.online_count = 0
+        self.refreshed_at: Optional[float] = None
+
+    def _bucket(self, now: float) -> int:
+        return int(now // self.bucket_seconds)
+
+    def _window(self, now: float) -> range:
+        current = self._bucket(now)
+        return range(current - self.window_buckets + 1, current + 1)
+
+    def record(self, user_id: str) -> None:
+        """
+        Register activity from a user in the current bucket
+
+        Args:
+            user_id: user_id of the authenticated user
+        """
+        bucket = self._bucket(time.time())
+        sketch = self._buckets.get(bucket)
+        if sketch is None:
+            sketch = self._buckets[bucket] = HyperLogLog(self.precision)
+            self._expire_buckets(bucket)
+        sketch.add(user_id)
+
+    def _expire_buckets(self, current: int) -> None:
+        """Drop buckets that fell out of the window"""
+        oldest = current - self.window_buckets + 1
+        for bucket in [b for b in self._buckets if b < oldest]:
+            del self._buckets[bucket]
+
+    async def refresh(self, state: Optional[StateBackend] = None) -> int:
+        """
+        Recompute online_count from the buckets in the window
+
+        Args:
+            state: Shared backend used to exchange sketches between workers
+
+        Returns:
+            The new online count
+        """
+        now = time.time()
+        self._expire_buckets(self._bucket(now))
+        merged = HyperLogLog(self.precision)
+        ttl = (self.window_buckets + 1) * self.bucket_seconds
+
+        for bucket in self._window(now):
+            local = self._buckets.get(bucket)
+            if state is None or not state.shared:
+                if local:
+                    merged.merge(local)
+                continue
+            key = f"presence:{bucket}"
+            if local:
+                await state.hset(key, self.worker_id, local.registers.hex())
+                await state.expire(key, ttl)
+            for registers in (await state.hgetall(key)).values():
+                merged.merge(HyperLogLog(self.precision, bytes.fromhex(registers)))
+
+        self.online_count = merged.count()
+        self.refreshed_at = now
+        return self.online_count
+
+    async def current_count(self, state: Optional[StateBackend] = None) -> int:
+        """Get online_count, computing it once if the refresher has not run yet"""
+        if self.refreshed_at is None:
+            await self.refresh(state)
+        return self.online_count
+
+    async def run(self, state: Optional[StateBackend] = None) -> None:
+        """Refresh online_count forever (run as a background task)"""
+        while True:
+            try:
+                await self.refresh(state)
+            except Exception as e:
+                logger.error(f"Presence refresh failed: {e}")
+            await asyncio.sleep(self.refresh_seconds)
@@ -0,0 +1,150 @@
+"""MongoDB client construction with connection-pool tuning and pool metrics"""
+import os
+import threading
+import time
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment"""
+    return int(os.environ.get(name, str(default)))
+
+
+def get_pool_settings() -> dict:
+    """
+    Build the Motor connection options from environment variables
+
+    Returns:
+        Keyword arguments for AsyncIOMotorClient
+    """
+    return {
+        "maxPoolSize": _env_int('MONGO_MAX_POOL_SIZE', 50),
+        "minPoolSize": _env_int('MONGO_MIN_POOL_SIZE', 0),
+        "maxIdleTimeMS": _env_int('MONGO_MAX_IDLE_TIME_MS', 60000),
+        "waitQueueTimeoutMS": _env_int('MONGO_WAIT_QUEUE_TIMEOUT_MS', 2000),
+        "serverSelectionTimeoutMS": _env_int('MONGO_SERVER_SELECTION_TIMEOUT_MS', 3000),
+        "connectTimeoutMS": _env_int('MONGO_CONNECT_TIMEOUT_MS', 3000),
+        "socketTimeoutMS": _env_int('MONGO_SOCKET_TIMEOUT_MS', 10000),
+    }
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Connection pool listener that keeps wait-queue and checkout counters
+
+    Callbacks are invoked from the driver's worker threads, so every update is
+    done under a lock. A checkout wait is timed from ``check_out_started`` to
+    ``checked_out``/``check_out_failed``, which pymongo emits on the same
+    thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.waiting = 0
+        self.max_waiting = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.open_connections = 0
+        self.checkouts = 0
+        self.checkout_failures = {}
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.pool_clears = 0
+
+    def _finish_wait(self) -> float:
+        """Stop the wait timer of the current thread and return its duration"""
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        return time.perf_counter() - started if started is not None else 0.0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+
+    def connection_check_out_failed(self, event):
+        waited = self._finish_wait()
+        with self._lock:
+            self.waiting -= 1
+            self.total_wait_seconds += waited
+            self.checkout_failures[event.reason] = self.checkout_failures.get(event.reason, 0) + 1
+
+    def connection_checked_out(self, event):
+        waited = self._finish_wait()
+        with self._lock:
+            self.waiting -= 1
+            self.checked_out += 1
+            self.checkouts += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def snapshot(self) -> dict:
+        """
+        Get a point-in-time copy of the pool counters
+
+        Returns:
+            Dictionary of pool metrics (wait times in milliseconds)
+        """
+        with self._lock:
+            attempts = self.checkouts + sum(self.checkout_failures.values())
+            return {
+                "wait_queue_size": self.waiting,
+                "wait_queue_max": self.max_waiting,
+                "checked_out": self.checked_out,
+                "checked_out_max": self.max_checked_out,
+                "open_connections": self.open_connections,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "avg_wait_ms": round(self.total_wait_seconds / attempts * 1000, 3) if attempts else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+                "pool_clears": self.pool_clears,
+            }
+
+
+def create_mongo_client(mongo_url: str, pool_metrics: Optional[PoolMetrics] = None) -> AsyncIOMotorClient:
+    """
+    Create a Motor client with tuned pool sizes and fail-fast timeouts
+
+    Args:
+        mongo_url: MongoDB connection URL
+        pool_metrics: Optional listener collecting pool wait-queue metrics
+
+    Returns:
+        Configured AsyncIOMotorClient
+    """
+    listeners = [pool_metrics] if pool_metrics else []
+    return AsyncIOMotorClient(mongo_url, event_listeners=listeners, **get_pool_settings())
@@ -0,0 +1,72 @@
+"""Atomic per-user counters stored in the counters collection"""
+from pymongo import ReturnDocument
+
+# Field holding the last bitácora day number handed out to a user
+BITACORA_DAY_FIELD = "bitacora_day"
+
+
+async def next_counter_value(db, user_id: str, field: str) -> int:
+    """
+    Atomically increment a per-user counter and return the new value
+
+    Each user owns a single document in ``counters`` (``_id`` is the user_id)
+    holding one integer field per sequence, so concurrent callers always get
+    distinct values without scanning the user's history.
+
+    Args:
+        db: Motor database handle
+        user_id: Owner of the counter
+        field: Counter field name (e.g. ``BITACORA_DAY_FIELD``)
+
+    Returns:
+        The incremented counter value (1 for the first call)
+    """
+    doc = await db.counters.find_one_and_update(
+        {"_id": user_id},
+        {"$inc": {field: 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return doc[field]
+
+
+async def reserve_counter_values(db, user_id: str, field: str, count: int) -> int:
+    """
+    Atomically reserve a block of consecutive counter values
+
+    Args:
+        db: Motor database handle
+        user_id: Owner of the counter
+        field: Counter field name
+        count: Number of values to reserve
+
+    Returns:
+        The first reserved value; the block is [first, first + count)
+    """
+    doc = await db.counters.find_one_and_update(
+        {"_id": user_id},
+        {"$inc": {field: count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return doc[field] - count + 1
+
+
+async def set_counter_floor(db, user_id: str, field: str, value: int) -> None:
+    """
+    Make sure a per-user counter is at least ``value``
+
+    Used by migrations to seed counters from existing data without ever
+    moving a live counter backwards.
+
+    Args:
+        db: Motor database handle
+        user_id: Owner of the counter
+        field: Counter field name
+        value: Minimum value the counter must hold
+    """
+    await db.counters.update_one(
+        {"_id": user_id},
+        {"$max": {field: value}},
+        upsert=True
+    )
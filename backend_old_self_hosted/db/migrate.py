@@ -0,0 +1,65 @@
+"""Apply pending schema migrations (replaces db/init_mongo.py)
+
+Migrations live in ``db/migrations`` as ``v<number>_<name>.py`` modules and
+are recorded in the ``schema_migrations`` collection once applied. Run it
+before starting a new version of the server, and on an empty database to
+create its indexes and seed data:
+
+    python -m db.migrate              apply everything pending
+    python -m db.migrate --status     list migrations and their state
+    python -m db.migrate --to 3       apply up to version 3
+
+Backfills on a live database can be slowed down with ``--max-rate``
+(documents per second); an interrupted run continues where it stopped.
+"""
+import argparse
+import asyncio
+import os
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from db.migrations.runner import MigrationError, MigrationRunner
+
+
+async def main(args) -> int:
+    mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+    db_name = os.environ.get('DB_NAME', 'mama_respira')
+
+    # No socket timeout: index builds and large batches can take a while
+    client = AsyncIOMotorClient(mongo_url)
+    runner = MigrationRunner(
+        client[db_name],
+        batch_size=args.batch_size,
+        max_rate=args.max_rate,
+        index_concurrency=args.index_concurrency
+    )
+    try:
+        if args.status:
+            for row in await runner.status():
+                applied_at = f" ({row['applied_at']:%Y-%m-%d %H:%M})" if row["applied_at"] else ""
+                print(f"{row['version']:03d} {row['status']:<8} {row['name']}{applied_at}")
+            return 0
+
+        print(f"Migrating database: {db_name}")
+        applied = await runner.run(args.to)
+        print(f"Applied {len(applied)} migration(s)" if applied else "Database is up to date")
+        return 0
+    except MigrationError as e:
+        print(f"Migration aborted: {e}")
+        return 1
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--status", action="store_true", help="List migrations and exit")
+    parser.add_argument("--to", type=int, default=None, help="Highest version to apply")
+    parser.add_argument("--batch-size", type=int, default=int(os.environ.get('MIGRATION_BATCH_SIZE', '1000')),
+                        help="Documents per backfill batch")
+    parser.add_argument("--max-rate", type=float, default=float(os.environ.get('MIGRATION_MAX_RATE', '0')),
+                        help="Backfill documents per second (0 = unthrottled)")
+    parser.add_argument("--index-concurrency", type=int, default=4,
+                        help="Collections indexed at the same time")
+
+    raise SystemExit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,118 @@
+"""Copy chat_messages into the bucketed chat_buckets layout
+
+Used when switching to ``CHAT_STORAGE=buckets``. Messages are streamed in
+(session_id, user_id, created_at) order and packed into documents of
+CHAT_BUCKET_SIZE messages each. Sessions that already have buckets are
+skipped, so the migration can be re-run after an interruption. The original
+chat_messages collection is left untouched; drop it once the bucket layout
+is serving traffic.
+
+Set DRY_RUN=1 to only report how many buckets would be written.
+
+Run from the backend folder: ``python -m db.migrate_chat_buckets``
+"""
+import asyncio
+import os
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from messaging.chat_store import BUCKET_MESSAGE_FIELDS
+
+# Buckets written per insert_many round trip
+INSERT_BATCH = 500
+
+
+def build_buckets(session_id: str, user_id: str, messages: list, bucket_size: int) -> list:
+    """
+    Pack one session's messages into bucket documents
+
+    Args:
+        session_id: Chat session
+        user_id: Owner of the session
+        messages: Message documents sorted by created_at
+        bucket_size: Maximum messages per bucket
+
+    Returns:
+        List of chat_buckets documents
+    """
+    buckets = []
+    for start in range(0, len(messages), bucket_size):
+        chunk = [{field: m.get(field) for field in BUCKET_MESSAGE_FIELDS} for m in messages[start:start + bucket_size]]
+        buckets.append({
+            "session_id": session_id,
+            "user_id": user_id,
+            "count": len(chunk),
+            "messages": chunk,
+            "first_at": chunk[0]["created_at"],
+            "last_at": chunk[-1]["created_at"]
+        })
+    return buckets
+
+
+async def migrate(mongo_url: str, db_name: str, bucket_size: int, dry_run: bool = False):
+    """
+    Write chat_buckets from chat_messages
+
+    Args:
+        mongo_url: MongoDB connection URL
+        db_name: Database name
+        bucket_size: Maximum messages per bucket
+        dry_run: Only report what would be written
+    """
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[db_name]
+
+    print("Creating indexes for chat_buckets...")
+    await db.chat_buckets.create_index([("session_id", 1), ("user_id", 1), ("first_at", -1)])
+    await db.chat_buckets.create_index([("session_id", 1), ("user_id", 1), ("count", 1)])
+
+    pending = []
+    stats = {"sessions": 0, "skipped": 0, "messages": 0, "buckets": 0}
+
+    async def flush():
+        if pending and not dry_run:
+            await db.chat_buckets.insert_many(pending, ordered=False)
+        stats["buckets"] += len(pending)
+        pending.clear()
+
+    async def finish_session(key, messages):
+        session_id, user_id = key
+        if await db.chat_buckets.find_one({"session_id": session_id, "user_id": user_id}, {"_id": 1}):
+            stats["skipped"] += 1
+            return
+        stats["sessions"] += 1
+        stats["messages"] += len(messages)
+        pending.extend(build_buckets(session_id, user_id, messages, bucket_size))
+        if len(pending) >= INSERT_BATCH:
+            await flush()
+
+    current_key = None
+    current = []
+    cursor = db.chat_messages.find({}, {"_id": 0}).sort(
+        [("session_id", 1), ("user_id", 1), ("created_at", 1)]
+    ).allow_disk_use(True)
+    async for message in cursor:
+        key = (message["session_id"], message["user_id"])
+        if key != current_key:
+            if current:
+                await finish_session(current_key, current)
+            current_key, current = key, []
+        current.append(message)
+    if current:
+        await finish_session(current_key, current)
+    await flush()
+
+    verb = "Would write" if dry_run else "Wrote"
+    print(f"{verb} {stats['buckets']} buckets for {stats['messages']} messages in "
+          f"{stats['sessions']} sessions ({stats['skipped']} sessions already migrated)")
+
+    print("Migration complete!")
+    client.close()
+
+
+if __name__ == "__main__":
+    mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+    db_name = os.environ.get('DB_NAME', 'mama_respira')
+    bucket_size = int(os.environ.get('CHAT_BUCKET_SIZE', '50'))
+    dry_run = os.environ.get('DRY_RUN', '').lower() in ('1', 'true', 'yes')
+
+    asyncio.run(migrate(mongo_url, db_name, bucket_size, dry_run))
@@ -0,0 +1 @@
+# Numbered schema migrations, applied by db/migrate.py
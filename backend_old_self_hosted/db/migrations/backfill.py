@@ -0,0 +1,145 @@
+"""Resumable, throttled batch updates over a whole collection"""
+import asyncio
+import inspect
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Union
+
+# Seconds between two progress lines
+PROGRESS_INTERVAL = 2.0
+
+Transform = Callable[[List[dict]], Union[list, Awaitable[list]]]
+
+
+class Progress:
+    """Prints scanned/total, throughput and ETA of a long-running pass"""
+
+    def __init__(self, label: str, total: int, done: int = 0):
+        """
+        Args:
+            label: Name printed in front of every line
+            total: Expected number of documents (an estimate is fine)
+            done: Documents already processed by an earlier, interrupted run
+        """
+        self.label = label
+        self.total = total
+        self.done = done
+        self._started = time.monotonic()
+        self._started_at = done
+        self._printed = 0.0
+
+    def update(self, done: int, force: bool = False) -> None:
+        """Record progress and print a line at most every PROGRESS_INTERVAL"""
+        self.done = done
+        now = time.monotonic()
+        if not force and now - self._printed < PROGRESS_INTERVAL:
+            return
+        self._printed = now
+        elapsed = max(now - self._started, 1e-6)
+        rate = (done - self._started_at) / elapsed
+        line = f"  {self.label}: {done:,}"
+        if self.total:
+            line += f"/{self.total:,} ({min(100.0, 100 * done / self.total):.1f}%)"
+        line += f", {rate:,.0f} docs/s"
+        if self.total and rate > 0 and done < self.total:
+            line += f", ETA {int((self.total - done) / rate)}s"
+        print(line, flush=True)
+
+
+class Throttle:
+    """Keeps a pass under a document rate by sleeping between batches"""
+
+    def __init__(self, max_rate: float = 0):
+        """
+        Args:
+            max_rate: Documents per second; 0 disables throttling
+        """
+        self.max_rate = max_rate
+        self._started = time.monotonic()
+        self._count = 0
+
+    async def wait(self, count: int) -> None:
+        """Account for ``count`` documents and sleep if ahead of the rate"""
+        self._count += count
+        if self.max_rate <= 0:
+            await asyncio.sleep(0)
+            return
+        ahead = self._count / self.max_rate - (time.monotonic() - self._started)
+        if ahead > 0:
+            await asyncio.sleep(ahead)
+
+
+async def backfill(
+    db,
+    collection: str,
+    transform: Transform,
+    query: Optional[dict] = None,
+    projection: Optional[dict] = None,
+    batch_size: int = 1000,
+    max_rate: float = 0,
+    resume: Optional[dict] = None,
+    checkpoint: Optional[Callable[[dict], Awaitable[None]]] = None,
+    label: Optional[str] = None
+) -> dict:
+    """
+    Rewrite the documents of a collection in ``_id`` order, batch by batch
+
+    Each batch is read with an ``_id`` range query (an index seek, however
+    far the pass has got), handed to ``transform`` and the returned write
+    operations are sent in one unordered ``bulk_write``. After every batch
+    the last ``_id`` and the counters are passed to ``checkpoint``; feeding
+    that state back through ``resume`` continues after the last completed
+    batch instead of starting over. ``transform`` must therefore be
+    idempotent: a batch interrupted between its write and its checkpoint
+    is processed again.
+
+    Args:
+        db: Motor database handle
+        collection: Collection to scan and write
+        transform: Receives a batch of documents, returns pymongo write
+            operations for the same collection (may be a coroutine)
+        query: Filter of the documents to visit (default all)
+        projection: Fields the transform needs (``_id`` is always included)
+        batch_size: Documents read per batch
+        max_rate: Documents per second; 0 means as fast as Mongo answers
+        resume: State saved by a previous checkpoint
+        checkpoint: Coroutine saving the state after each batch
+        label: Name for progress lines (default the collection)
+
+    Returns:
+        Final state: last_id, scanned, written
+    """
+    state: dict = dict(resume or {"last_id": None, "scanned": 0, "written": 0})
+    query = query or {}
+    projection = dict(projection) if projection else None
+    if projection is not None:
+        projection["_id"] = 1
+
+    coll = db[collection]
+    total = await (coll.count_documents(query) if query else coll.estimated_document_count())
+    progress = Progress(label or collection, total, state["scanned"])
+    throttle = Throttle(max_rate)
+
+    while True:
+        batch_query: Any = query
+        if state["last_id"] is not None:
+            batch_query = {"$and": [query, {"_id": {"$gt": state["last_id"]}}]}
+        docs = await coll.find(batch_query, projection).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not docs:
+            break
+
+        operations = transform(docs)
+        if inspect.isawaitable(operations):
+            operations = await operations
+        if operations:
+            await coll.bulk_write(operations, ordered=False)
+
+        state["last_id"] = docs[-1]["_id"]
+        state["scanned"] += len(docs)
+        state["written"] += len(operations or [])
+        if checkpoint:
+            await checkpoint(state)
+        progress.update(state["scanned"])
+        await throttle.wait(len(docs))
+
+    progress.update(state["scanned"], force=True)
+    return state
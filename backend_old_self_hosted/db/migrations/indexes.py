@@ -0,0 +1,32 @@
+"""Index builds for migrations, grouped per collection and run concurrently"""
+import asyncio
+from typing import Dict, List
+
+from pymongo import IndexModel
+
+
+async def build_indexes(db, specs: Dict[str, List[IndexModel]], concurrency: int = 4) -> None:
+    """
+    Create indexes on several collections at once
+
+    Every collection's indexes go out in a single ``createIndexes``
+    command, so the server builds them in one scan of the collection, and
+    up to ``concurrency`` collections are built at the same time. Builds do
+    not block reads or writes on the collection except briefly at their
+    start and end. Indexes that already exist with the same options are a
+    no-op; the same key with different options raises
+    ``OperationFailure`` (drop the old index in the migration first).
+
+    Args:
+        db: Motor database handle
+        specs: Collection name -> indexes to create on it
+        concurrency: Collections built at the same time
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def build(collection: str, models: List[IndexModel]):
+        async with semaphore:
+            print(f"  Building {len(models)} indexes on {collection}...")
+            await db[collection].create_indexes(models)
+
+    await asyncio.gather(*(build(collection, models) for collection, models in specs.items() if models))
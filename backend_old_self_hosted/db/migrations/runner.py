@@ -0,0 +1,294 @@
+"""Versioned migrations tracked in the schema_migrations collection"""
+import asyncio
+import importlib
+import os
+import pkgutil
+import re
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from pymongo import IndexModel, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from db.migrations.backfill import backfill
+from db.migrations.indexes import build_indexes
+
+MIGRATIONS_COLLECTION = "schema_migrations"
+# _id of the document serializing runners (migration records use integer ids)
+LOCK_ID = "lock"
+# A runner that stops refreshing its lock for this long is presumed dead
+LOCK_TTL = timedelta(minutes=2)
+
+# Migration modules are named v<number>_<name>.py
+_MODULE_NAME = re.compile(r"^v(\d+)_(\w+)$")
+
+
+class MigrationError(Exception):
+    """Raised when migrations cannot be applied"""
+
+
+class Migration:
+    """One numbered migration module"""
+
+    def __init__(self, version: int, name: str, module):
+        """
+        Args:
+            version: Number from the module name; migrations run in this order
+            name: Rest of the module name
+            module: Module defining ``async def up(ctx)``
+        """
+        self.version = version
+        self.name = name
+        self.module = module
+        self.description = ((module.__doc__ or "").strip().splitlines() or [name])[0]
+
+    async def up(self, ctx: "MigrationContext") -> None:
+        await self.module.up(ctx)
+
+
+def load_migrations() -> List[Migration]:
+    """
+    Import every migration module of this package
+
+    Returns:
+        Migrations sorted by version
+
+    Raises:
+        MigrationError: If two modules share a version number
+    """
+    package = importlib.import_module("db.migrations")
+    migrations: Dict[int, Migration] = {}
+    for info in pkgutil.iter_modules(package.__path__):
+        match = _MODULE_NAME.match(info.name)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise MigrationError(f"Two migrations numbered {version}: {migrations[version].name}, {match.group(2)}")
+        module = importlib.import_module(f"db.migrations.{info.name}")
+        migrations[version] = Migration(version, match.group(2), module)
+    return [migrations[version] for version in sorted(migrations)]
+
+
+class MigrationContext:
+    """
+    What a migration's ``up`` gets: the database and rollout settings
+
+    Helpers record their progress in the migration's ``schema_migrations``
+    document, so a run that was interrupted resumes where it stopped.
+    """
+
+    def __init__(self, db, record_id: int, progress: dict, batch_size: int, max_rate: float, index_concurrency: int):
+        """
+        Args:
+            db: Motor database handle
+            record_id: Version of the running migration
+            progress: Checkpoints saved by an earlier attempt
+            batch_size: Documents per backfill batch
+            max_rate: Backfill documents per second (0 = unthrottled)
+            index_concurrency: Collections indexed at the same time
+        """
+        self.db = db
+        self.record_id = record_id
+        self.progress = progress
+        self.batch_size = batch_size
+        self.max_rate = max_rate
+        self.index_concurrency = index_concurrency
+
+    async def create_indexes(self, specs: Dict[str, List[IndexModel]]) -> None:
+        """Build indexes, one command per collection, several collections at once"""
+        await build_indexes(self.db, specs, self.index_concurrency)
+
+    async def save_checkpoint(self, key: str, value) -> None:
+        """Persist resume state under ``key`` for a later attempt"""
+        self.progress[key] = value
+        await self.db[MIGRATIONS_COLLECTION].update_one(
+            {"_id": self.record_id},
+            {"$set": {f"progress.{key}": value}}
+        )
+
+    async def backfill(self, collection: str, transform, query: Optional[dict] = None,
+                       projection: Optional[dict] = None, key: Optional[str] = None) -> dict:
+        """
+        Resumable, throttled batch rewrite of a collection (see ``backfill.backfill``)
+
+        Args:
+            collection: Collection to scan and write
+            transform: Batch of documents -> write operations
+            query: Filter of the documents to visit
+            projection: Fields the transform needs
+            key: Checkpoint name, when a migration runs several passes
+
+        Returns:
+            Final state: last_id, scanned, written
+        """
+        key = key or collection
+
+        async def checkpoint(state: dict):
+            await self.save_checkpoint(key, state)
+
+        return await backfill(
+            self.db, collection, transform,
+            query=query, projection=projection,
+            batch_size=self.batch_size, max_rate=self.max_rate,
+            resume=self.progress.get(key), checkpoint=checkpoint, label=key
+        )
+
+
+class MigrationRunner:
+    """
+    Applies pending migrations in order, one runner at a time
+
+    Each migration gets a ``schema_migrations`` document keyed by its
+    version, ``running`` while it executes and ``applied`` once ``up``
+    returns; applied versions are never run again. A failed or interrupted
+    migration stays ``running`` with its checkpoints and is retried by the
+    next run, so every ``up`` must be safe to repeat. A lock document with
+    a refreshed expiry keeps two deploys from migrating at the same time.
+    """
+
+    def __init__(self, db, migrations: Optional[List[Migration]] = None, batch_size: int = 1000,
+                 max_rate: float = 0, index_concurrency: int = 4):
+        """
+        Args:
+            db: Motor database handle
+            migrations: Migrations to consider (default every module of the package)
+            batch_size: Documents per backfill batch
+            max_rate: Backfill documents per second (0 = unthrottled)
+            index_concurrency: Collections indexed at the same time
+        """
+        self.db = db
+        self.collection = db[MIGRATIONS_COLLECTION]
+        self.migrations = migrations if migrations is not None else load_migrations()
+        self.batch_size = batch_size
+        self.max_rate = max_rate
+        self.index_concurrency = index_concurrency
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def applied_versions(self) -> Dict[int, dict]:
+        """Records of applied migrations by version"""
+        records = await self.collection.find({"status": "applied"}).to_list(None)
+        return {record["_id"]: record for record in records}
+
+    async def pending(self) -> List[Migration]:
+        """Migrations not applied yet, in order"""
+        applied = await self.applied_versions()
+        return [m for m in self.migrations if m.version not in applied]
+
+    async def status(self) -> List[dict]:
+        """
+        State of every known migration
+
+        Returns:
+            One dictionary per migration: version, name, description,
+            status (applied, running or pending) and applied_at
+        """
+        records = {r["_id"]: r for r in await self.collection.find({"_id": {"$type": "number"}}).to_list(None)}
+        return [
+            {
+                "version": m.version,
+                "name": m.name,
+                "description": m.description,
+                "status": records.get(m.version, {}).get("status", "pending"),
+                "applied_at": records.get(m.version, {}).get("applied_at"),
+            }
+            for m in self.migrations
+        ]
+
+    async def _acquire_lock(self) -> None:
+        now = datetime.now(timezone.utc)
+        try:
+            await self.collection.find_one_and_update(
+                {"_id": LOCK_ID, "$or": [{"owner": self.owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + LOCK_TTL, "acquired_at": now}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            lock = await self.collection.find_one({"_id": LOCK_ID}) or {}
+            raise MigrationError(
+                f"Another runner holds the migration lock ({lock.get('owner')}, "
+                f"expires {lock.get('expires_at')})"
+            )
+
+    async def _refresh_lock(self) -> None:
+        while True:
+            await asyncio.sleep(LOCK_TTL.total_seconds() / 4)
+            await self.collection.update_one(
+                {"_id": LOCK_ID, "owner": self.owner},
+                {"$set": {"expires_at": datetime.now(timezone.utc) + LOCK_TTL}}
+            )
+
+    async def _release_lock(self) -> None:
+        await self.collection.delete_one({"_id": LOCK_ID, "owner": self.owner})
+
+    async def run(self, target: Optional[int] = None) -> List[Migration]:
+        """
+        Apply pending migrations up to ``target``
+
+        Args:
+            target: Highest version to apply (default all)
+
+        Returns:
+            Migrations applied by this call
+
+        Raises:
+            MigrationError: If another runner holds the lock
+        """
+        await self._acquire_lock()
+        refresher = asyncio.create_task(self._refresh_lock())
+        applied = []
+        try:
+            for migration in await self.pending():
+                if target is not None and migration.version > target:
+                    break
+                await self._apply(migration)
+                applied.append(migration)
+        finally:
+            refresher.cancel()
+            await asyncio.gather(refresher, return_exceptions=True)
+            await self._release_lock()
+        return applied
+
+    async def _apply(self, migration: Migration) -> None:
+        now = datetime.now(timezone.utc)
+        record = await self.collection.find_one_and_update(
+            {"_id": migration.version},
+            {
+                "$set": {"name": migration.name, "status": "running", "owner": self.owner},
+                "$setOnInsert": {"started_at": now},
+                "$inc": {"attempts": 1},
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        resumed = " (resuming)" if record.get("progress") else ""
+        print(f"Applying {migration.version:03d} {migration.name}: {migration.description}{resumed}")
+
+        ctx = MigrationContext(
+            self.db, migration.version, dict(record.get("progress") or {}),
+            self.batch_size, self.max_rate, self.index_concurrency
+        )
+        started = time.monotonic()
+        try:
+            await migration.up(ctx)
+        except Exception as e:
+            await self.collection.update_one(
+                {"_id": migration.version},
+                {"$set": {"last_error": f"{type(e).__name__}: {e}"}}
+            )
+            raise
+        await self.collection.update_one(
+            {"_id": migration.version},
+            {
+                "$set": {
+                    "status": "applied",
+                    "applied_at": datetime.now(timezone.utc),
+                    "duration_s": round(time.monotonic() - started, 1),
+                },
+                "$unset": {"owner": "", "last_error": ""},
+            }
+        )
+        print(f"Applied {migration.version:03d} {migration.name} in {time.monotonic() - started:.1f}s")
@@ -0,0 +1,77 @@
+"""Indexes of every collection
+
+The indexes ``db/init_mongo.py`` used to create one by one, except the
+unique (user_id, date) bitácora index, which needs duplicates removed
+first (see v002). On a database set up by that script they all exist
+already and the build is a no-op.
+"""
+from pymongo import ASCENDING as ASC, DESCENDING as DESC, IndexModel
+
+INDEXES = {
+    "users": [
+        IndexModel("user_id", unique=True),
+        IndexModel("email", unique=True),
+        IndexModel("role"),
+        IndexModel("push_tokens", sparse=True),
+    ],
+    "user_sessions": [
+        IndexModel("session_token", unique=True),
+        IndexModel("user_id"),
+        IndexModel("expires_at"),
+    ],
+    "checkins": [
+        IndexModel([("user_id", ASC), ("created_at", DESC)]),
+        IndexModel("id", unique=True),
+        IndexModel([("user_id", ASC), ("updated_at", ASC)]),
+        IndexModel(
+            [("user_id", ASC), ("client_id", ASC)],
+            unique=True,
+            partialFilterExpression={"client_id": {"$type": "string"}}
+        ),
+        IndexModel("ai_pending", partialFilterExpression={"ai_pending": True}),
+    ],
+    "chat_messages": [
+        IndexModel([("session_id", ASC), ("created_at", ASC)]),
+        IndexModel([("user_id", ASC), ("created_at", DESC)]),
+    ],
+    # CHAT_STORAGE=buckets
+    "chat_buckets": [
+        IndexModel([("session_id", ASC), ("user_id", ASC), ("first_at", DESC)]),
+        IndexModel([("session_id", ASC), ("user_id", ASC), ("count", ASC)]),
+    ],
+    "direct_messages": [
+        IndexModel([("sender_id", ASC), ("created_at", DESC)]),
+        IndexModel([("receiver_id", ASC), ("created_at", DESC)]),
+        IndexModel([("receiver_id", ASC), ("sender_id", ASC), ("created_at", DESC)]),
+    ],
+    "read_marks": [
+        IndexModel([("reader_id", ASC), ("other_id", ASC)], unique=True),
+    ],
+    "bitacoras": [
+        IndexModel([("user_id", ASC), ("created_at", DESC)]),
+        IndexModel("id", unique=True),
+        IndexModel([("user_id", ASC), ("updated_at", ASC)]),
+        IndexModel("ai_pending", partialFilterExpression={"ai_pending": True}),
+        IndexModel("summary_batch", sparse=True),
+        IndexModel([("user_id", ASC), ("date", DESC), ("laid_down_for_bed_min", ASC)]),
+    ],
+    "summary_batches": [
+        IndexModel("id", unique=True),
+        IndexModel("status"),
+    ],
+    "client_assignments": [
+        IndexModel("client_id", unique=True),
+        IndexModel([("coach_id", ASC), ("assigned_at", DESC)]),
+    ],
+    "crisis_alerts": [
+        IndexModel("id", unique=True),
+        IndexModel([("coach_id", ASC), ("acknowledged_at", ASC), ("created_at", DESC)]),
+    ],
+    "validation_cards": [
+        IndexModel("category"),
+    ],
+}
+
+
+async def up(ctx):
+    await ctx.create_indexes(INDEXES)
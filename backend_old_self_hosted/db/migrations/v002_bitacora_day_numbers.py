@@ -0,0 +1,117 @@
+"""Fix duplicated bitácora day numbers and make (user_id, date) unique
+
+Before the atomic counter existed, ``day_number`` was derived from
+``count_documents`` at save time, so concurrent saves could share a number
+and saving the same date twice created a second entry, also when it was
+written differently ("12/03/2024" and "2024-03-12"). Per user, this:
+
+1. Normalizes dates to YYYY-MM-DD (unparseable ones are kept as they are)
+2. Collapses entries sharing the same day, keeping the most recently
+   updated; the others are copied to ``bitacoras_duplicates`` first
+3. Renumbers the remaining entries 1..n in date order
+4. Seeds ``counters.<user_id>.bitacora_day`` so new saves continue at n + 1
+
+and finally replaces the (user_id, date) index with a unique one so the
+upsert path in ``create_bitacora`` cannot produce duplicates again. Users
+are processed in user_id order with a checkpoint after each batch.
+"""
+from pymongo import ASCENDING as ASC, DESCENDING as DESC, DeleteOne, IndexModel, ReplaceOne, UpdateOne
+
+from bitacora.times import normalize_date
+from db.counters import BITACORA_DAY_FIELD, set_counter_floor
+from db.migrations.backfill import Progress, Throttle
+
+BITACORA_DATE_INDEX = [("user_id", ASC), ("date", DESC)]
+# Entries removed as duplicates, kept whole so nothing logged is lost
+DUPLICATES_COLLECTION = "bitacoras_duplicates"
+
+
+def plan_user_fixes(entries: list) -> tuple:
+    """
+    Compute the writes needed to fix one user's bitácoras
+
+    Args:
+        entries: The user's bitácora documents (must include _id, date,
+            day_number and updated_at/created_at)
+
+    Returns:
+        Tuple of (_ids of the duplicates to remove, list of pymongo update
+        operations for the entries kept, final day count)
+    """
+    latest_by_date = {}
+    removed = []
+    for entry in entries:
+        day = normalize_date(entry["date"]) or entry["date"]
+        current = latest_by_date.get(day)
+        if current is None:
+            latest_by_date[day] = entry
+            continue
+        entry_ts = entry.get("updated_at") or entry.get("created_at")
+        current_ts = current.get("updated_at") or current.get("created_at")
+        if entry_ts and (not current_ts or entry_ts > current_ts):
+            latest_by_date[day] = entry
+            removed.append(current["_id"])
+        else:
+            removed.append(entry["_id"])
+
+    operations = []
+    for day_number, day in enumerate(sorted(latest_by_date), 1):
+        entry = latest_by_date[day]
+        fixes = {}
+        if entry["date"] != day:
+            fixes["date"] = day
+        if entry.get("day_number") != day_number:
+            fixes["day_number"] = day_number
+        if fixes:
+            operations.append(UpdateOne({"_id": entry["_id"]}, {"$set": fixes}))
+
+    return removed, operations, len(latest_by_date)
+
+
+async def up(ctx):
+    db = ctx.db
+    state = ctx.progress.get("users") or {"last_user": None, "users": 0, "deleted": 0, "renumbered": 0}
+    user_ids = sorted(await db.bitacoras.distinct("user_id"))
+    if state["last_user"] is not None:
+        user_ids = [user_id for user_id in user_ids if user_id > state["last_user"]]
+
+    progress = Progress("bitacoras by user", state["users"] + len(user_ids), state["users"])
+    throttle = Throttle(ctx.max_rate)
+    for user_id in user_ids:
+        entries = await db.bitacoras.find(
+            {"user_id": user_id},
+            {"_id": 1, "date": 1, "day_number": 1, "created_at": 1, "updated_at": 1}
+        ).sort("date", 1).to_list(None)
+
+        removed, operations, day_count = plan_user_fixes(entries)
+        if removed:
+            # Copied before deleting; keyed by _id so a resumed run copies again harmlessly
+            duplicates = await db.bitacoras.find({"_id": {"$in": removed}}).to_list(None)
+            await db[DUPLICATES_COLLECTION].bulk_write(
+                [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in duplicates], ordered=False
+            )
+        # Duplicates go first so a kept entry never takes a date still in use
+        writes = [DeleteOne({"_id": _id}) for _id in removed] + operations
+        if writes:
+            await db.bitacoras.bulk_write(writes, ordered=True)
+        await set_counter_floor(db, user_id, BITACORA_DAY_FIELD, day_count)
+
+        state["last_user"] = user_id
+        state["users"] += 1
+        state["deleted"] += len(removed)
+        state["renumbered"] += len(operations)
+        if state["users"] % 100 == 0:
+            await ctx.save_checkpoint("users", state)
+        progress.update(state["users"])
+        await throttle.wait(len(entries))
+    await ctx.save_checkpoint("users", state)
+    progress.update(state["users"], force=True)
+    print(f"  Duplicate entries moved to {DUPLICATES_COLLECTION}: {state['deleted']}, "
+          f"entries renumbered or redated: {state['renumbered']}")
+
+    indexes = await db.bitacoras.index_information()
+    for name, info in indexes.items():
+        if info["key"] == BITACORA_DATE_INDEX and not info.get("unique"):
+            print(f"  Dropping non-unique index {name}...")
+            await db.bitacoras.drop_index(name)
+    await ctx.create_indexes({"bitacoras": [IndexModel(BITACORA_DATE_INDEX, unique=True)]})
@@ -0,0 +1,50 @@
+"""Backfill minutes-since-midnight fields on existing bitácoras
+
+Bitácora times used to be stored only as free-form strings. New entries
+also carry ``*_min`` integer fields (minutes since midnight) and a
+normalized YYYY-MM-DD ``date``. This parses the strings of existing
+entries and writes the missing fields batch by batch. Unparseable strings
+are left as they are.
+
+Dates were already normalized (and same-day duplicates collapsed) by
+migration 002, so the date step only catches entries saved since. One that
+would collide with a date the user already has is left as is, since the
+(user_id, date) index is unique.
+"""
+from pymongo import UpdateOne
+
+from bitacora.times import BITACORA_CLOCK_FIELDS, NAP_FIELDS, clock_updates
+
+
+async def up(ctx):
+    db = ctx.db
+    projection = {"user_id": 1, "date": 1, "night_wakings": 1}
+    for text_field, minutes_field in BITACORA_CLOCK_FIELDS:
+        projection[text_field] = 1
+        projection[minutes_field] = 1
+    for nap_field in NAP_FIELDS:
+        projection[nap_field] = 1
+
+    existing_dates = set()
+    async for doc in db.bitacoras.find({}, {"_id": 0, "user_id": 1, "date": 1}):
+        existing_dates.add((doc.get("user_id"), doc.get("date")))
+    conflicts = 0
+
+    def transform(docs):
+        nonlocal conflicts
+        operations = []
+        for doc in docs:
+            updates = clock_updates(doc)
+            new_date = updates.get("date")
+            if new_date:
+                if (doc.get("user_id"), new_date) in existing_dates:
+                    conflicts += 1
+                    del updates["date"]
+                else:
+                    existing_dates.add((doc.get("user_id"), new_date))
+            if updates:
+                operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": updates}))
+        return operations
+
+    state = await ctx.backfill("bitacoras", transform, projection=projection)
+    print(f"  Updated {state['written']} of {state['scanned']} bitácoras ({conflicts} date conflicts left as is)")
@@ -0,0 +1,45 @@
+"""Assign every existing client to a coach
+
+Clients used to be implicitly served by the single coach found with
+``find_one({"role": "coach"})``. Messaging and the coach dashboard are
+scoped to ``client_assignments``, so every unassigned non-coach user is
+assigned to a coach, round-robin when there is more than one. Clients
+that already have a coach keep them.
+"""
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+
+
+async def up(ctx):
+    db = ctx.db
+    coaches = await db.users.find({"role": "coach"}, {"_id": 0, "user_id": 1}).sort("created_at", 1).to_list(None)
+    if not coaches:
+        print("  No coach accounts found - nothing to assign")
+        return
+
+    assigned = set(await db.client_assignments.distinct("client_id"))
+    now = datetime.now(timezone.utc)
+    index = 0
+
+    # The writes go to another collection, so they are sent here and the
+    # backfill itself writes nothing to users
+    async def assign(users):
+        nonlocal index
+        operations = []
+        for user in users:
+            if user["user_id"] in assigned:
+                continue
+            coach_id = coaches[index % len(coaches)]["user_id"]
+            index += 1
+            operations.append(UpdateOne(
+                {"client_id": user["user_id"]},
+                {"$setOnInsert": {"coach_id": coach_id, "assigned_at": now}},
+                upsert=True
+            ))
+        if operations:
+            await db.client_assignments.bulk_write(operations, ordered=False)
+        return []
+
+    await ctx.backfill("users", assign, query={"role": {"$ne": "coach"}}, projection={"user_id": 1})
+    print(f"  Assigned {index} clients to {len(coaches)} coach(es)")
@@ -0,0 +1,33 @@
+"""Seed read_marks from the legacy per-message read flags
+
+Direct messages used to carry a ``read`` boolean flipped with
+``update_many`` on every conversation fetch. Read state lives in
+``read_marks`` as one high-water mark per (reader_id, other_id), seeded
+here from the newest message each reader had already read, so existing
+conversations do not suddenly show up as unread. ``$max`` makes it safe
+to repeat.
+"""
+from pymongo import UpdateOne
+
+
+async def up(ctx):
+    db = ctx.db
+    rows = await db.direct_messages.aggregate([
+        {"$match": {"read": True}},
+        {"$group": {
+            "_id": {"reader_id": "$receiver_id", "other_id": "$sender_id"},
+            "last_read_at": {"$max": "$created_at"}
+        }}
+    ], allowDiskUse=True).to_list(None)
+
+    operations = [
+        UpdateOne(
+            {"reader_id": row["_id"]["reader_id"], "other_id": row["_id"]["other_id"]},
+            {"$max": {"last_read_at": row["last_read_at"]}},
+            upsert=True
+        )
+        for row in rows
+    ]
+    for start in range(0, len(operations), ctx.batch_size):
+        await db.read_marks.bulk_write(operations[start:start + ctx.batch_size], ordered=False)
+    print(f"  Seeded {len(operations)} read marks")
@@ -0,0 +1,34 @@
+"""Seed the default validation cards into an empty collection"""
+import uuid
+from datetime import datetime, timezone
+
+# Default validation cards
+DEFAULT_VALIDATIONS = [
+    {"message_es": "No lo estás haciendo mal. 9 de cada 10 mamás se sienten exactamente así ahora mismo.", "category": "general"},
+    {"message_es": "Tu bebé te eligió como su mamá por una razón. Eres suficiente.", "category": "general"},
+    {"message_es": "Las noches difíciles no definen tu maternidad. Son solo noches.", "category": "sleep"},
+    {"message_es": "Está bien sentirse abrumada. Esto pasará.", "category": "general"},
+    {"message_es": "Tu bebé no necesita una mamá perfecta. Solo te necesita a ti.", "category": "general"},
+    {"message_es": "El llanto de tu bebé no es tu culpa. Los bebés lloran, es su forma de comunicarse.", "category": "crying"},
+    {"message_es": "Cada día que sobrevives es un día de éxito. Literalmente.", "category": "general"},
+    {"message_es": "No estás sola. Hay miles de mamás despiertas contigo ahora mismo.", "category": "general"},
+    {"message_es": "Pedir ayuda no es debilidad. Es inteligencia.", "category": "self_care"},
+    {"message_es": "Tu cuerpo acaba de crear vida. Mereces descanso y compasión.", "category": "self_care"},
+    {"message_es": "Algunas noches el único logro es sobrevivir. Y eso está perfecto.", "category": "sleep"},
+    {"message_es": "El amor que sientes por tu bebé, aunque estés agotada, es todo lo que necesita.", "category": "general"},
+    {"message_es": "Respira. Este momento pasará. Mañana será un nuevo día.", "category": "general"},
+    {"message_es": "No tienes que disfrutar cada momento para ser buena mamá.", "category": "general"},
+    {"message_es": "La lactancia es difícil. Sea cual sea tu camino, está bien.", "category": "feeding"},
+]
+
+
+async def up(ctx):
+    db = ctx.db
+    count = await db.validation_cards.count_documents({})
+    if count:
+        print(f"  Validation cards already exist ({count} cards)")
+        return
+    now = datetime.now(timezone.utc)
+    cards = [{**card, "id": str(uuid.uuid4()), "created_at": now} for card in DEFAULT_VALIDATIONS]
+    await db.validation_cards.insert_many(cards)
+    print(f"  Inserted {len(cards)} validation cards")
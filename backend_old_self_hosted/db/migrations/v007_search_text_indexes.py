@@ -0,0 +1,11 @@
+"""Spanish text indexes for coach search
+
+Built in their own step: on large bitácora, check-in and message
+collections these are the slowest indexes, and the three collections are
+built concurrently.
+"""
+from messaging.search import text_index_models
+
+
+async def up(ctx):
+    await ctx.create_indexes(text_index_models())
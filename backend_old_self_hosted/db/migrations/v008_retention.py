@@ -0,0 +1,39 @@
+"""TTL on user_sessions and indexes of the archive collections
+
+``user_sessions.expires_at`` had a plain index, so expired sessions were
+never removed. It becomes a TTL index (``expireAfterSeconds=0``: Mongo
+deletes each session once its ``expires_at`` has passed). The existing
+index is converted in place with ``collMod`` where the server supports it,
+otherwise dropped and rebuilt.
+"""
+from pymongo import ASCENDING as ASC, DESCENDING as DESC, IndexModel
+from pymongo.errors import OperationFailure
+
+INDEXES = {
+    "user_sessions": [
+        IndexModel("expires_at", expireAfterSeconds=0),
+    ],
+    "chat_archive": [
+        IndexModel([("session_id", ASC), ("user_id", ASC), ("first_id", ASC)], unique=True),
+        IndexModel([("session_id", ASC), ("user_id", ASC), ("last_at", DESC)]),
+    ],
+    "checkins_archive": [
+        IndexModel([("user_id", ASC), ("created_at", DESC)]),
+    ],
+    "direct_messages_archive": [
+        IndexModel([("receiver_id", ASC), ("sender_id", ASC), ("created_at", DESC)]),
+    ],
+}
+
+
+async def up(ctx):
+    db = ctx.db
+    current = (await db.user_sessions.index_information()).get("expires_at_1")
+    if current and "expireAfterSeconds" not in current:
+        try:
+            await db.command("collMod", "user_sessions", index={"keyPattern": {"expires_at": 1}, "expireAfterSeconds": 0})
+            print("  Converted user_sessions.expires_at_1 to a TTL index")
+        except OperationFailure:
+            print("  Dropping user_sessions.expires_at_1 to rebuild it as a TTL index...")
+            await db.user_sessions.drop_index("expires_at_1")
+    await ctx.create_indexes(INDEXES)
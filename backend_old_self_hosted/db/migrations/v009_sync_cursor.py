@@ -0,0 +1,21 @@
+"""Indexes of the (updated_at, id) sync pull cursor
+
+Pulls page through check-ins and bitácoras in ``(updated_at, id)`` order,
+since entries written by one batch share ``updated_at``. The new indexes
+serve that sort and make the ``(user_id, updated_at)`` ones redundant, which
+are dropped once the replacements exist.
+"""
+from pymongo import ASCENDING as ASC, IndexModel
+
+SYNC_COLLECTIONS = ("checkins", "bitacoras")
+
+
+async def up(ctx):
+    await ctx.create_indexes({
+        collection: [IndexModel([("user_id", ASC), ("updated_at", ASC), ("id", ASC)])]
+        for collection in SYNC_COLLECTIONS
+    })
+    for collection in SYNC_COLLECTIONS:
+        if "user_id_1_updated_at_1" in await ctx.db[collection].index_information():
+            print(f"  Dropping {collection}.user_id_1_updated_at_1 (covered by the cursor index)")
+            await ctx.db[collection].drop_index("user_id_1_updated_at_1")
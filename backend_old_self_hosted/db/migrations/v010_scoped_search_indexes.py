@@ -0,0 +1,23 @@
+"""Replace the coach search text indexes with client-prefixed ones
+
+The text indexes of migration 007 covered every user, so a common term
+matched entries of all users before the caseload filter and the textScore
+sort ran. The new indexes start with the client (``user_id``, or
+``sender_id``/``receiver_id`` for messages) and search queries each client
+by equality. A collection holds a single text index, so the old one is
+dropped first; coach search fails on a collection until its new index is
+built.
+"""
+from messaging.search import SEARCH_SOURCES, text_index_models
+
+
+async def up(ctx):
+    models = text_index_models()
+    for collection, field in SEARCH_SOURCES.values():
+        new_name = models[collection][0].document["name"]
+        for name, info in (await ctx.db[collection].index_information()).items():
+            is_text = any(kind == "text" for _, kind in info["key"])
+            if is_text and name != new_name:
+                print(f"  Dropping {collection}.{name} (unscoped text index)")
+                await ctx.db[collection].drop_index(name)
+    await ctx.create_indexes(models)
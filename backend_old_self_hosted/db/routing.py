@@ -0,0 +1,117 @@
+"""Read-preference routing of database reads by workload"""
+import asyncio
+import os
+from typing import Dict
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.read_preferences import Primary, SecondaryPreferred
+
+# Workloads whose reads may be served by a secondary a little behind the
+# primary. Everything else (what a mother or a coach just wrote and expects
+# to see, and every read that precedes a write) stays on the primary.
+PRIMARY = "primary"
+ANALYTICS = "analytics"
+SEARCH = "search"
+EXPORT = "export"
+SECONDARY_WORKLOADS = (ANALYTICS, SEARCH, EXPORT)
+
+# The server rejects maxStalenessSeconds below 90
+MIN_MAX_STALENESS = 90
+
+
+class ReadRouter:
+    """
+    Database handles with the read preference of each workload
+
+    Secondary workloads read with ``secondaryPreferred`` bounded by
+    ``maxStalenessSeconds``: a secondary lagging further behind is not
+    picked, and without a suitable secondary (a single-node replica set, a
+    standalone server, every secondary lagging) the read goes to the
+    primary. Heavy coach queries thus stop competing with chat and
+    check-in writes whenever secondaries exist, with no change elsewhere.
+    The handles share the client's connection pools.
+    """
+
+    def __init__(self, db, enabled: bool = True, max_staleness: int = 120):
+        """
+        Args:
+            db: Motor database handle (reads from the primary)
+            enabled: When False every workload reads from the primary
+            max_staleness: Seconds of replication lag tolerated by secondary
+                workloads (at least 90)
+        """
+        self.enabled = enabled
+        self.max_staleness = max(MIN_MAX_STALENESS, max_staleness)
+        self._databases: Dict[str, object] = {PRIMARY: db.with_options(read_preference=Primary())}
+        for workload in SECONDARY_WORKLOADS:
+            preference = SecondaryPreferred(max_staleness=self.max_staleness) if enabled else Primary()
+            self._databases[workload] = db.with_options(read_preference=preference)
+
+    def db_for(self, workload: str):
+        """
+        Database handle for a workload
+
+        Args:
+            workload: PRIMARY, ANALYTICS, SEARCH or EXPORT
+
+        Returns:
+            Motor database handle with the workload's read preference
+        """
+        return self._databases[workload]
+
+    async def probe(self) -> Dict[str, dict]:
+        """
+        Ask the server each workload's reads would reach who it is
+
+        Runs ``hello`` with every workload's read preference, so the answer
+        comes from the member that workload's queries are sent to.
+
+        Returns:
+            Workload -> {"member": host:port, "role": primary, secondary or other}
+        """
+        result = {}
+        for workload, db in self._databases.items():
+            hello = await db.command("hello", read_preference=db.read_preference)
+            role = "primary" if hello.get("isWritablePrimary") else "secondary" if hello.get("secondary") else "other"
+            result[workload] = {"member": hello.get("me", "(standalone)"), "role": role}
+        return result
+
+    def snapshot(self) -> dict:
+        """Read preference of every workload, for the metrics endpoint"""
+        return {
+            workload: db.read_preference.document
+            for workload, db in self._databases.items()
+        }
+
+
+def create_read_router(db) -> ReadRouter:
+    """
+    Build the router from MONGO_SECONDARY_READS and MONGO_MAX_STALENESS_SECONDS
+
+    Args:
+        db: Motor database handle
+
+    Returns:
+        ReadRouter
+    """
+    return ReadRouter(
+        db,
+        enabled=os.environ.get('MONGO_SECONDARY_READS', 'true').lower() in ('1', 'true', 'yes'),
+        max_staleness=int(os.environ.get('MONGO_MAX_STALENESS_SECONDS', '120'))
+    )
+
+
+async def main():
+    """Print where each workload's reads go (``python -m db.routing``)"""
+    client = AsyncIOMotorClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017'))
+    router = create_read_router(client[os.environ.get('DB_NAME', 'mama_respira')])
+    try:
+        for workload, target in (await router.probe()).items():
+            preference = router.db_for(workload).read_preference.document
+            print(f"{workload:<10} {target['role']:<10} {target['member']:<24} {preference}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1 @@
+# Runtime diagnostics module
@@ -0,0 +1,121 @@
+"""Event-loop lag measurement and stall detection"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from typing import List, Optional
+
+from diagnostics.stacks import format_stack
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes up and catches what blocks it
+
+    A task sleeps for ``interval`` in a loop; how much later than asked it
+    wakes up is the lag every other coroutine suffered at that moment, kept
+    in a window for percentiles. Each wake-up also refreshes a heartbeat.
+    A watchdog thread checks the heartbeat and, when the loop has not come
+    back for longer than ``stall_threshold``, captures the loop thread's
+    stack while it is still stuck and logs it: that is the callback
+    blocking the loop (bcrypt, a large validation, a sync client call...).
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        stall_threshold: float = 0.25,
+        window: int = 3000,
+        recent_stalls: int = 20
+    ):
+        """
+        Args:
+            interval: Seconds between lag measurements
+            stall_threshold: Extra delay after which the loop counts as stalled
+            window: Lag samples kept for percentiles
+            recent_stalls: Stall reports kept for the debug endpoint
+        """
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.lags = deque(maxlen=window)
+        self.stalls = 0
+        self._recent: deque = deque(maxlen=recent_stalls)
+        self._recent_lock = threading.Lock()
+        self._heartbeat = time.monotonic()
+        self.loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start measuring (call from the running event loop)"""
+        self.loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._measure())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop the measuring task and the watchdog thread"""
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._watchdog:
+            await asyncio.to_thread(self._watchdog.join, 1.0)
+
+    async def _measure(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.lags.append(max(0.0, now - started - self.interval))
+            self._heartbeat = now
+
+    def _watch(self) -> None:
+        reported_heartbeat = None
+        check_every = min(self.interval, self.stall_threshold) / 2
+        while not self._stop.wait(check_every):
+            heartbeat = self._heartbeat
+            blocked_for = time.monotonic() - heartbeat - self.interval
+            if blocked_for <= self.stall_threshold or heartbeat == reported_heartbeat:
+                continue
+            # One report per stall, taken while the loop is still blocked
+            reported_heartbeat = heartbeat
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = format_stack(frame) if frame is not None else "  (no frame)"
+            with self._recent_lock:
+                self.stalls += 1
+                self._recent.append({
+                    "at": time.time(),
+                    "blocked_ms": round(blocked_for * 1000, 1),
+                    "stack": stack.splitlines(),
+                })
+            logger.warning(f"Event loop blocked for over {blocked_for * 1000:.0f}ms in:\n{stack}")
+
+    def recent_stalls(self) -> List[dict]:
+        """Latest stall reports (time, blocked_ms when detected, stack), newest last"""
+        with self._recent_lock:
+            return list(self._recent)
+
+    def snapshot(self) -> dict:
+        """Lag percentiles and stall counts, for the metrics endpoint"""
+        ordered: List[float] = sorted(self.lags)
+
+        def percentile(pct):
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct))] * 1000, 2) if ordered else None
+
+        return {
+            "samples": len(ordered),
+            "lag_p50_ms": percentile(0.5),
+            "lag_p95_ms": percentile(0.95),
+            "lag_p99_ms": percentile(0.99),
+            "lag_max_ms": round(ordered[-1] * 1000, 2) if ordered else None,
+            "stalls": self.stalls,
+            "stall_threshold_ms": self.stall_threshold * 1000,
+        }
@@ -0,0 +1,91 @@
+"""Sampling of live Python stacks, in the folded format flame graph tools read"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+# Paths under these prefixes are shortened to their package-relative form
+_BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+_SITE_MARKERS = ("site-packages" + os.sep, "dist-packages" + os.sep)
+
+
+def _short_path(filename: str) -> str:
+    if filename.startswith(_BACKEND_ROOT):
+        return filename[len(_BACKEND_ROOT):]
+    for marker in _SITE_MARKERS:
+        index = filename.rfind(marker)
+        if index >= 0:
+            return filename[index + len(marker):]
+    return os.path.basename(filename)
+
+
+def frame_labels(frame, limit: int = 128) -> List[str]:
+    """
+    Describe a stack from the outermost frame to ``frame``
+
+    Args:
+        frame: Innermost frame
+        limit: Maximum frames kept (innermost ones win)
+
+    Returns:
+        Labels like ``login (server.py:690)``, outermost first
+    """
+    labels = []
+    while frame is not None and len(labels) < limit:
+        code = frame.f_code
+        labels.append(f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def format_stack(frame, limit: int = 20) -> str:
+    """Innermost ``limit`` frames of a stack, one per line, for log messages"""
+    labels = frame_labels(frame)[-limit:]
+    return "\n".join(f"  {label}" for label in labels)
+
+
+def sample_stacks(
+    seconds: float,
+    interval: float = 0.005,
+    thread_ids: Optional[List[int]] = None
+) -> Dict[str, int]:
+    """
+    Sample stacks of running threads for a while
+
+    Runs in the calling thread (call it through ``asyncio.to_thread`` from
+    the event loop). Each sample costs one ``sys._current_frames()`` call,
+    so the sampled threads are not slowed down beyond the GIL switches.
+
+    Args:
+        seconds: How long to sample
+        interval: Seconds between samples
+        thread_ids: Threads to sample (default every thread but this one)
+
+    Returns:
+        Dictionary of folded stack (``frame;frame;...``) -> samples
+    """
+    me = threading.get_ident()
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    counts: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == me or (thread_ids is not None and thread_id not in thread_ids):
+                continue
+            stack = [names.get(thread_id, str(thread_id))] + frame_labels(frame)
+            counts[";".join(stack)] += 1
+        time.sleep(interval)
+    return dict(counts)
+
+
+def folded(counts: Dict[str, int]) -> str:
+    """
+    Render samples as folded stacks, heaviest first
+
+    The output is accepted by flamegraph.pl, speedscope and inferno.
+    """
+    lines = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+    return "".join(f"{stack} {count}\n" for stack, count in lines)
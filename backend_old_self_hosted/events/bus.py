@@ -0,0 +1,149 @@
+"""In-process async event bus with a bounded queue per consumer"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Type
+
+from events.domain import DomainEvent
+
+logger = logging.getLogger(__name__)
+
+EventHandler = Callable[[DomainEvent], Awaitable[None]]
+
+
+class _Consumer:
+    """One subscriber with its own queue and worker tasks"""
+
+    def __init__(self, name: str, handler: EventHandler, maxsize: int, workers: int):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.tasks: List[asyncio.Task] = []
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+
+    async def run(self) -> None:
+        while True:
+            event = await self.queue.get()
+            try:
+                await self.handler(event)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Event consumer {self.name} failed on {event!r}: {e}")
+            finally:
+                self.queue.task_done()
+
+
+class EventBus:
+    """
+    Delivers domain events from request handlers to background consumers
+
+    Handlers call ``publish`` right after their write commits and return
+    without waiting for any consumer. Each consumer has its own bounded
+    queue and workers, so a slow consumer (e.g. AI generation) never delays
+    a fast one (e.g. unread counters) or the request. When a consumer's
+    queue is full the event is dropped for that consumer and counted:
+    consumers must tolerate missed events, typically because the state
+    they act on is also swept from Mongo (``ai_pending`` entries are
+    requeued at startup, unread counters expire and are recounted).
+    """
+
+    def __init__(self):
+        self._consumers: Dict[Type[DomainEvent], List[_Consumer]] = {}
+        self._all: List[_Consumer] = []
+        self._running = False
+        self.published: Dict[str, int] = {}
+
+    def subscribe(
+        self,
+        name: str,
+        handler: EventHandler,
+        *event_types: Type[DomainEvent],
+        maxsize: int = 1000,
+        workers: int = 1
+    ) -> None:
+        """
+        Register a consumer for one or more event types
+
+        Args:
+            name: Consumer name for logs and metrics
+            handler: Coroutine function called with each event
+            event_types: DomainEvent subclasses to receive
+            maxsize: Events queued before new ones are dropped
+            workers: Events handled concurrently (1 keeps publish order)
+        """
+        consumer = _Consumer(name, handler, maxsize, workers)
+        self._all.append(consumer)
+        for event_type in event_types:
+            self._consumers.setdefault(event_type, []).append(consumer)
+        if self._running:
+            self._start_consumer(consumer)
+
+    def publish(self, event: DomainEvent) -> int:
+        """
+        Queue an event for every consumer of its type without waiting
+
+        Args:
+            event: Event describing a committed write
+
+        Returns:
+            Number of consumers the event was queued for
+        """
+        self.published[event.name] = self.published.get(event.name, 0) + 1
+        delivered = 0
+        for consumer in self._consumers.get(type(event), ()):
+            try:
+                consumer.queue.put_nowait(event)
+                delivered += 1
+            except asyncio.QueueFull:
+                consumer.dropped += 1
+                logger.warning(f"Event consumer {consumer.name} queue full - dropped {event.name}")
+        return delivered
+
+    def _start_consumer(self, consumer: _Consumer) -> None:
+        consumer.tasks = [asyncio.create_task(consumer.run()) for _ in range(consumer.workers)]
+
+    def start(self) -> None:
+        """Start the consumer workers (call from the running event loop)"""
+        self._running = True
+        for consumer in self._all:
+            self._start_consumer(consumer)
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """
+        Let consumers finish queued events, then cancel their workers
+
+        Args:
+            timeout: Seconds to wait for the queues to drain
+        """
+        self._running = False
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(consumer.queue.join() for consumer in self._all)),
+                timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Event queues not drained before shutdown")
+        tasks = [task for consumer in self._all for task in consumer.tasks]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for consumer in self._all:
+            consumer.tasks = []
+
+    def snapshot(self) -> dict:
+        """Queue depth and counters per consumer, for the metrics endpoint"""
+        return {
+            "published": dict(self.published),
+            "consumers": {
+                consumer.name: {
+                    "depth": consumer.queue.qsize(),
+                    "processed": consumer.processed,
+                    "failed": consumer.failed,
+                    "dropped": consumer.dropped,
+                }
+                for consumer in self._all
+            },
+        }
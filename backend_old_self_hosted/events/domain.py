@@ -0,0 +1,80 @@
+"""Domain events published after a write has been committed"""
+from datetime import datetime, timezone
+from typing import Optional
+
+
+class DomainEvent:
+    """Base class; ``name`` identifies the event type in logs and metrics"""
+
+    name = "event"
+
+    def __init__(self):
+        self.occurred_at = datetime.now(timezone.utc)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{key}={value!r}" for key, value in vars(self).items() if key != "occurred_at")
+        return f"{type(self).__name__}({fields})"
+
+
+class MessageSent(DomainEvent):
+    """A direct message between a client and their coach was stored"""
+
+    name = "message_sent"
+
+    def __init__(self, message_id: str, sender_id: str, receiver_id: str, created_at: datetime):
+        super().__init__()
+        self.message_id = message_id
+        self.sender_id = sender_id
+        self.receiver_id = receiver_id
+        self.created_at = created_at
+
+
+class ConversationRead(DomainEvent):
+    """A user was shown a direct-message conversation up to a message"""
+
+    name = "conversation_read"
+
+    def __init__(self, reader_id: str, other_id: str, read_up_to: datetime):
+        super().__init__()
+        self.reader_id = reader_id
+        self.other_id = other_id
+        # created_at of the newest message from other_id the reader was shown
+        self.read_up_to = read_up_to
+
+
+class BitacoraCreated(DomainEvent):
+    """A bitácora was saved, either as a new day or as an edit of one"""
+
+    name = "bitacora_created"
+
+    def __init__(self, bitacora_id: str, user_id: str, date: str, is_new: bool = True):
+        super().__init__()
+        self.bitacora_id = bitacora_id
+        self.user_id = user_id
+        self.date = date
+        self.is_new = is_new
+
+
+class CheckInCreated(DomainEvent):
+    """A daily check-in was stored"""
+
+    name = "checkin_created"
+
+    def __init__(self, checkin_id: str, user_id: str, mood: int, crisis_level: Optional[str] = None):
+        super().__init__()
+        self.checkin_id = checkin_id
+        self.user_id = user_id
+        self.mood = mood
+        self.crisis_level = crisis_level
+
+
+class RoleChanged(DomainEvent):
+    """A user's role changed (user, premium or coach)"""
+
+    name = "role_changed"
+
+    def __init__(self, user_id: str, new_role: str, changed_by: Optional[str] = None):
+        super().__init__()
+        self.user_id = user_id
+        self.new_role = new_role
+        self.changed_by = changed_by
@@ -0,0 +1,43 @@
+"""Gunicorn configuration for running several uvicorn workers per node
+
+Start with: ``gunicorn -c gunicorn.conf.py server:app``
+See DEPLOYMENT.md for sizing workers against the Mongo connection pool.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# One worker per core by default; each worker is a separate event loop
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Workers are restarted when a request takes longer than this (Claude calls included)
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '5'))
+
+# Recycle workers periodically to bound memory growth; jitter avoids restarting all at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '10000'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '1000'))
+
+# Clients are created per worker in the app lifespan, so the app is not preloaded
+preload_app = False
+
+accesslog = "-"
+loglevel = os.environ.get('LOG_LEVEL', 'info').lower()
+
+# Make the worker count visible to the app (state backend warnings)
+os.environ['WEB_CONCURRENCY'] = str(workers)
+
+
+def on_starting(server):
+    """Start every deployment with a clean shared-memory state file"""
+    if os.environ.get('STATE_BACKEND', 'memory').lower() != "shm":
+        return
+    from state.shared_memory import default_state_path
+    path = os.environ.get('STATE_SHM_PATH') or default_state_path()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    server.log.info("Reset shared state file %s", path)
@@ -0,0 +1,109 @@
+"""Compressed archive of old AI chat messages"""
+import json
+import zlib
+from datetime import datetime
+from typing import List
+
+from messaging.chat_store import BUCKET_MESSAGE_FIELDS
+
+ARCHIVE_CODEC = "zlib-json"
+
+
+def pack_messages(messages: List[dict]) -> bytes:
+    """
+    Compress messages into one binary blob
+
+    Args:
+        messages: Message dicts with at least BUCKET_MESSAGE_FIELDS
+
+    Returns:
+        zlib-compressed JSON (created_at as ISO 8601)
+    """
+    rows = [
+        {**{field: m.get(field) for field in BUCKET_MESSAGE_FIELDS}, "created_at": m["created_at"].isoformat()}
+        for m in messages
+    ]
+    return zlib.compress(json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode(), 6)
+
+
+def unpack_messages(data: bytes) -> List[dict]:
+    """Inverse of ``pack_messages``"""
+    rows = json.loads(zlib.decompress(data))
+    for row in rows:
+        row["created_at"] = datetime.fromisoformat(row["created_at"])
+    return rows
+
+
+class ChatArchive:
+    """
+    Old chat messages packed into compressed documents in ``chat_archive``
+
+    Each document holds a run of consecutive messages of one session (a few
+    hundred at most) as zlib-compressed JSON, so years of history cost one
+    small document and one index entry per run instead of one per message.
+    Archived messages are only read when a client scrolls past what the
+    live chat store still holds.
+    """
+
+    def __init__(self, db):
+        """
+        Args:
+            db: Motor database handle
+        """
+        self.db = db
+
+    async def add(self, session_id: str, user_id: str, messages: List[dict]) -> None:
+        """
+        Archive a run of messages (call before deleting them from the live store)
+
+        The document is keyed by its first message, so archiving the same
+        run again after an interruption replaces it instead of duplicating.
+
+        Args:
+            session_id: Chat session
+            user_id: Owner of the session
+            messages: Messages in chronological order
+        """
+        if not messages:
+            return
+        await self.db.chat_archive.replace_one(
+            {"session_id": session_id, "user_id": user_id, "first_id": messages[0]["id"]},
+            {
+                "session_id": session_id,
+                "user_id": user_id,
+                "first_id": messages[0]["id"],
+                "first_at": messages[0]["created_at"],
+                "last_at": messages[-1]["created_at"],
+                "count": len(messages),
+                "codec": ARCHIVE_CODEC,
+                "data": pack_messages(messages),
+            },
+            upsert=True
+        )
+
+    async def history(self, session_id: str, user_id: str, limit: int) -> List[dict]:
+        """
+        Get the latest archived messages of a session
+
+        Args:
+            session_id: Chat session
+            user_id: Owner of the session
+            limit: Maximum number of messages
+
+        Returns:
+            Up to ``limit`` most recent archived messages, oldest first
+        """
+        if limit <= 0:
+            return []
+        messages = {}
+        cursor = self.db.chat_archive.find(
+            {"session_id": session_id, "user_id": user_id},
+            {"_id": 0, "data": 1}
+        ).sort("last_at", -1)
+        async for doc in cursor:
+            for m in unpack_messages(doc["data"]):
+                messages[m["id"]] = {**m, "session_id": session_id, "user_id": user_id}
+            if len(messages) >= limit:
+                break
+        ordered = sorted(messages.values(), key=lambda m: m["created_at"])
+        return ordered[-limit:]
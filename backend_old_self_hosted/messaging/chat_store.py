@@ -0,0 +1,198 @@
+"""Storage layouts for AI chat messages"""
+import os
+from typing import List
+
+# Message fields kept inside a bucket; session_id and user_id live on the bucket
+BUCKET_MESSAGE_FIELDS = ("id", "role", "content", "created_at")
+
+
+class DocumentChatStore:
+    """
+    One document per message in ``chat_messages`` (the original layout)
+
+    Simple, but every turn adds two documents and two index entries per index,
+    and history reads sort over the session's messages.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    async def append(self, session_id: str, user_id: str, messages: List[dict]) -> None:
+        """
+        Store messages of a session
+
+        Args:
+            session_id: Chat session
+            user_id: Owner of the session
+            messages: ChatMessage dicts in chronological order
+        """
+        await self.db.chat_messages.insert_many([dict(m) for m in messages], ordered=True)
+
+    async def history(self, session_id: str, user_id: str, limit: int) -> List[dict]:
+        """
+        Get the latest messages of a session
+
+        Args:
+            session_id: Chat session
+            user_id: Owner of the session
+            limit: Maximum number of messages
+
+        Returns:
+            Up to ``limit`` most recent messages, oldest first
+        """
+        messages = await self.db.chat_messages.find(
+            {"session_id": session_id, "user_id": user_id},
+            {"_id": 0}
+        ).sort("created_at", -1).limit(limit).to_list(limit)
+        messages.reverse()
+        return messages
+
+    async def version(self, session_id: str, user_id: str) -> str:
+        """
+        Identify the current state of a session without reading its messages
+
+        The newest message id changes on every append (compaction only
+        removes older messages).
+
+        Args:
+            session_id: Chat session
+            user_id: Owner of the session
+
+        Returns:
+            Version string (empty for a session without messages)
+        """
+        latest = await self.db.chat_messages.find_one(
+            {"session_id": session_id, "user_id": user_id},
+            {"_id": 0, "id": 1},
+            sort=[("created_at", -1)]
+        )
+        return latest["id"] if latest else ""
+
+
+class BucketChatStore:
+    """
+    Messages appended with ``$push`` into per-session bucket documents
+
+    Each document in ``chat_buckets`` holds up to ``bucket_size`` messages of
+    one session. Appending updates the session's newest bucket (a new one is
+    inserted when the messages do not fit), and reading the latest N messages touches
+    ``ceil(N / bucket_size) + 1`` documents at most. The collection and its
+    indexes hold one entry per bucket instead of one per message.
+    """
+
+    def __init__(self, db, bucket_size: int = 50):
+        """
+        Args:
+            db: Motor database handle
+            bucket_size: Maximum messages per bucket document
+        """
+        self.db = db
+        self.bucket_size = bucket_size
+
+    async def append(self, session_id: str, user_id: str, messages: List[dict]) -> None:
+        """
+        Store messages of a session
+
+        Args:
+            session_id: Chat session
+            user_id: Owner of the session
+            messages: ChatMessage dicts in chronological order
+        """
+        entries = [{field: m[field] for field in BUCKET_MESSAGE_FIELDS} for m in messages]
+        session = {"session_id": session_id, "user_id": user_id}
+        for start in range(0, len(entries), self.bucket_size):
+            chunk = entries[start:start + self.bucket_size]
+            # Only the newest bucket is open: an older one with room left
+            # (a chunk did not fit) must not receive later messages
+            newest = await self.db.chat_buckets.find_one(
+                session, {"_id": 1, "count": 1}, sort=[("first_at", -1)]
+            )
+            if newest and newest["count"] <= self.bucket_size - len(chunk):
+                result = await self.db.chat_buckets.update_one(
+                    # Still room for the whole chunk, whatever appended meanwhile
+                    {"_id": newest["_id"], "count": {"$lte": self.bucket_size - len(chunk)}},
+                    {
+                        "$push": {"messages": {"$each": chunk}},
+                        "$inc": {"count": len(chunk)},
+                        "$set": {"last_at": chunk[-1]["created_at"]}
+                    }
+                )
+                if result.modified_count:
+                    continue
+            await self.db.chat_buckets.insert_one({
+                **session,
+                "messages": chunk,
+                "count": len(chunk),
+                "first_at": chunk[0]["created_at"],
+                "last_at": chunk[-1]["created_at"]
+            })
+
+    async def history(self, session_id: str, user_id: str, limit: int) -> List[dict]:
+        """
+        Get the latest messages of a session
+
+        Args:
+            session_id: Chat session
+            user_id: Owner of the session
+            limit: Maximum number of messages
+
+        Returns:
+            Up to ``limit`` most recent messages, oldest first
+        """
+        bucket_count = -(-limit // self.bucket_size) + 1
+        buckets = await self.db.chat_buckets.find(
+            {"session_id": session_id, "user_id": user_id},
+            {"_id": 0, "messages": 1}
+        ).sort("first_at", -1).limit(bucket_count).to_list(bucket_count)
+
+        messages = [
+            {**m, "session_id": session_id, "user_id": user_id}
+            for bucket in buckets
+            for m in bucket["messages"]
+        ]
+        messages.sort(key=lambda m: m["created_at"])
+        return messages[-limit:] if limit else []
+
+    async def version(self, session_id: str, user_id: str) -> str:
+        """
+        Identify the current state of a session without reading its messages
+
+        Every append grows the newest bucket's count or creates a new
+        newest bucket, so its _id and count change on every append. A total
+        of the counts would not do: compaction deletes old buckets, and later
+        appends would bring the total back to a value already handed out.
+
+        Args:
+            session_id: Chat session
+            user_id: Owner of the session
+
+        Returns:
+            Version string (empty for a session without messages)
+        """
+        newest = await self.db.chat_buckets.find_one(
+            {"session_id": session_id, "user_id": user_id},
+            {"_id": 1, "count": 1},
+            sort=[("first_at", -1)]
+        )
+        return f"{newest['_id']}.{newest['count']}" if newest else ""
+
+
+def create_chat_store(db):
+    """
+    Build the chat store selected by CHAT_STORAGE
+
+    - ``documents``: one document per message (default)
+    - ``buckets``: bucket pattern with CHAT_BUCKET_SIZE messages per document
+
+    Args:
+        db: Motor database handle
+
+    Returns:
+        DocumentChatStore or BucketChatStore
+    """
+    mode = os.environ.get('CHAT_STORAGE', 'documents').lower()
+    if mode == "buckets":
+        return BucketChatStore(db, int(os.environ.get('CHAT_BUCKET_SIZE', '50')))
+    if mode == "documents":
+        return DocumentChatStore(db)
+    raise ValueError(f"Unknown CHAT_STORAGE '{mode}' (expected documents or buckets)")
@@ -0,0 +1,173 @@
+"""In-memory coach registry and client-to-coach assignments"""
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+from state.base import StateBackend
+from state.memory import MemoryStateBackend
+
+# Bumped on every coach role change so all workers reload their registry
+REGISTRY_VERSION_KEY = "coach_registry:version"
+# Hash of client_id -> coach_id for assignments already resolved
+ASSIGNMENTS_KEY = "coach_assignments"
+# Hash of coach_id -> counter bumped whenever the coach's caseload changes
+CASELOAD_VERSIONS_KEY = "coach_caseload_versions"
+
+
+class CoachRegistry:
+    """
+    Knows who the coaches are and which coach each client is assigned to
+
+    Coaches are loaded from ``users`` once and kept in memory. A version
+    counter in the state backend is bumped by ``invalidate`` whenever a role
+    changes, and every worker reloads when it sees a new version. Each client
+    has one document in ``client_assignments`` (indexed by client and by
+    coach). Clients without one are assigned to the coach with the smallest
+    caseload the first time they need a coach.
+    """
+
+    def __init__(self, db, state: Optional[StateBackend] = None, ttl_seconds: float = 600.0):
+        """
+        Args:
+            db: Motor database handle
+            state: Backend holding the registry version and assignment cache
+            ttl_seconds: Reload the registry at least this often
+        """
+        self.db = db
+        self.state = state or MemoryStateBackend()
+        self.ttl_seconds = ttl_seconds
+        self._coaches: Dict[str, dict] = {}
+        self._loaded_version: Optional[str] = None
+        self._loaded_at = 0.0
+
+    async def coaches(self) -> Dict[str, dict]:
+        """
+        Get all coaches, reloading only when the registry was invalidated
+
+        Returns:
+            Dictionary of coach user_id -> {"user_id", "name"}
+        """
+        version = await self.state.get(REGISTRY_VERSION_KEY) or "0"
+        stale = time.monotonic() - self._loaded_at > self.ttl_seconds
+        if version != self._loaded_version or stale:
+            docs = await self.db.users.find(
+                {"role": "coach"}, {"_id": 0, "user_id": 1, "name": 1}
+            ).sort("created_at", 1).to_list(None)
+            self._coaches = {doc["user_id"]: doc for doc in docs}
+            self._loaded_version = version
+            self._loaded_at = time.monotonic()
+        return self._coaches
+
+    async def invalidate(self) -> None:
+        """Force every worker to reload the registry (call after role changes)"""
+        await self.state.incr(REGISTRY_VERSION_KEY)
+
+    async def is_coach(self, user_id: str) -> bool:
+        """Whether the user is a coach"""
+        return user_id in await self.coaches()
+
+    async def default_coach(self) -> Optional[dict]:
+        """The longest-standing coach, for callers without an assignment"""
+        coaches = await self.coaches()
+        return next(iter(coaches.values()), None)
+
+    async def coach_for_client(self, client_id: str) -> Optional[dict]:
+        """
+        Get the coach assigned to a client, assigning one if needed
+
+        Args:
+            client_id: user_id of the client
+
+        Returns:
+            The coach's {"user_id", "name"}, or None if there are no coaches
+        """
+        coaches = await self.coaches()
+        coach_id = await self.assigned_coach_id(client_id)
+        if coach_id is None:
+            coach_id = await self._assign_least_loaded(client_id, coaches)
+        return coaches.get(coach_id) if coach_id else None
+
+    async def assigned_coach_id(self, client_id: str) -> Optional[str]:
+        """
+        Look up a client's coach without creating an assignment
+
+        Args:
+            client_id: user_id of the client
+
+        Returns:
+            The coach's user_id, or None if the client is not assigned
+        """
+        coach_id = await self.state.hget(ASSIGNMENTS_KEY, client_id)
+        if coach_id is None:
+            assignment = await self.db.client_assignments.find_one(
+                {"client_id": client_id}, {"_id": 0, "coach_id": 1}
+            )
+            if assignment:
+                coach_id = assignment["coach_id"]
+                await self.state.hset(ASSIGNMENTS_KEY, client_id, coach_id)
+        return coach_id
+
+    async def _assign_least_loaded(self, client_id: str, coaches: Dict[str, dict]) -> Optional[str]:
+        """Assign a client to the coach with the fewest clients"""
+        if not coaches:
+            return None
+        loads = await self.db.client_assignments.aggregate([
+            {"$match": {"coach_id": {"$in": list(coaches)}}},
+            {"$group": {"_id": "$coach_id", "clients": {"$sum": 1}}}
+        ]).to_list(None)
+        load_by_coach = {row["_id"]: row["clients"] for row in loads}
+        coach_id = min(coaches, key=lambda cid: load_by_coach.get(cid, 0))
+        return await self.assign(client_id, coach_id, replace=False)
+
+    async def assign(self, client_id: str, coach_id: str, replace: bool = True) -> str:
+        """
+        Assign a client to a coach
+
+        Args:
+            client_id: user_id of the client
+            coach_id: user_id of the coach
+            replace: Move the client if already assigned elsewhere
+
+        Returns:
+            The coach_id the client ends up assigned to
+        """
+        fields = {"coach_id": coach_id, "assigned_at": datetime.now(timezone.utc)}
+        update = {"$set": fields} if replace else {"$setOnInsert": fields}
+        before = await self.db.client_assignments.find_one_and_update(
+            {"client_id": client_id},
+            update,
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+        previous = before["coach_id"] if before else None
+        assigned = coach_id if replace or previous is None else previous
+        await self.state.hset(ASSIGNMENTS_KEY, client_id, assigned)
+        if assigned != previous:
+            for changed in {assigned, previous} - {None}:
+                await self.state.hincrby(CASELOAD_VERSIONS_KEY, changed, 1)
+        return assigned
+
+    async def caseload_version(self, coach_id: str) -> str:
+        """Counter that changes whenever a client joins or leaves the coach's caseload"""
+        return await self.state.hget(CASELOAD_VERSIONS_KEY, coach_id) or "0"
+
+    async def caseload(self, coach_id: str) -> List[str]:
+        """
+        Get the user_ids of every client assigned to a coach
+
+        Args:
+            coach_id: user_id of the coach
+
+        Returns:
+            List of client user_ids
+        """
+        docs = await self.db.client_assignments.find(
+            {"coach_id": coach_id}, {"_id": 0, "client_id": 1}
+        ).to_list(None)
+        return [doc["client_id"] for doc in docs]
+
+    async def is_assigned(self, client_id: str, coach_id: str) -> bool:
+        """Whether a client belongs to a coach's caseload"""
+        return await self.assigned_coach_id(client_id) == coach_id
@@ -0,0 +1,108 @@
+"""Per-worker LRU cache of serialized coach dashboard responses"""
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from state.base import StateBackend
+from state.memory import MemoryStateBackend
+
+# Hash of scope -> version; a scope is "client:<user_id>" or "coach:<user_id>"
+VERSIONS_KEY = "dashboard_versions"
+
+
+class DashboardCache:
+    """
+    Serialized coach views, invalidated by version bumps
+
+    Each entry holds the JSON bytes of a response together with the version
+    of the data it was built from. Versions live in the state backend, one
+    per client (their bitácoras and check-ins) and one per coach (their
+    conversations list), so a write on any worker bumps the version and
+    every worker's copy stops matching at once; nothing has to be broadcast.
+    A hit costs one state lookup and no Mongo query or serialization.
+    Entries are evicted least recently used beyond ``max_entries``.
+    """
+
+    def __init__(self, state: Optional[StateBackend] = None, max_entries: int = 2000):
+        """
+        Args:
+            state: Backend holding the versions (shared between workers)
+            max_entries: Cached responses kept per worker
+        """
+        self.state = state or MemoryStateBackend()
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, Tuple[str, bytes, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def version(self, scope: str) -> str:
+        """
+        Current version of a scope
+
+        Args:
+            scope: ``client:<user_id>`` or ``coach:<user_id>``
+
+        Returns:
+            Version string ("0" until first bumped)
+        """
+        return await self.state.hget(VERSIONS_KEY, scope) or "0"
+
+    async def bump(self, *scopes: str) -> None:
+        """
+        Invalidate every cached view built from these scopes
+
+        Call after the write is committed, so a request racing with it
+        cannot cache the old data under the new version.
+
+        Args:
+            scopes: ``client:<user_id>`` or ``coach:<user_id>`` values
+        """
+        for scope in scopes:
+            await self.state.hincrby(VERSIONS_KEY, scope, 1)
+
+    def get(self, key: tuple, version: str) -> Optional[Tuple[bytes, str]]:
+        """
+        Look up a response built from the given version
+
+        Args:
+            key: View identity, e.g. (coach_id, "checkins", client_id, limit)
+            version: Current version of the data behind the view
+
+        Returns:
+            (JSON body, ETag) or None on a miss
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1], entry[2]
+
+    def put(self, key: tuple, version: str, body: bytes, etag: str = "") -> None:
+        """
+        Store a serialized response
+
+        Args:
+            key: View identity
+            version: Version read before the data was queried
+            body: JSON bytes
+            etag: ETag sent with the body
+        """
+        self._entries[key] = (version, body, etag)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def snapshot(self) -> dict:
+        """Size and hit ratio, for the metrics endpoint"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+        }
@@ -0,0 +1,184 @@
+"""Read receipts as per-conversation high-water marks with cached unread counters"""
+from datetime import datetime
+from typing import Dict, Optional
+
+from state.base import StateBackend
+from state.memory import MemoryStateBackend
+
+
+class ReadReceipts:
+    """
+    Tracks what each user has read in each direct-message conversation
+
+    Instead of flipping a ``read`` flag on every message, a single document in
+    ``read_marks`` per (reader_id, other_id) stores the ``created_at`` of the
+    newest message the reader has seen from ``other_id``. A message is unread
+    when it was sent to the reader after that mark.
+
+    Unread counts per reader are computed with one aggregation on first use and
+    then kept up to date in the state backend: new messages increment them and
+    reading a conversation recounts them, so polling the unread badge is a cache
+    lookup. With a shared backend every worker sees the same counters. Cached
+    entries expire after ``ttl_seconds`` to self-heal from missed updates.
+    """
+
+    def __init__(self, db, state: Optional[StateBackend] = None, ttl_seconds: float = 300.0):
+        """
+        Args:
+            db: Motor database handle
+            state: Backend holding the cached counters and marks
+            ttl_seconds: How long a reader's cached counters are trusted
+        """
+        self.db = db
+        self.state = state or MemoryStateBackend()
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def _unread_key(reader_id: str) -> str:
+        return f"unread:{reader_id}"
+
+    @staticmethod
+    def _loaded_key(reader_id: str) -> str:
+        return f"unread_loaded:{reader_id}"
+
+    @staticmethod
+    def _marks_key(reader_id: str) -> str:
+        return f"read_marks:{reader_id}"
+
+    async def _load_unread(self, reader_id: str) -> Dict[str, int]:
+        """Count unread messages per sender for a reader straight from Mongo"""
+        marks = await self.db.read_marks.find(
+            {"reader_id": reader_id},
+            {"_id": 0, "other_id": 1, "last_read_at": 1}
+        ).to_list(None)
+
+        conditions = [
+            {"sender_id": mark["other_id"], "created_at": {"$gt": mark["last_read_at"]}}
+            for mark in marks
+        ]
+        conditions.append({"sender_id": {"$nin": [mark["other_id"] for mark in marks]}})
+
+        rows = await self.db.direct_messages.aggregate([
+            {"$match": {"receiver_id": reader_id, "$or": conditions}},
+            {"$group": {"_id": "$sender_id", "count": {"$sum": 1}}}
+        ]).to_list(None)
+
+        marks_key = self._marks_key(reader_id)
+        for mark in marks:
+            await self.state.hset(marks_key, mark["other_id"], mark["last_read_at"].isoformat())
+        await self.state.expire(marks_key, self.ttl_seconds)
+        return {row["_id"]: row["count"] for row in rows}
+
+    async def _counts(self, reader_id: str) -> Dict[str, int]:
+        """Return the cached per-sender unread counts, loading them if needed"""
+        unread_key = self._unread_key(reader_id)
+        if await self.state.exists(self._loaded_key(reader_id)):
+            return {sender: int(count) for sender, count in (await self.state.hgetall(unread_key)).items()}
+
+        counts = await self._load_unread(reader_id)
+        await self.state.delete(unread_key)
+        for sender_id, count in counts.items():
+            await self.state.hset(unread_key, sender_id, str(count))
+        await self.state.set(self._loaded_key(reader_id), "1", ttl=self.ttl_seconds)
+        return counts
+
+    async def total_unread(self, reader_id: str) -> int:
+        """
+        Get the number of unread messages across all conversations
+
+        Args:
+            reader_id: user_id of the reader
+
+        Returns:
+            Total unread message count
+        """
+        counts = await self._counts(reader_id)
+        return sum(counts.values())
+
+    async def unread_from(self, reader_id: str, sender_id: str) -> int:
+        """
+        Get the number of unread messages a reader has from one sender
+
+        Args:
+            reader_id: user_id of the reader
+            sender_id: user_id of the other side of the conversation
+
+        Returns:
+            Unread message count for that conversation
+        """
+        counts = await self._counts(reader_id)
+        return counts.get(sender_id, 0)
+
+    async def last_read_at(self, reader_id: str, other_id: str) -> Optional[datetime]:
+        """
+        Get the read high-water mark of a reader in a conversation
+
+        Args:
+            reader_id: user_id of the reader
+            other_id: user_id of the other side of the conversation
+
+        Returns:
+            Timestamp of the newest message read, or None if nothing was read
+        """
+        marks_key = self._marks_key(reader_id)
+        cached = await self.state.hget(marks_key, other_id)
+        if cached is None:
+            mark = await self.db.read_marks.find_one(
+                {"reader_id": reader_id, "other_id": other_id},
+                {"_id": 0, "last_read_at": 1}
+            )
+            # An empty string caches "never read" so the lookup is not repeated
+            cached = mark["last_read_at"].isoformat() if mark else ""
+            await self.state.hset(marks_key, other_id, cached)
+            await self.state.expire(marks_key, self.ttl_seconds)
+        return datetime.fromisoformat(cached) if cached else None
+
+    async def record_message(self, sender_id: str, receiver_id: str) -> None:
+        """
+        Account for a newly stored message in the receiver's cached counters
+
+        Args:
+            sender_id: user_id of the sender
+            receiver_id: user_id of the receiver
+        """
+        if await self.state.exists(self._loaded_key(receiver_id)):
+            await self.state.hincrby(self._unread_key(receiver_id), sender_id, 1)
+
+    async def mark_conversation_read(self, reader_id: str, other_id: str, read_up_to: datetime) -> bool:
+        """
+        Move the reader's high-water mark up to a message from other_id
+
+        Messages sent after ``read_up_to`` (the reader has not been shown
+        them yet) stay unread. Does nothing (and writes nothing) when the
+        conversation has no unread messages or the mark is already there.
+
+        Args:
+            reader_id: user_id of the reader
+            other_id: user_id of the other side of the conversation
+            read_up_to: created_at of the newest message the reader was shown
+
+        Returns:
+            True if the mark was moved
+        """
+        if await self.unread_from(reader_id, other_id) == 0:
+            return False
+        current = await self.last_read_at(reader_id, other_id)
+        if current is not None and read_up_to <= current:
+            return False
+
+        await self.db.read_marks.update_one(
+            {"reader_id": reader_id, "other_id": other_id},
+            {"$max": {"last_read_at": read_up_to}},
+            upsert=True
+        )
+        await self.state.hset(self._marks_key(reader_id), other_id, read_up_to.isoformat())
+
+        # Recount what is left unread after the new mark
+        remaining = await self.db.direct_messages.count_documents(
+            {"sender_id": other_id, "receiver_id": reader_id, "created_at": {"$gt": read_up_to}}
+        )
+        if remaining:
+            await self.state.hset(self._unread_key(reader_id), other_id, str(remaining))
+        else:
+            await self.state.hdel(self._unread_key(reader_id), other_id)
+        return True
@@ -0,0 +1,201 @@
+"""Full-text search over what a coach's clients have written"""
+import asyncio
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING as ASC, TEXT, IndexModel
+
+SEARCH_LANGUAGE = "spanish"
+# Field consulted by Mongo for a per-document language. No document has it,
+# so a stray "language" field can never switch an entry to another stemmer.
+LANGUAGE_OVERRIDE = "search_language"
+
+# Searchable text per collection: kind -> (collection, text field)
+SEARCH_SOURCES: Dict[str, Tuple[str, str]] = {
+    "bitacora": ("bitacoras", "notes"),
+    "checkin": ("checkins", "brain_dump"),
+    "message": ("direct_messages", "content"),
+}
+
+# Equality prefix of each source's text index. A $text query then reads
+# only the postings of one client (or one conversation), however common the
+# term is across all users.
+SEARCH_PREFIXES: Dict[str, Tuple[str, ...]] = {
+    "bitacora": ("user_id",),
+    "checkin": ("user_id",),
+    "message": ("sender_id", "receiver_id"),
+}
+
+SNIPPET_CHARS = 160
+# Per-client queries of one search running at the same time
+SEARCH_CONCURRENCY = 16
+
+
+def text_index_models() -> Dict[str, List[IndexModel]]:
+    """
+    Spanish text index of every searchable collection
+
+    Mongo text indexes (version 3) fold case and diacritics and stem terms
+    with the Snowball Spanish stemmer, so "guarderías" finds "guarderia".
+    Each index starts with the source's SEARCH_PREFIXES, which every query
+    must match by equality. A collection can hold a single text index.
+
+    Returns:
+        Collection name -> index to create on it
+    """
+    return {
+        collection: [IndexModel(
+            [(prefix, ASC) for prefix in SEARCH_PREFIXES[kind]] + [(field, TEXT)],
+            name=f"{field}_scoped_text",
+            default_language=SEARCH_LANGUAGE,
+            language_override=LANGUAGE_OVERRIDE,
+        )]
+        for kind, (collection, field) in SEARCH_SOURCES.items()
+    }
+
+
+def _fold(text: str) -> str:
+    """Lowercase and drop accents, keeping one character per input character"""
+    return "".join(unicodedata.normalize("NFKD", ch)[:1] for ch in text.lower())
+
+
+def snippet(text: str, query: str, width: int = SNIPPET_CHARS) -> str:
+    """
+    Cut a window of text around the first word matching a query term
+
+    Terms are compared by prefix since Mongo matched them by stem.
+
+    Args:
+        text: Full text of the hit
+        query: Search string
+        width: Maximum snippet length
+
+    Returns:
+        The text itself when short enough, otherwise a window with ellipses
+    """
+    if len(text) <= width:
+        return text
+    folded = _fold(text)
+    position = -1
+    for term in _fold(query).replace('"', " ").split():
+        if term.startswith("-"):
+            continue
+        stem = term[:max(4, len(term) - 3)]
+        index = folded.find(stem)
+        while index > 0 and folded[index - 1].isalnum():
+            index = folded.find(stem, index + 1)
+        if index >= 0 and (position < 0 or index < position):
+            position = index
+    start = max(0, min(position - width // 4, len(text) - width)) if position > 0 else 0
+    end = start + width
+    return ("…" if start else "") + text[start:end].strip() + ("…" if end < len(text) else "")
+
+
+class CoachSearch:
+    """
+    Searches client notes, check-in brain dumps and direct messages
+
+    Each source collection has a Spanish text index prefixed by the
+    client (see ``text_index_models``), so a query only reads the postings
+    of its stemmed terms for one client instead of matching every user's
+    entries and filtering them afterwards. A search runs one query per
+    client (per conversation for messages) and source, at most
+    SEARCH_CONCURRENCY at a time, then merges them by relevance.
+    """
+
+    def __init__(self, db):
+        """
+        Args:
+            db: Motor database handle
+        """
+        self.db = db
+
+    def _scopes(self, kind: str, coach_id: str, client_ids: List[str]) -> List[dict]:
+        """Equality filters on the index prefix covering the coach's clients"""
+        if kind == "message":
+            # Only the coach's own conversations with their clients, both ways
+            return [
+                scope
+                for client_id in client_ids
+                for scope in ({"sender_id": coach_id, "receiver_id": client_id},
+                              {"sender_id": client_id, "receiver_id": coach_id})
+            ]
+        return [{"user_id": client_id} for client_id in client_ids]
+
+    async def _search_scope(
+        self,
+        kind: str,
+        query: str,
+        coach_id: str,
+        scope: dict,
+        limit: int,
+        slots: asyncio.Semaphore
+    ) -> List[dict]:
+        collection, field = SEARCH_SOURCES[kind]
+        cursor = self.db[collection].find(
+            {
+                "$text": {"$search": query, "$language": SEARCH_LANGUAGE},
+                **scope,
+            },
+            {
+                "_id": 0, "id": 1, "user_id": 1, "sender_id": 1, "receiver_id": 1,
+                "date": 1, "created_at": 1, field: 1,
+                "score": {"$meta": "textScore"},
+            }
+        ).sort([("score", {"$meta": "textScore"})]).limit(limit)
+
+        async with slots:
+            docs = await cursor.to_list(limit)
+
+        hits = []
+        for doc in docs:
+            user_id = doc.get("user_id")
+            if kind == "message":
+                user_id = doc["receiver_id"] if doc["sender_id"] == coach_id else doc["sender_id"]
+            hits.append({
+                "kind": kind,
+                "id": doc["id"],
+                "user_id": user_id,
+                "date": doc.get("date"),
+                "created_at": doc["created_at"],
+                "snippet": snippet(doc.get(field) or "", query),
+                "score": doc["score"],
+            })
+        return hits
+
+    async def search(
+        self,
+        coach_id: str,
+        client_ids: List[str],
+        query: str,
+        kinds: Optional[List[str]] = None,
+        limit: int = 20
+    ) -> List[dict]:
+        """
+        Find entries of the given clients mentioning the query terms
+
+        The query uses Mongo ``$text`` syntax: words are OR-ed, "quoted
+        phrases" must appear and -word excludes entries.
+
+        Args:
+            coach_id: Coach searching
+            client_ids: Clients in scope (the caseload, or one of its clients)
+            query: Search string
+            kinds: Sources to search (default all of SEARCH_SOURCES)
+            limit: Maximum hits returned
+
+        Returns:
+            Hits sorted by relevance, each a dict with kind, id, user_id,
+            date, created_at, snippet and score
+        """
+        if not client_ids or not query.strip():
+            return []
+        slots = asyncio.Semaphore(SEARCH_CONCURRENCY)
+        results = await asyncio.gather(*(
+            self._search_scope(kind, query, coach_id, scope, limit, slots)
+            for kind in (kinds or SEARCH_SOURCES)
+            for scope in self._scopes(kind, coach_id, client_ids)
+        ))
+        hits = [hit for source_hits in results for hit in source_hits]
+        hits.sort(key=lambda hit: (hit["score"], hit["created_at"]), reverse=True)
+        return hits[:limit]
@@ -0,0 +1 @@
+# Push notifications module
@@ -0,0 +1,170 @@
+"""Per-recipient coalescing of push notifications"""
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from notifications.expo import ExpoPushClient
+
+logger = logging.getLogger(__name__)
+
+# Body of a coalesced notification per kind, given the number of items
+COALESCED_BODIES = {
+    "message": "Tienes {count} mensajes nuevos",
+}
+DEFAULT_COALESCED_BODY = "Tienes {count} novedades"
+
+
+class PushNotification:
+    """One notification waiting to be sent"""
+
+    def __init__(self, kind: str, title: str, body: str, data: Optional[dict] = None):
+        self.kind = kind
+        self.title = title
+        self.body = body
+        self.data = data or {}
+
+
+class PushDispatcher:
+    """
+    Collects notifications per recipient and sends them in batches
+
+    ``notify`` only queues in memory. A background loop flushes every
+    ``window_seconds``: all notifications queued for the same recipient in
+    that window become a single push ("Tienes 3 mensajes nuevos"), and the
+    pushes of every recipient go out in as few Expo requests as possible.
+    Urgent notifications (crisis alerts) are never merged and trigger a
+    flush right away. Recipients' push tokens are read from ``users`` in one
+    query per flush; tokens Expo reports as unregistered are removed.
+    """
+
+    def __init__(
+        self,
+        db,
+        push_client: Optional[ExpoPushClient] = None,
+        window_seconds: float = 3.0,
+        max_recipients: int = 10000
+    ):
+        """
+        Args:
+            db: Motor database handle
+            push_client: Expo client (created from env when omitted)
+            window_seconds: How long notifications for a recipient are collected
+            max_recipients: Recipients pending at once before new ones are dropped
+        """
+        self.db = db
+        self.push_client = push_client or ExpoPushClient()
+        self.window_seconds = window_seconds
+        self.max_recipients = max_recipients
+        self._pending: Dict[str, List[PushNotification]] = {}
+        self._urgent: List[tuple] = []
+        self._wake = asyncio.Event()
+        self.stats = {"queued": 0, "dropped": 0, "pushes": 0, "flushes": 0, "unregistered": 0}
+
+    def notify(self, user_id: str, notification: PushNotification, urgent: bool = False) -> bool:
+        """
+        Queue a notification without waiting
+
+        Args:
+            user_id: Recipient
+            notification: What to show
+            urgent: Send on its own and without waiting for the window
+
+        Returns:
+            False if dropped because too many recipients are pending
+        """
+        if urgent:
+            self._urgent.append((user_id, notification))
+            self._wake.set()
+        else:
+            if user_id not in self._pending and len(self._pending) >= self.max_recipients:
+                self.stats["dropped"] += 1
+                return False
+            self._pending.setdefault(user_id, []).append(notification)
+        self.stats["queued"] += 1
+        return True
+
+    @staticmethod
+    def _coalesce(items: List[PushNotification]) -> PushNotification:
+        """Merge a recipient's notifications into one"""
+        if len(items) == 1:
+            return items[0]
+        kinds = {item.kind for item in items}
+        kind = kinds.pop() if len(kinds) == 1 else "mixed"
+        template = COALESCED_BODIES.get(kind, DEFAULT_COALESCED_BODY)
+        return PushNotification(
+            kind,
+            items[-1].title,
+            template.format(count=len(items)),
+            {**items[-1].data, "count": len(items)}
+        )
+
+    async def flush(self) -> int:
+        """
+        Send everything queued so far
+
+        Returns:
+            Number of push messages sent
+        """
+        pending, self._pending = self._pending, {}
+        urgent, self._urgent = self._urgent, []
+        outgoing = [(user_id, item, True) for user_id, item in urgent]
+        outgoing += [(user_id, self._coalesce(items), False) for user_id, items in pending.items()]
+        if not outgoing:
+            return 0
+        self.stats["flushes"] += 1
+
+        users = await self.db.users.find(
+            {"user_id": {"$in": list({user_id for user_id, _, _ in outgoing})}, "push_tokens.0": {"$exists": True}},
+            {"_id": 0, "user_id": 1, "push_tokens": 1}
+        ).to_list(None)
+        tokens = {user["user_id"]: user["push_tokens"] for user in users}
+
+        messages = [
+            {
+                "to": token,
+                "title": item.title,
+                "body": item.body,
+                "data": {"kind": item.kind, **item.data},
+                "sound": "default",
+                "priority": "high" if is_urgent else "default",
+            }
+            for user_id, item, is_urgent in outgoing
+            for token in tokens.get(user_id, [])
+        ]
+        if not messages:
+            return 0
+
+        unregistered = await self.push_client.send(messages)
+        if unregistered:
+            self.stats["unregistered"] += len(unregistered)
+            await self.db.users.update_many(
+                {"push_tokens": {"$in": unregistered}},
+                {"$pull": {"push_tokens": {"$in": unregistered}}}
+            )
+        self.stats["pushes"] += len(messages)
+        return len(messages)
+
+    async def run(self) -> None:
+        """Flush every window, or right away when something urgent arrives"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.window_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Push flush failed: {e}")
+
+    async def close(self) -> None:
+        """Send what is still queued and close the HTTP client"""
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Final push flush failed: {e}")
+        await self.push_client.close()
+
+    def snapshot(self) -> dict:
+        """Counters and pending recipients, for the metrics endpoint"""
+        return {**self.stats, "pending_recipients": len(self._pending), "pending_urgent": len(self._urgent)}
@@ -0,0 +1,114 @@
+"""Client for the Expo push notification service"""
+import asyncio
+import logging
+import os
+from typing import List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+EXPO_PUSH_URL = "https://exp.host/--/api/v2/push/send"
+# Expo accepts at most 100 messages per request
+EXPO_MAX_BATCH = 100
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def is_expo_token(token: str) -> bool:
+    """Whether a string looks like an Expo push token"""
+    return token.startswith(("ExponentPushToken[", "ExpoPushToken[")) and token.endswith("]")
+
+
+class ExpoPushClient:
+    """
+    Sends push messages to Expo over one pooled HTTP client
+
+    Connections are kept alive between flushes. Messages are split into
+    requests of at most ``EXPO_MAX_BATCH``; a request is retried with
+    exponential backoff on network errors, 429 and 5xx responses.
+    ``EXPO_PUSH_URL`` points the client elsewhere, e.g. at
+    ``python -m notifications.expo_standin``.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        access_token: Optional[str] = None,
+        max_attempts: int = 3,
+        timeout: float = 10.0
+    ):
+        """
+        Args:
+            url: Push endpoint (default EXPO_PUSH_URL env or Expo's)
+            access_token: Expo access token, when push security is enabled
+            max_attempts: Tries per request before giving up
+            timeout: Seconds per HTTP request
+        """
+        self.url = url or os.environ.get('EXPO_PUSH_URL', EXPO_PUSH_URL)
+        self.access_token = access_token if access_token is not None else os.environ.get('EXPO_ACCESS_TOKEN', '')
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            headers = {"Accept": "application/json", "Accept-Encoding": "gzip, deflate"}
+            if self.access_token:
+                headers["Authorization"] = f"Bearer {self.access_token}"
+            self._client = httpx.AsyncClient(
+                headers=headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=4, max_keepalive_connections=4)
+            )
+        return self._client
+
+    async def close(self) -> None:
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _post(self, messages: List[dict]) -> List[dict]:
+        """Send one request, retrying transient failures; returns Expo tickets"""
+        delay = 0.5
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                response = await self._http().post(self.url, json=messages)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response.json().get("data", [])
+                error = f"HTTP {response.status_code}"
+            except httpx.TransportError as e:
+                error = repr(e)
+            if attempt < self.max_attempts:
+                logger.warning(f"Expo push attempt {attempt} failed ({error}) - retrying")
+                await asyncio.sleep(delay)
+                delay *= 2
+        raise RuntimeError(f"Expo push failed after {self.max_attempts} attempts: {error}")
+
+    async def send(self, messages: List[dict]) -> List[str]:
+        """
+        Send push messages in batches
+
+        Args:
+            messages: Expo message dicts, each with a single ``to`` token
+
+        Returns:
+            Tokens Expo reported as no longer registered, to be removed
+        """
+        unregistered = []
+        for start in range(0, len(messages), EXPO_MAX_BATCH):
+            chunk = messages[start:start + EXPO_MAX_BATCH]
+            try:
+                tickets = await self._post(chunk)
+            except Exception as e:
+                logger.error(f"Dropping {len(chunk)} push messages: {e}")
+                continue
+            for message, ticket in zip(chunk, tickets):
+                if ticket.get("status") == "error":
+                    if ticket.get("details", {}).get("error") == "DeviceNotRegistered":
+                        unregistered.append(message["to"])
+                    else:
+                        logger.warning(f"Expo rejected a push: {ticket.get('message')}")
+        return unregistered
@@ -0,0 +1,88 @@
+"""Local stand-in for the Expo push API
+
+Accepts what ExpoPushClient sends, prints each push and answers with Expo
+tickets, so notifications can be exercised without devices or network
+access. Tokens containing ``invalid`` get a ``DeviceNotRegistered`` ticket,
+and ``--fail-every`` makes every Nth request return 503 to exercise retries.
+
+Run from the backend folder: ``python -m notifications.expo_standin --port 8090``,
+then start the server with ``EXPO_PUSH_URL=http://localhost:8090/--/api/v2/push/send``.
+"""
+import argparse
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from notifications.expo import EXPO_MAX_BATCH
+
+LOCK = threading.Lock()
+REQUESTS = {"count": 0}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    fail_every = 0
+    quiet = False
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/--/api/v2/push/send":
+            self._send(404, {"errors": [{"code": "NOT_FOUND", "message": self.path}]})
+            return
+        with LOCK:
+            REQUESTS["count"] += 1
+            number = REQUESTS["count"]
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"[]")
+        messages = body if isinstance(body, list) else [body]
+
+        if self.fail_every and number % self.fail_every == 0:
+            self._send(503, {"errors": [{"code": "UNAVAILABLE", "message": "stand-in failure"}]})
+            return
+        if len(messages) > EXPO_MAX_BATCH:
+            self._send(400, {"errors": [{"code": "PUSH_TOO_MANY_NOTIFICATIONS",
+                                         "message": f"{len(messages)} messages in one request"}]})
+            return
+
+        tickets = []
+        for message in messages:
+            if "invalid" in message.get("to", ""):
+                tickets.append({"status": "error", "message": "not registered",
+                                "details": {"error": "DeviceNotRegistered"}})
+            else:
+                tickets.append({"status": "ok", "id": str(uuid.uuid4())})
+        if not self.quiet:
+            print(f"request {number}: {len(messages)} messages")
+            for message in messages:
+                print(f"  {message.get('to')}: {message.get('title')} - {message.get('body')}")
+        self._send(200, {"data": tickets})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--fail-every", type=int, default=0, help="Answer every Nth request with 503")
+    parser.add_argument("--quiet", action="store_true", help="Do not print received pushes")
+    args = parser.parse_args()
+
+    StandInHandler.fail_every = args.fail_every
+    StandInHandler.quiet = args.quiet
+    server = ThreadingHTTPServer((args.host, args.port), StandInHandler)
+    print(f"Expo push stand-in listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Data retention and compaction
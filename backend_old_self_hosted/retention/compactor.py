@@ -0,0 +1,288 @@
+"""Background compaction of old chat, check-in and message data"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ReplaceOne
+
+from db.migrations.backfill import Throttle
+from messaging.chat_archive import ChatArchive
+from messaging.chat_store import BUCKET_MESSAGE_FIELDS
+from state.base import StateBackend
+
+logger = logging.getLogger(__name__)
+
+# State key held by the worker compacting during the current interval
+LEASE_KEY = "retention:lease"
+# Messages per archive document
+ARCHIVE_CHUNK = 500
+# Collections moved to a cold copy: collection -> (archive collection, date field)
+COLD_COLLECTIONS = {
+    "checkins": ("checkins_archive", "created_at"),
+    "direct_messages": ("direct_messages_archive", "created_at"),
+}
+
+
+class RetentionPolicy:
+    """How long each kind of data stays in the hot collections"""
+
+    def __init__(self, chat_days: int = 90, checkin_days: int = 0, direct_message_days: int = 0,
+                 keep_chat_messages: int = 50):
+        """
+        Args:
+            chat_days: AI chat messages older than this are archived (0 = never)
+            checkin_days: Check-ins older than this move to checkins_archive (0 = never)
+            direct_message_days: Direct messages older than this move to
+                direct_messages_archive (0 = never)
+            keep_chat_messages: Latest messages of every session that stay live
+                whatever their age, so a returning user's chat context is intact
+        """
+        self.chat_days = chat_days
+        self.checkin_days = checkin_days
+        self.direct_message_days = direct_message_days
+        self.keep_chat_messages = keep_chat_messages
+
+    @classmethod
+    def from_env(cls) -> "RetentionPolicy":
+        """Read RETENTION_* settings"""
+        return cls(
+            chat_days=int(os.environ.get('RETENTION_CHAT_DAYS', '90')),
+            checkin_days=int(os.environ.get('RETENTION_CHECKIN_DAYS', '0')),
+            direct_message_days=int(os.environ.get('RETENTION_DIRECT_MESSAGE_DAYS', '0')),
+            keep_chat_messages=int(os.environ.get('RETENTION_KEEP_CHAT_MESSAGES', '50')),
+        )
+
+    def cold_days(self, collection: str) -> int:
+        """Retention in days of a collection of COLD_COLLECTIONS"""
+        return {"checkins": self.checkin_days, "direct_messages": self.direct_message_days}[collection]
+
+
+def _cutoff(days: int) -> Tuple[datetime, ObjectId]:
+    """
+    Date before which data is old, and the smallest ObjectId generated then
+
+    The date is naive UTC, like the datetimes Motor returns.
+    """
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).replace(tzinfo=None)
+    return cutoff, ObjectId.from_datetime(cutoff)
+
+
+class Compactor:
+    """
+    Moves old data out of the hot collections in throttled batches
+
+    - AI chat: messages older than ``chat_days`` are packed into compressed
+      ``chat_archive`` documents and removed from ``chat_messages`` /
+      ``chat_buckets``, except the latest ``keep_chat_messages`` of each
+      session. History reads fall back to the archive.
+    - Check-ins and direct messages, when enabled: copied to an archive
+      collection with the same documents, then deleted.
+
+    Candidates are found through the ``_id`` index (an ObjectId starts with
+    its creation time), so no extra index is needed on the hot collections.
+    Every step copies before it deletes and is keyed so that repeating it
+    is harmless, and ``max_rate`` bounds the documents touched per second
+    so compaction does not push the working set out of cache.
+    """
+
+    def __init__(self, db, policy: Optional[RetentionPolicy] = None, batch_size: int = 500,
+                 max_rate: float = 500, interval: float = 24 * 3600):
+        """
+        Args:
+            db: Motor database handle
+            policy: Retention settings (default from the environment)
+            batch_size: Candidate documents read per batch
+            max_rate: Documents per second, reads and writes combined
+            interval: Seconds between two compaction passes
+        """
+        self.db = db
+        self.policy = policy or RetentionPolicy.from_env()
+        self.archive = ChatArchive(db)
+        self.batch_size = batch_size
+        self.max_rate = max_rate
+        self.interval = interval
+        self.passes = 0
+        self.last_pass: Optional[dict] = None
+        self.archived_messages = 0
+        self.moved = {collection: 0 for collection in COLD_COLLECTIONS}
+
+    async def run(self, state: StateBackend, initial_delay: float = 300) -> None:
+        """
+        Compact every ``interval`` (run as a background task in each worker)
+
+        Only the worker that takes the lease in the state backend compacts
+        during an interval; the others skip it.
+
+        Args:
+            state: Shared state backend holding the lease
+            initial_delay: Seconds to wait after startup
+        """
+        await asyncio.sleep(initial_delay)
+        while True:
+            if await state.incr(LEASE_KEY, ttl=self.interval * 0.9) == 1:
+                try:
+                    await self.run_once()
+                except Exception as e:
+                    logger.error(f"Retention compaction failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self) -> dict:
+        """
+        One full compaction pass
+
+        Returns:
+            Counts of archived messages and moved documents
+        """
+        started = time.monotonic()
+        throttle = Throttle(self.max_rate)
+        stats = {"chat_messages": 0, "chat_buckets": 0}
+        if self.policy.chat_days > 0:
+            stats["chat_messages"] = await self._compact_chat_documents(throttle)
+            stats["chat_buckets"] = await self._compact_chat_buckets(throttle)
+        for collection in COLD_COLLECTIONS:
+            days = self.policy.cold_days(collection)
+            stats[collection] = await self._move_cold(collection, days, throttle) if days > 0 else 0
+
+        self.passes += 1
+        self.archived_messages += stats["chat_messages"] + stats["chat_buckets"]
+        for collection in COLD_COLLECTIONS:
+            self.moved[collection] += stats[collection]
+        self.last_pass = {
+            **stats,
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "seconds": round(time.monotonic() - started, 1),
+        }
+        logger.info(f"Retention pass done: {self.last_pass}")
+        return stats
+
+    async def _compact_chat_documents(self, throttle: Throttle) -> int:
+        """Archive old messages of the one-document-per-message layout"""
+        cutoff, oid_cutoff = _cutoff(self.policy.chat_days)
+        archived = 0
+        seen = set()
+        after = None
+        while True:
+            id_range = {"$lt": oid_cutoff, **({"$gt": after} if after else {})}
+            docs = await self.db.chat_messages.find(
+                {"_id": id_range}, {"_id": 1, "session_id": 1, "user_id": 1}
+            ).sort("_id", 1).limit(self.batch_size).to_list(self.batch_size)
+            if not docs:
+                return archived
+            after = docs[-1]["_id"]
+            for doc in docs:
+                key = (doc["session_id"], doc["user_id"])
+                if key not in seen:
+                    seen.add(key)
+                    archived += await self._archive_document_session(*key, cutoff, throttle)
+            await throttle.wait(len(docs))
+
+    async def _archive_document_session(self, session_id: str, user_id: str, cutoff: datetime,
+                                        throttle: Throttle) -> int:
+        session = {"session_id": session_id, "user_id": user_id}
+        # The newest messages stay live regardless of their age
+        boundary = await self.db.chat_messages.find(session, {"_id": 0, "created_at": 1}).sort(
+            "created_at", -1
+        ).skip(self.policy.keep_chat_messages).limit(1).to_list(1)
+        if not boundary:
+            return 0
+        until = min(cutoff, boundary[0]["created_at"])
+
+        archived = 0
+        while True:
+            chunk = await self.db.chat_messages.find(
+                {**session, "created_at": {"$lte": until}},
+                {"_id": 1, **{field: 1 for field in BUCKET_MESSAGE_FIELDS}}
+            ).sort("created_at", 1).limit(ARCHIVE_CHUNK).to_list(ARCHIVE_CHUNK)
+            if not chunk:
+                return archived
+            await self.archive.add(session_id, user_id, chunk)
+            await self.db.chat_messages.delete_many({"_id": {"$in": [m["_id"] for m in chunk]}})
+            archived += len(chunk)
+            await throttle.wait(len(chunk) * 2)
+
+    async def _compact_chat_buckets(self, throttle: Throttle) -> int:
+        """Archive old buckets of the bucketed layout"""
+        cutoff, oid_cutoff = _cutoff(self.policy.chat_days)
+        archived = 0
+        seen = set()
+        after = None
+        while True:
+            id_range = {"$lt": oid_cutoff, **({"$gt": after} if after else {})}
+            docs = await self.db.chat_buckets.find(
+                {"_id": id_range}, {"_id": 1, "session_id": 1, "user_id": 1}
+            ).sort("_id", 1).limit(self.batch_size).to_list(self.batch_size)
+            if not docs:
+                return archived
+            after = docs[-1]["_id"]
+            for doc in docs:
+                key = (doc["session_id"], doc["user_id"])
+                if key not in seen:
+                    seen.add(key)
+                    archived += await self._archive_bucket_session(*key, cutoff, throttle)
+            await throttle.wait(len(docs))
+
+    async def _archive_bucket_session(self, session_id: str, user_id: str, cutoff: datetime,
+                                      throttle: Throttle) -> int:
+        session = {"session_id": session_id, "user_id": user_id}
+        buckets = await self.db.chat_buckets.find(
+            session, {"_id": 1, "count": 1, "last_at": 1}
+        ).sort("first_at", -1).to_list(None)
+
+        # Keep buckets (newest first) until they hold keep_chat_messages
+        kept = 0
+        old = []
+        for bucket in buckets:
+            if kept < self.policy.keep_chat_messages:
+                kept += bucket["count"]
+            elif bucket["last_at"] < cutoff:
+                old.append(bucket["_id"])
+
+        archived = 0
+        for bucket_id in reversed(old):
+            bucket = await self.db.chat_buckets.find_one({"_id": bucket_id}, {"_id": 0, "messages": 1})
+            if bucket and bucket["messages"]:
+                await self.archive.add(session_id, user_id, bucket["messages"])
+                archived += len(bucket["messages"])
+            await self.db.chat_buckets.delete_one({"_id": bucket_id})
+            await throttle.wait(len(bucket["messages"]) if bucket else 1)
+        return archived
+
+    async def _move_cold(self, collection: str, days: int, throttle: Throttle) -> int:
+        """Copy documents older than ``days`` to the archive collection, then delete them"""
+        archive_collection, date_field = COLD_COLLECTIONS[collection]
+        cutoff, oid_cutoff = _cutoff(days)
+        moved = 0
+        after = None
+        while True:
+            id_range = {"$lt": oid_cutoff, **({"$gt": after} if after else {})}
+            docs = await self.db[collection].find({"_id": id_range}).sort("_id", 1).limit(
+                self.batch_size
+            ).to_list(self.batch_size)
+            if not docs:
+                return moved
+            after = docs[-1]["_id"]
+            # The _id only narrows the scan; the date decides
+            old = [doc for doc in docs if doc.get(date_field) and doc[date_field] < cutoff]
+            if old:
+                await self.db[archive_collection].bulk_write(
+                    [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in old], ordered=False
+                )
+                await self.db[collection].delete_many({"_id": {"$in": [doc["_id"] for doc in old]}})
+                moved += len(old)
+            await throttle.wait(len(docs) + len(old) * 2)
+
+    def snapshot(self) -> dict:
+        """Policy and totals of this worker's passes, for the metrics endpoint"""
+        return {
+            "chat_days": self.policy.chat_days,
+            "checkin_days": self.policy.checkin_days,
+            "direct_message_days": self.policy.direct_message_days,
+            "passes": self.passes,
+            "archived_chat_messages": self.archived_messages,
+            "moved": dict(self.moved),
+            "last_pass": self.last_pass,
+        }
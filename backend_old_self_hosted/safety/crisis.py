@@ -0,0 +1,231 @@
+"""Local detection of crisis signals in what mamás write"""
+import re
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Severity levels, most severe first
+URGENT = "urgent"
+CONCERN = "concern"
+
+# Curated phrases per category. Written naturally; accents, case and
+# punctuation are folded away when the matcher is built.
+CRISIS_PHRASES: Dict[str, Tuple[str, List[str]]] = {
+    "suicidal_ideation": (URGENT, [
+        "quiero morir", "quiero morirme", "me quiero morir", "ganas de morir",
+        "ganas de morirme", "quitarme la vida", "acabar con mi vida",
+        "terminar con mi vida", "suicidarme", "suicidio", "me voy a matar",
+        "quiero matarme", "no quiero vivir", "no quiero seguir viviendo",
+        "no quiero seguir aquí", "mejor muerta", "estaría mejor muerta",
+        "estarían mejor sin mí", "no vale la pena vivir", "desaparecer para siempre",
+        "hacerme daño", "lastimarme", "cortarme las venas", "cortarme las muñecas",
+        "cortarme los brazos", "cortarme las piernas", "cortarme otra vez",
+        "volver a cortarme", "hacerme cortes",
+    ]),
+    "harm_to_baby": (URGENT, [
+        "hacerle daño al bebé", "hacerle daño a mi bebé", "hacerle daño a mi hijo",
+        "hacerle daño a mi hija", "lastimar al bebé", "lastimar a mi bebé",
+        "sacudir al bebé", "zarandear al bebé", "ahogar al bebé", "tirar al bebé",
+        "matar al bebé", "matar a mi bebé", "hacerle algo al bebé",
+        "hacerle algo a mi bebé",
+    ]),
+    "severe_depression": (CONCERN, [
+        "no siento nada por mi bebé", "no quiero a mi bebé", "no quiero a mi hijo",
+        "no quiero a mi hija", "no siento amor por mi bebé",
+        "me arrepiento de ser madre", "me arrepiento de tener a mi bebé",
+        "no debería ser madre", "no sirvo como madre", "sin esperanza",
+        "nada tiene sentido", "no le veo sentido a nada",
+    ]),
+    "psychosis": (CONCERN, [
+        "escucho voces", "oigo voces", "las voces me dicen", "alguien me controla",
+        "el bebé no es mío", "el bebé está poseído",
+    ]),
+}
+
+# A match directly preceded by one of these words is not counted
+# ("no quiero morir"); clitic pronouns in between are skipped
+# ("no me quiero morir"). The look-back stops at the end of the clause
+# ("No, no quiero vivir" still counts), and phrases that carry their own
+# negation ("no quiero vivir") are never negated.
+NEGATIONS = frozenset({"no", "nunca", "jamas", "ni"})
+CLITICS = frozenset({"me", "te", "se", "le", "lo", "la", "nos"})
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+# Punctuation separating clauses, matched on the raw text before folding
+_CLAUSE_BREAK = re.compile(r"[.,;:!?¡¿…()\[\]\"«»\n]+|\s[-–—]+\s")
+
+CRISIS_MESSAGE = (
+    "Lo que sientes es importante y no estás sola. Por favor, habla ahora con alguien "
+    "de confianza o llama a una de estas líneas; hay personas esperando para ayudarte. "
+    "Ya avisamos a tu coach. 💛"
+)
+
+CRISIS_RESOURCES = [
+    {"name": "Emergencias", "contact": "112 (España y Europa) / 911 (América)",
+     "description": "Si tú o tu bebé están en peligro ahora mismo"},
+    {"name": "Línea 024", "contact": "024",
+     "description": "Atención a la conducta suicida (España), 24 horas, gratuita"},
+    {"name": "Postpartum Support International", "contact": "+1-800-944-4773",
+     "description": "Apoyo perinatal con atención en español"},
+]
+
+
+def fold_text(text: str) -> str:
+    """
+    Normalize text for matching: lowercase, no accents, single spaces
+
+    Args:
+        text: Raw user text
+
+    Returns:
+        Folded text padded with one space on each side
+    """
+    # Decomposing splits "á" into "a" + accent; the ASCII round trip drops the accent
+    ascii_text = unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode()
+    return " " + _NON_WORD.sub(" ", ascii_text).strip() + " "
+
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over folded phrases
+
+    Built once, then scans a text in a single pass regardless of how many
+    phrases there are. Failure links are compiled into a full transition
+    table, so the scan is one dictionary lookup per character. Phrases are
+    padded with spaces (as ``fold_text`` pads its output) so only whole
+    words match.
+    """
+
+    def __init__(self, phrases: Iterable[Tuple[str, str]]):
+        """
+        Args:
+            phrases: (phrase, label) pairs; each phrase is folded before use
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, str]]] = [[]]
+
+        for phrase, label in phrases:
+            folded = fold_text(phrase)
+            state = 0
+            for ch in folded:
+                next_state = self._goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][ch] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = next_state
+            self._out[state].append((folded.strip(), label))
+
+        # Breadth-first pass setting failure links and merging outputs
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+        # Compile failure links into direct transitions (states are numbered
+        # in insertion order, so a failure target is always resolved first
+        # when walking breadth-first)
+        self._delta: List[Dict[str, int]] = [dict(self._goto[0])]
+        self._delta.extend({} for _ in range(len(self._goto) - 1))
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            transitions = dict(self._delta[self._fail[state]])
+            transitions.update(self._goto[state])
+            self._delta[state] = transitions
+            queue.extend(self._goto[state].values())
+
+    def find(self, folded: str) -> List[Tuple[int, str, str]]:
+        """
+        Find every phrase occurring in already folded text
+
+        Args:
+            folded: Output of ``fold_text``
+
+        Returns:
+            List of (start index, phrase, label)
+        """
+        delta, out = self._delta, self._out
+        matches = []
+        state = 0
+        for index, ch in enumerate(folded):
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                for phrase, label in out[state]:
+                    # The phrase plus its two padding spaces ends at index
+                    matches.append((index - len(phrase) - 1, phrase, label))
+        return matches
+
+
+class CrisisSignal:
+    """Result of a positive classification"""
+
+    def __init__(self, level: str, categories: List[str], phrases: List[str]):
+        self.level = level
+        self.categories = categories
+        self.phrases = phrases
+
+    def __repr__(self) -> str:
+        return f"CrisisSignal(level={self.level!r}, categories={self.categories!r})"
+
+
+_matcher = PhraseMatcher(
+    (phrase, category)
+    for category, (_, phrases) in CRISIS_PHRASES.items()
+    for phrase in phrases
+)
+
+
+def _negated(folded: str, start: int) -> bool:
+    """Whether the word right before a match (starting at ``start``) negates it"""
+    end = start
+    while end > 0:
+        word_start = folded.rfind(" ", 0, end) + 1
+        word = folded[word_start:end]
+        if word not in CLITICS:
+            return word in NEGATIONS
+        end = word_start - 1
+    return False
+
+
+def classify_crisis(text: Optional[str]) -> Optional[CrisisSignal]:
+    """
+    Look for crisis signals in a message
+
+    Purely local and fast enough to run on every message before any network
+    call. It errs on the side of flagging: a match only raises the AI call's
+    priority, shows help resources and alerts the coach.
+
+    Args:
+        text: Chat message or check-in brain dump
+
+    Returns:
+        CrisisSignal, or None when nothing matched
+    """
+    if not text:
+        return None
+    categories: List[str] = []
+    phrases: List[str] = []
+    for clause in _CLAUSE_BREAK.split(text):
+        folded = fold_text(clause)
+        for start, phrase, category in _matcher.find(folded):
+            if phrase.split(" ", 1)[0] not in NEGATIONS and _negated(folded, start):
+                continue
+            if category not in categories:
+                categories.append(category)
+            if phrase not in phrases:
+                phrases.append(phrase)
+    if not categories:
+        return None
+    levels = {CRISIS_PHRASES[category][0] for category in categories}
+    return CrisisSignal(URGENT if URGENT in levels else CONCERN, categories, phrases)
@@ -1,44 +1,101 @@
 from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import PlainTextResponse
 from fastapi.security import HTTPBearer
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from contextlib import asynccontextmanager
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter, field_validator, model_validator
 from typing import List, Optional
 import uuid
-import httpx
 from datetime import datetime, timezone, timedelta
 import random
+import secrets
+import asyncio
+import hashlib
+import time
 
 # Import new auth and AI modules
+from admission.control import AdaptiveLimit, AdmissionMiddleware
 from auth.jwt_handler import create_access_token, verify_token, extract_token_from_header
 from auth.password_handler import hash_password, verify_password
+from ai.background import AIJobQueue
 from ai.claude_client import ClaudeClient
+from ai.message_batches import MessageBatchRunner
+from ai.priority import PRIORITY_BACKGROUND, PRIORITY_CRISIS, PRIORITY_INTERACTIVE
+from ai.routing import ROUTE_BITACORA_SUMMARY, ROUTE_CHAT, ROUTE_CRISIS, ROUTE_VALIDATION
+from bitacora.times import (
+    BITACORA_CLOCK_FIELDS, NAP_CLOCK_FIELDS, NIGHT_WAKING_CLOCK_FIELDS,
+    fill_clock_fields, normalize_date, parse_clock
+)
+from community.presence import PresenceTracker
+from db.client import PoolMetrics, create_mongo_client
+from db.counters import BITACORA_DAY_FIELD, next_counter_value, reserve_counter_values
+from db.migrations.runner import MigrationRunner
+from db.routing import ANALYTICS, SEARCH, ReadRouter, create_read_router
+from diagnostics.loop_monitor import LoopLagMonitor
+from diagnostics.stacks import folded, sample_stacks
+from events.bus import EventBus
+from events.domain import BitacoraCreated, CheckInCreated, ConversationRead, MessageSent, RoleChanged
+from messaging.chat_archive import ChatArchive
+from messaging.chat_store import create_chat_store
+from messaging.coach_registry import CoachRegistry
+from messaging.dashboard_cache import DashboardCache
+from messaging.read_receipts import ReadReceipts
+from messaging.search import SEARCH_SOURCES, CoachSearch
+from notifications.dispatcher import PushDispatcher, PushNotification
+from notifications.expo import is_expo_token
+from retention.compactor import Compactor, RetentionPolicy
+from safety.crisis import CRISIS_MESSAGE, CRISIS_RESOURCES, CrisisSignal, classify_crisis
+from state.base import StateBackend
+from state.factory import create_state_backend
 
 ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME', 'mama_respira')]
+# Pool listener exists from import time so /metrics works before the first query
+mongo_pool_metrics = PoolMetrics()
+
+# AI responses for synced entries and bitácora summaries are generated off the
+# request path (built in create_app, once .env is loaded)
+ai_jobs: Optional[AIJobQueue] = None
+
+# Side effects of writes run in event consumers, after the handler returns
+event_bus = EventBus()
 
-# Anthropic API Key
-ANTHROPIC_API_KEY = os.environ.get('ANTHROPIC_API_KEY', '')
-JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'change-in-production')
+# Ingress concurrency limit adapted to latency; polling is shed before chat
+admission: Optional[AdaptiveLimit] = None
 
-# Initialize Claude client
-claude_client = ClaudeClient(ANTHROPIC_API_KEY)
+# Event-loop lag percentiles, and the stack of whatever blocks the loop
+loop_monitor: Optional[LoopLagMonitor] = None
 
-# Create the main app
-app = FastAPI(title="MAMÁ RESPIRA API")
+# Distinct active users per time bucket; fed by every authenticated request
+presence = PresenceTracker()
+
+# Clients are created in the lifespan hook (see create_app), not at import time
+client = None
+db = None
+read_router: Optional[ReadRouter] = None
+claude_client: Optional[ClaudeClient] = None
+state_backend: Optional[StateBackend] = None
+read_receipts: Optional[ReadReceipts] = None
+coach_registry: Optional[CoachRegistry] = None
+chat_store = None
+coach_search: Optional[CoachSearch] = None
+chat_archive: Optional[ChatArchive] = None
+compactor: Optional[Compactor] = None
+push_dispatcher: Optional[PushDispatcher] = None
+dashboard_cache: Optional[DashboardCache] = None
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
+# Health checks and metrics live outside /api for load balancers and probes
+ops_router = APIRouter()
+
 security = HTTPBearer(auto_error=False)
 
 # ==================== USER MODELS ====================
@@ -67,6 +124,9 @@ class UserSession(BaseModel):
     expires_at: datetime
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class PushTokenRegister(BaseModel):
+    token: str  # Expo push token of the device
+
 class SessionDataResponse(BaseModel):
     id: str
     email: str
@@ -81,7 +141,7 @@ class DirectMessage(BaseModel):
     sender_id: str  # user_id of sender
     receiver_id: str  # user_id of receiver
     content: str
-    read: bool = False
+    read: bool = False  # Derived from the receiver's read mark, not stored
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class DirectMessageCreate(BaseModel):
@@ -97,6 +157,31 @@ class Conversation(BaseModel):
     last_message_at: Optional[datetime] = None
     unread_count: int = 0
 
+# ==================== CRISIS MODELS ====================
+
+class CrisisResource(BaseModel):
+    name: str
+    contact: str
+    description: str
+
+class CrisisSupport(BaseModel):
+    level: str  # "urgent" or "concern"
+    categories: List[str]
+    message: str
+    resources: List[CrisisResource]
+
+class CrisisAlert(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: str
+    user_name: Optional[str] = None
+    coach_id: Optional[str] = None
+    source: str  # "chat", "checkin" or "sync"
+    level: str
+    categories: List[str]
+    excerpt: str
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    acknowledged_at: Optional[datetime] = None
+
 # ==================== EXISTING MODELS ====================
 
 class ValidationCard(BaseModel):
@@ -115,7 +200,11 @@ class DailyCheckIn(BaseModel):
     baby_wakeups: Optional[int] = None
     brain_dump: Optional[str] = None
     ai_response: Optional[str] = None
+    ai_pending: bool = False  # AI response queued for background generation
+    client_id: Optional[str] = None  # Idempotency key of entries created offline
+    crisis: Optional[CrisisSupport] = None  # Returned with the response, not stored
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class DailyCheckInCreate(BaseModel):
     mood: int
@@ -130,6 +219,7 @@ class ChatMessage(BaseModel):
     user_id: str = "default_user"
     role: str
     content: str
+    crisis: Optional[CrisisSupport] = None  # Returned with the reply, not stored
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class ChatMessageCreate(BaseModel):
@@ -141,24 +231,58 @@ class CommunityPresence(BaseModel):
     sample_names: List[str]
     message: str
 
+class CoachInfo(BaseModel):
+    coach_id: str
+    coach_name: str
+
+class LateBedtime(BaseModel):
+    user_id: str
+    user_name: str
+    date: str
+    laid_down_for_bed: Optional[str] = None
+    laid_down_for_bed_min: int
+
+class SearchHit(BaseModel):
+    kind: str  # bitacora, checkin or message
+    id: str
+    user_id: str
+    user_name: str
+    date: Optional[str] = None  # Bitácora day, for bitácora hits
+    created_at: datetime
+    snippet: str
+    score: float
+
 # ==================== BITÁCORA MODELS ====================
 
+# Clock times are kept as the HH:MM strings the app sends plus minutes since
+# midnight (0-1439), which Mongo can index and range-query
+
 class NapEntry(BaseModel):
     laid_down_time: Optional[str] = None
     fell_asleep_time: Optional[str] = None
     how_fell_asleep: Optional[str] = None
     woke_up_time: Optional[str] = None
     duration_minutes: Optional[int] = None
+    laid_down_min: Optional[int] = Field(None, ge=0, le=1439)
+    fell_asleep_min: Optional[int] = Field(None, ge=0, le=1439)
+    woke_up_min: Optional[int] = Field(None, ge=0, le=1439)
+    
+    @model_validator(mode="after")
+    def sync_clock_fields(self):
+        return fill_clock_fields(self, NAP_CLOCK_FIELDS)
 
 class NightWaking(BaseModel):
     time: Optional[str] = None
     duration_minutes: Optional[int] = None
     what_was_done: Optional[str] = None
+    time_min: Optional[int] = Field(None, ge=0, le=1439)
+    
+    @model_validator(mode="after")
+    def sync_clock_fields(self):
+        return fill_clock_fields(self, NIGHT_WAKING_CLOCK_FIELDS)
 
-class DailyBitacora(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    user_id: str = "default_user"
-    day_number: int = 1
+class BitacoraFields(BaseModel):
+    """Fields logged by the mamá, shared by stored and incoming bitácoras"""
     date: str
     previous_day_wake_time: Optional[str] = None
     nap_1: Optional[NapEntry] = None
@@ -175,28 +299,83 @@ class DailyBitacora(BaseModel):
     night_wakings: Optional[List[NightWaking]] = None
     morning_wake_time: Optional[str] = None
     notes: Optional[str] = None
+    previous_day_wake_min: Optional[int] = Field(None, ge=0, le=1439)
+    relaxing_routine_start_min: Optional[int] = Field(None, ge=0, le=1439)
+    last_feeding_min: Optional[int] = Field(None, ge=0, le=1439)
+    laid_down_for_bed_min: Optional[int] = Field(None, ge=0, le=1439)
+    fell_asleep_at_min: Optional[int] = Field(None, ge=0, le=1439)
+    morning_wake_min: Optional[int] = Field(None, ge=0, le=1439)
+    
+    @model_validator(mode="after")
+    def sync_clock_fields(self):
+        return fill_clock_fields(self, BITACORA_CLOCK_FIELDS)
+
+class DailyBitacora(BitacoraFields):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: str = "default_user"
+    day_number: int = 1
     ai_summary: Optional[str] = None
+    ai_pending: bool = False  # AI summary queued for background generation
+    client_id: Optional[str] = None  # Idempotency key of entries created offline
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    
+    @field_validator("date")
+    @classmethod
+    def normalize_stored_date(cls, value: str) -> str:
+        # Entries saved before dates were validated are returned as stored
+        return normalize_date(value) or value
 
-class DailyBitacoraCreate(BaseModel):
+class DailyBitacoraCreate(BitacoraFields):
     day_number: int = 1
-    date: str
-    previous_day_wake_time: Optional[str] = None
-    nap_1: Optional[NapEntry] = None
-    nap_2: Optional[NapEntry] = None
-    nap_3: Optional[NapEntry] = None
-    how_baby_ate: Optional[str] = None
-    relaxing_routine_start: Optional[str] = None
-    baby_mood: Optional[str] = None
-    last_feeding_time: Optional[str] = None
-    laid_down_for_bed: Optional[str] = None
-    fell_asleep_at: Optional[str] = None
-    time_to_fall_asleep_minutes: Optional[int] = None
-    number_of_wakings: Optional[int] = None
-    night_wakings: Optional[List[NightWaking]] = None
-    morning_wake_time: Optional[str] = None
-    notes: Optional[str] = None
+    
+    @field_validator("date")
+    @classmethod
+    def validate_date(cls, value: str) -> str:
+        normalized = normalize_date(value)
+        if not normalized:
+            raise ValueError("Fecha inválida, usa YYYY-MM-DD")
+        return normalized
+
+# ==================== BOOTSTRAP MODELS ====================
+
+class AppBootstrap(BaseModel):
+    user: dict
+    bitacora_today: Optional[DailyBitacora] = None
+    unread_count: Optional[int] = None
+    coach: Optional[CoachInfo] = None
+    validation: Optional[ValidationCard] = None
+    presence: Optional[CommunityPresence] = None
+    errors: dict = Field(default_factory=dict)  # section name -> error type
+
+# ==================== SYNC MODELS ====================
+
+class SyncCheckIn(DailyCheckInCreate):
+    client_id: str  # Generated on the device; replays with the same id are ignored
+    created_at: Optional[datetime] = None  # When it was logged on the device
+
+class SyncBitacora(DailyBitacoraCreate):
+    client_id: str
+
+class SyncPushRequest(BaseModel):
+    checkins: List[SyncCheckIn] = []
+    bitacoras: List[SyncBitacora] = []
+
+class SyncItemResult(BaseModel):
+    kind: str  # "checkin" or "bitacora"
+    client_id: str
+    id: str
+    status: str  # "created", "updated" or "duplicate"
+
+class SyncPushResponse(BaseModel):
+    results: List[SyncItemResult]
+
+class SyncPullResponse(BaseModel):
+    checkins: List[DailyCheckIn]
+    bitacoras: List[DailyBitacora]
+    watermark: datetime  # Pass back as ?since= on the next pull
+    watermark_id: Optional[str] = None  # Pass back as ?since_id= with it
+    has_more: bool = False
 
 # ==================== DEFAULT DATA ====================
 
@@ -266,6 +445,7 @@ async def get_current_user(request: Request) -> Optional[User]:
         {"_id": 0, "password_hash": 0}  # Exclude password hash from response
     )
     if user_doc:
+        presence.record(user_doc["user_id"])
         return User(**user_doc)
     return None
 
@@ -290,38 +470,114 @@ async def require_coach(request: Request) -> User:
         raise HTTPException(status_code=403, detail="Acceso solo para coach")
     return user
 
+async def require_assigned_client(request: Request, client_id: str) -> User:
+    """Require coach role and the client being in that coach's caseload"""
+    coach = await require_coach(request)
+    if not await coach_registry.is_assigned(client_id, coach.user_id):
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    return coach
+
+# ==================== CONDITIONAL GET ====================
+
+# Part of every ETag; bump when the shape of a tagged response changes
+ETAG_VERSION = "1"
+
+def make_etag(*parts) -> str:
+    """Weak ETag derived from whatever determines a response"""
+    digest = hashlib.sha1("|".join(str(part) for part in (ETAG_VERSION, *parts)).encode()).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Compare the client's If-None-Match with the current ETag
+    
+    Returns a 304 to send instead of the body when they match; otherwise
+    tags the response being built and returns None.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    sent = {tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")}
+    if etag.removeprefix("W/") in sent or "*" in sent:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+async def entries_version(collection, user_id: str) -> tuple:
+    """
+    Latest updated_at and count of a user's check-ins or bitácoras
+    
+    Every write to these collections sets updated_at (offline sync relies on
+    it), so together with the count this changes on any insert, edit, AI
+    write-back or delete. Both come from the (user_id, updated_at) index.
+    """
+    latest, count = await asyncio.gather(
+        collection.find_one({"user_id": user_id}, {"_id": 0, "updated_at": 1}, sort=[("updated_at", -1)]),
+        collection.count_documents({"user_id": user_id})
+    )
+    return (latest or {}).get("updated_at"), count
+
+def serialized_response(request: Request, body: bytes, etag: Optional[str] = None) -> Response:
+    """Send already serialized JSON, or a 304 when the client has this ETag"""
+    response = Response(content=body, media_type="application/json")
+    if etag:
+        return not_modified(request, response, etag) or response
+    return response
+
+# ==================== DASHBOARD CACHE ====================
+
+CONVERSATION_LIST = TypeAdapter(List[Conversation])
+BITACORA_LIST = TypeAdapter(List[DailyBitacora])
+CHECKIN_LIST = TypeAdapter(List[DailyCheckIn])
+
+async def invalidate_client_views(*user_ids: str) -> None:
+    """Drop cached coach views of these clients' bitácoras and check-ins (call after the write)"""
+    await dashboard_cache.bump(*(f"client:{user_id}" for user_id in set(user_ids)))
+
+async def invalidate_coach_views(*user_ids: str) -> None:
+    """Drop cached conversation lists of these coaches (call after the write)"""
+    await dashboard_cache.bump(*(f"coach:{user_id}" for user_id in set(user_ids)))
+
 # ==================== AI HELPERS ====================
 
-async def get_ai_response(user_message: str, session_id: str, user_id: str) -> str:
-    """Get AI response using Claude via direct Anthropic SDK"""
+async def get_ai_response(
+    user_message: str,
+    history: List[dict],
+    priority: int = PRIORITY_INTERACTIVE,
+    fallback_message: Optional[str] = None
+) -> str:
+    """Get AI response using Claude via direct Anthropic SDK
+    
+    ``history`` holds the previous turns only; the current message is
+    appended by the client.
+    """
     try:
-        # Get conversation history
-        history = await db.chat_messages.find(
-            {"session_id": session_id, "user_id": user_id}
-        ).sort("created_at", -1).limit(10).to_list(10)
-        
         # Format history for Claude
-        conversation_history = []
-        if history:
-            history.reverse()
-            for msg in history:
-                conversation_history.append({
-                    "role": msg["role"],
-                    "content": msg["content"]
-                })
+        conversation_history = [
+            {"role": msg["role"], "content": msg["content"]}
+            for msg in history
+        ]
         
         # Call Claude
         response = await claude_client.send_message(
             system_prompt=AI_SYSTEM_PROMPT,
             user_message=user_message,
-            conversation_history=conversation_history
+            conversation_history=conversation_history,
+            route=ROUTE_CRISIS if priority == PRIORITY_CRISIS else ROUTE_CHAT,
+            priority=priority,
+            fallback_message=fallback_message
         )
         return response
     except Exception as e:
         logging.error(f"AI Error: {e}")
+        if fallback_message:
+            return fallback_message
         return "Lo siento, no pude responder ahora. Recuerda: estás haciendo un gran trabajo. Respira profundo. 💛"
 
-async def get_validation_response(mood: int, brain_dump: Optional[str] = None) -> str:
+async def get_validation_response(
+    mood: int,
+    brain_dump: Optional[str] = None,
+    priority: int = PRIORITY_INTERACTIVE,
+    fallback_message: Optional[str] = None
+) -> str:
     """Generate AI validation response based on mood"""
     try:
         mood_context = {
@@ -338,58 +594,70 @@ async def get_validation_response(mood: int, brain_dump: Optional[str] = None) -
         response = await claude_client.send_message(
             system_prompt=AI_SYSTEM_PROMPT,
             user_message=message,
-            max_tokens=200
+            route=ROUTE_CRISIS if priority == PRIORITY_CRISIS else ROUTE_VALIDATION,
+            priority=priority,
+            fallback_message=fallback_message
         )
         return response
     except Exception as e:
         logging.error(f"Validation AI Error: {e}")
+        if fallback_message:
+            return fallback_message
         return "Gracias por compartir. Recuerda: cada día que pasas con tu bebé es un día de amor. 💛"
 
-async def generate_bitacora_summary(bitacora: DailyBitacora) -> str:
-    """Generate AI summary of the daily log for the coach"""
-    try:
-        summary_parts = []
-        
-        if bitacora.previous_day_wake_time:
-            summary_parts.append(f"Despertó ayer: {bitacora.previous_day_wake_time}")
-        
-        naps_info = []
-        for i, nap in enumerate([bitacora.nap_1, bitacora.nap_2, bitacora.nap_3], 1):
-            if nap and (nap.laid_down_time or nap.duration_minutes):
-                nap_str = f"Siesta {i}"
-                if nap.duration_minutes:
-                    nap_str += f": {nap.duration_minutes}min"
-                if nap.how_fell_asleep:
-                    nap_str += f" ({nap.how_fell_asleep})"
-                naps_info.append(nap_str)
-        if naps_info:
-            summary_parts.append("Siestas: " + ", ".join(naps_info))
-        
-        if bitacora.how_baby_ate:
-            summary_parts.append(f"Alimentación: {bitacora.how_baby_ate}")
-        if bitacora.baby_mood:
-            summary_parts.append(f"Humor: {bitacora.baby_mood}")
-        if bitacora.time_to_fall_asleep_minutes:
-            summary_parts.append(f"Tardó en dormirse: {bitacora.time_to_fall_asleep_minutes}min")
-        if bitacora.number_of_wakings is not None:
-            summary_parts.append(f"Despertares nocturnos: {bitacora.number_of_wakings}")
-        if bitacora.morning_wake_time:
-            summary_parts.append(f"Despertó hoy: {bitacora.morning_wake_time}")
-        
-        summary_text = "\n".join(summary_parts)
-        
-        if summary_parts:
-            prompt = f"""Analiza este registro de sueño de un bebé y da un resumen breve (2-3 oraciones) 
+BITACORA_SUMMARY_SYSTEM_PROMPT = "Eres una coach de sueño infantil profesional. Da análisis concisos y útiles."
+
+def build_bitacora_summary_prompt(bitacora: DailyBitacora) -> Optional[str]:
+    """Build the summary prompt for a bitácora (None when nothing was logged)"""
+    summary_parts = []
+    
+    if bitacora.previous_day_wake_time:
+        summary_parts.append(f"Despertó ayer: {bitacora.previous_day_wake_time}")
+    
+    naps_info = []
+    for i, nap in enumerate([bitacora.nap_1, bitacora.nap_2, bitacora.nap_3], 1):
+        if nap and (nap.laid_down_time or nap.duration_minutes):
+            nap_str = f"Siesta {i}"
+            if nap.duration_minutes:
+                nap_str += f": {nap.duration_minutes}min"
+            if nap.how_fell_asleep:
+                nap_str += f" ({nap.how_fell_asleep})"
+            naps_info.append(nap_str)
+    if naps_info:
+        summary_parts.append("Siestas: " + ", ".join(naps_info))
+    
+    if bitacora.how_baby_ate:
+        summary_parts.append(f"Alimentación: {bitacora.how_baby_ate}")
+    if bitacora.baby_mood:
+        summary_parts.append(f"Humor: {bitacora.baby_mood}")
+    if bitacora.time_to_fall_asleep_minutes:
+        summary_parts.append(f"Tardó en dormirse: {bitacora.time_to_fall_asleep_minutes}min")
+    if bitacora.number_of_wakings is not None:
+        summary_parts.append(f"Despertares nocturnos: {bitacora.number_of_wakings}")
+    if bitacora.morning_wake_time:
+        summary_parts.append(f"Despertó hoy: {bitacora.morning_wake_time}")
+    
+    if not summary_parts:
+        return None
+    
+    summary_text = "\n".join(summary_parts)
+    return f"""Analiza este registro de sueño de un bebé y da un resumen breve (2-3 oraciones) 
 para la coach de sueño. Incluye patrones observados y posibles recomendaciones:
 
 {summary_text}
 
 Responde solo con el resumen, sin introducciones."""
-            
+
+async def generate_bitacora_summary(bitacora: DailyBitacora, priority: int = PRIORITY_INTERACTIVE) -> str:
+    """Generate AI summary of the daily log for the coach"""
+    try:
+        prompt = build_bitacora_summary_prompt(bitacora)
+        if prompt:
             response = await claude_client.send_message(
-                system_prompt="Eres una coach de sueño infantil profesional. Da análisis concisos y útiles.",
+                system_prompt=BITACORA_SUMMARY_SYSTEM_PROMPT,
                 user_message=prompt,
-                max_tokens=300
+                route=ROUTE_BITACORA_SUMMARY,
+                priority=priority
             )
             return response
         
@@ -398,6 +666,74 @@ Responde solo con el resumen, sin introducciones."""
         logging.error(f"Bitacora AI Error: {e}")
         return "Registro guardado exitosamente."
 
+# ==================== CRISIS SIGNALS ====================
+
+# At most one coach alert per user and level within this window
+CRISIS_ALERT_COOLDOWN_SECONDS = 600
+
+# Coach dashboards listening for new alerts subscribe to this channel
+CRISIS_ALERT_CHANNEL = "crisis_alerts"
+
+# Keep references to fire-and-forget tasks so they are not garbage collected
+background_tasks = set()
+
+def run_detached(coro) -> None:
+    """Run a coroutine without making the current request wait for it"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+def crisis_support(signal: CrisisSignal) -> CrisisSupport:
+    """Resources shown to the mamá right away when a crisis signal is detected"""
+    return CrisisSupport(
+        level=signal.level,
+        categories=signal.categories,
+        message=CRISIS_MESSAGE,
+        resources=[CrisisResource(**r) for r in CRISIS_RESOURCES]
+    )
+
+async def alert_coach(user: Optional[User], signal: CrisisSignal, source: str, text: str):
+    """Record a crisis alert for the user's coach and publish it to live dashboards"""
+    user_id = user.user_id if user else "default_user"
+    try:
+        # Repeated messages in the same crisis raise a single alert
+        key = f"crisis_alert:{user_id}:{signal.level}"
+        if await state_backend.incr(key, ttl=CRISIS_ALERT_COOLDOWN_SECONDS) > 1:
+            return
+        
+        coach = await find_coach(user_id if user and user.role != "coach" else None)
+        alert = CrisisAlert(
+            user_id=user_id,
+            user_name=user.name if user else None,
+            coach_id=coach.coach_id if coach else None,
+            source=source,
+            level=signal.level,
+            categories=signal.categories,
+            excerpt=text[:500]
+        )
+        await db.crisis_alerts.insert_one(alert.model_dump())
+        await state_backend.publish(CRISIS_ALERT_CHANNEL, alert.model_dump_json())
+        if alert.coach_id:
+            # No excerpt on the lock screen; the coach opens the alert in the app
+            push_dispatcher.notify(alert.coach_id, PushNotification(
+                "crisis_alert",
+                "Alerta de crisis",
+                f"{alert.user_name or 'Una mamá'} podría necesitar ayuda ahora",
+                {"alert_id": alert.id, "user_id": user_id}
+            ), urgent=True)
+        logger.warning(f"Crisis alert {alert.id} ({signal.level}, {source}) for user {user_id}")
+    except Exception as e:
+        logger.error(f"Could not record crisis alert for user {user_id}: {e}")
+
+async def generate_with_deadline(generate, fallback_message: str) -> str:
+    """Wait a bounded time for a crisis reply; past it the local crisis message is returned"""
+    timeout = float(os.environ.get('CRISIS_AI_TIMEOUT_SECONDS', '6'))
+    try:
+        return await asyncio.wait_for(generate, timeout=timeout)
+    except asyncio.TimeoutError:
+        logger.warning("Crisis reply timed out - returning the local crisis message")
+        return fallback_message
+
 # ==================== AUTH ROUTES ====================
 
 @api_router.post("/auth/register")
@@ -429,6 +765,12 @@ async def register(user_data: UserRegister):
     
     await db.users.insert_one(user.model_dump())
     
+    # New coaches join the registry; new clients get a coach right away
+    if role == "coach":
+        await coach_registry.invalidate()
+    else:
+        await coach_registry.coach_for_client(user_id)
+    
     # Create JWT token
     access_token = create_access_token(user_id, user_data.email)
     
@@ -487,6 +829,7 @@ async def upgrade_to_premium(request: Request):
         {"user_id": user.user_id},
         {"$set": {"role": "premium"}}
     )
+    event_bus.publish(RoleChanged(user.user_id, "premium", changed_by=user.user_id))
     return {"message": "Actualizado a premium", "role": "premium"}
 
 # ==================== DIRECT MESSAGES (Coach <-> User) ====================
@@ -496,17 +839,16 @@ async def send_message(message: DirectMessageCreate, request: Request):
     """Send a direct message (premium users to coach, or coach to users)"""
     user = await require_auth(request)
     
-    # Get coach user_id
-    coach = await db.users.find_one({"role": "coach"}, {"_id": 0})
-    coach_id = coach["user_id"] if coach else None
-    
     # Validate sender/receiver
     if user.role == "coach":
-        # Coach can send to any user
-        receiver = await db.users.find_one({"user_id": message.receiver_id}, {"_id": 0})
-        if not receiver:
+        # Coach can send to the clients in their caseload
+        if not await coach_registry.is_assigned(message.receiver_id, user.user_id):
             raise HTTPException(status_code=404, detail="Usuario no encontrado")
     else:
+        # Get the user's assigned coach
+        coach = await find_coach(user.user_id)
+        coach_id = coach.coach_id if coach else None
+        
         # Regular users can only send to coach
         if user.role != "premium":
             raise HTTPException(status_code=403, detail="Solo usuarios premium pueden enviar mensajes")
@@ -518,7 +860,8 @@ async def send_message(message: DirectMessageCreate, request: Request):
         receiver_id=message.receiver_id,
         content=message.content
     )
-    await db.direct_messages.insert_one(msg.model_dump())
+    await db.direct_messages.insert_one(msg.model_dump(exclude={"read"}))
+    event_bus.publish(MessageSent(msg.id, msg.sender_id, msg.receiver_id, msg.created_at))
     return msg
 
 @api_router.get("/messages/conversation/{other_user_id}", response_model=List[DirectMessage])
@@ -526,70 +869,151 @@ async def get_conversation(other_user_id: str, request: Request, limit: int = 50
     """Get conversation with another user"""
     user = await require_auth(request)
     
-    # Get messages between current user and other user
+    # The latest messages between current user and other user, oldest first
     messages = await db.direct_messages.find({
         "$or": [
             {"sender_id": user.user_id, "receiver_id": other_user_id},
             {"sender_id": other_user_id, "receiver_id": user.user_id}
         ]
-    }, {"_id": 0}).sort("created_at", 1).limit(limit).to_list(limit)
+    }, {"_id": 0}).sort("created_at", -1).limit(limit).to_list(limit)
+    messages.reverse()
     
-    # Mark messages as read
-    await db.direct_messages.update_many(
-        {"sender_id": other_user_id, "receiver_id": user.user_id, "read": False},
-        {"$set": {"read": True}}
-    )
+    # The read mark moves forward in the background (no write when nothing
+    # is unread), up to the newest message returned here: messages arriving
+    # before the consumer runs stay unread
+    read_up_to = max((m["created_at"] for m in messages if m["sender_id"] == other_user_id), default=None)
+    if read_up_to:
+        event_bus.publish(ConversationRead(user.user_id, other_user_id, read_up_to))
+    
+    # Derive the other side's read state from their high-water mark
+    other_read_up_to = await read_receipts.last_read_at(other_user_id, user.user_id)
+    for m in messages:
+        if m["receiver_id"] == user.user_id:
+            m["read"] = True
+        else:
+            m["read"] = other_read_up_to is not None and m["created_at"] <= other_read_up_to
     
     return [DirectMessage(**m) for m in messages]
 
-@api_router.get("/messages/coach-id")
+async def find_coach(client_id: Optional[str] = None) -> Optional[CoachInfo]:
+    """Look up the client's assigned coach (any coach when no client is given)"""
+    if client_id:
+        coach = await coach_registry.coach_for_client(client_id)
+    else:
+        coach = await coach_registry.default_coach()
+    if not coach:
+        return None
+    return CoachInfo(coach_id=coach["user_id"], coach_name=coach["name"])
+
+@api_router.get("/messages/coach-id", response_model=CoachInfo)
 async def get_coach_id(request: Request):
-    """Get the coach's user_id"""
-    coach = await db.users.find_one({"role": "coach"}, {"_id": 0})
+    """Get the user_id of the current user's coach"""
+    user = await get_current_user(request)
+    coach = await find_coach(user.user_id if user and user.role != "coach" else None)
     if not coach:
         raise HTTPException(status_code=404, detail="Coach no encontrada")
-    return {"coach_id": coach["user_id"], "coach_name": coach["name"]}
+    return coach
 
 @api_router.get("/messages/unread-count")
 async def get_unread_count(request: Request):
     """Get unread message count"""
     user = await require_auth(request)
-    count = await db.direct_messages.count_documents({
-        "receiver_id": user.user_id,
-        "read": False
-    })
+    count = await read_receipts.total_unread(user.user_id)
     return {"unread_count": count}
 
+# ==================== PUSH NOTIFICATIONS ====================
+
+MAX_PUSH_TOKENS_PER_USER = 5
+
+@api_router.post("/notifications/token")
+async def register_push_token(body: PushTokenRegister, request: Request):
+    """Register the device's Expo push token for the current user"""
+    user = await require_auth(request)
+    if not is_expo_token(body.token):
+        raise HTTPException(status_code=400, detail="Token de notificaciones inválido")
+    
+    # A device belongs to whoever signed in last on it
+    await db.users.update_many(
+        {"push_tokens": body.token, "user_id": {"$ne": user.user_id}},
+        {"$pull": {"push_tokens": body.token}}
+    )
+    # Keep the most recent devices, moving this token to the end
+    await db.users.update_one({"user_id": user.user_id}, [{"$set": {"push_tokens": {"$slice": [
+        {"$concatArrays": [
+            {"$filter": {"input": {"$ifNull": ["$push_tokens", []]}, "cond": {"$ne": ["$$this", body.token]}}},
+            [body.token]
+        ]},
+        -MAX_PUSH_TOKENS_PER_USER
+    ]}}}])
+    return {"message": "Notificaciones activadas"}
+
+@api_router.delete("/notifications/token")
+async def unregister_push_token(body: PushTokenRegister, request: Request):
+    """Stop sending pushes to a device (e.g. on logout)"""
+    user = await require_auth(request)
+    await db.users.update_one({"user_id": user.user_id}, {"$pull": {"push_tokens": body.token}})
+    return {"message": "Notificaciones desactivadas"}
+
 # ==================== COACH DASHBOARD ROUTES ====================
 
 @api_router.get("/coach/clients", response_model=List[Conversation])
-async def get_coach_clients(request: Request):
-    """Get all clients for the coach with their conversation status"""
-    await require_coach(request)
+async def get_coach_clients(request: Request, response: Response):
+    """Get the coach's assigned clients with their conversation status"""
+    coach = await require_coach(request)
+    
+    # Served from memory until a message, a read or a caseload change
+    cache_key = (coach.user_id, "clients")
+    version = "{}.{}".format(
+        await dashboard_cache.version(f"coach:{coach.user_id}"),
+        await coach_registry.caseload_version(coach.user_id)
+    )
+    hit = dashboard_cache.get(cache_key, version)
+    if hit:
+        return serialized_response(request, *hit)
     
-    # Get all premium users
+    # Only the clients assigned to this coach
+    client_ids = await coach_registry.caseload(coach.user_id)
+    
+    # The list only changes with the caseload, a new message either way or
+    # the coach reading a conversation (which moves the unread total)
+    last_sent, last_received, unread_total = await asyncio.gather(
+        db.direct_messages.find_one({"sender_id": coach.user_id}, {"_id": 0, "id": 1}, sort=[("created_at", -1)]),
+        db.direct_messages.find_one({"receiver_id": coach.user_id}, {"_id": 0, "id": 1}, sort=[("created_at", -1)]),
+        read_receipts.total_unread(coach.user_id)
+    )
+    etag = make_etag(
+        "coach_clients", coach.user_id, ",".join(sorted(client_ids)),
+        (last_sent or {}).get("id"), (last_received or {}).get("id"), unread_total
+    )
+    cached = not_modified(request, response, etag)
+    if cached:
+        return cached
     users = await db.users.find(
-        {"role": {"$in": ["premium", "user"]}},
-        {"_id": 0}
-    ).to_list(1000)
+        {"user_id": {"$in": client_ids}},
+        {"_id": 0, "password_hash": 0}
+    ).to_list(None)
+    
+    # Last message of every conversation in one aggregation
+    last_messages = await db.direct_messages.aggregate([
+        {"$match": {"$or": [
+            {"sender_id": coach.user_id, "receiver_id": {"$in": client_ids}},
+            {"receiver_id": coach.user_id, "sender_id": {"$in": client_ids}}
+        ]}},
+        {"$sort": {"created_at": -1}},
+        {"$group": {
+            "_id": {"$cond": [{"$eq": ["$sender_id", coach.user_id]}, "$receiver_id", "$sender_id"]},
+            "content": {"$first": "$content"},
+            "created_at": {"$first": "$created_at"}
+        }}
+    ]).to_list(None)
+    last_by_client = {row["_id"]: row for row in last_messages}
     
     conversations = []
     for user_doc in users:
-        # Get last message
-        last_msg = await db.direct_messages.find_one(
-            {"$or": [
-                {"sender_id": user_doc["user_id"]},
-                {"receiver_id": user_doc["user_id"]}
-            ]},
-            {"_id": 0},
-            sort=[("created_at", -1)]
-        )
+        last_msg = last_by_client.get(user_doc["user_id"])
         
         # Get unread count
-        unread = await db.direct_messages.count_documents({
-            "sender_id": user_doc["user_id"],
-            "read": False
-        })
+        unread = await read_receipts.unread_from(coach.user_id, user_doc["user_id"])
         
         conversations.append(Conversation(
             user_id=user_doc["user_id"],
@@ -602,37 +1026,122 @@ async def get_coach_clients(request: Request):
         ))
     
     # Sort by last message time
-    conversations.sort(key=lambda x: x.last_message_at or datetime.min.replace(tzinfo=timezone.utc), reverse=True)
-    return conversations
+    conversations.sort(key=lambda x: as_utc(x.last_message_at or datetime.min), reverse=True)
+    body = CONVERSATION_LIST.dump_json(conversations)
+    dashboard_cache.put(cache_key, version, body, etag)
+    return serialized_response(request, body, etag)
 
 @api_router.get("/coach/client/{user_id}/bitacoras", response_model=List[DailyBitacora])
 async def get_client_bitacoras(user_id: str, request: Request, limit: int = 30):
     """Get bitácoras for a specific client"""
-    await require_coach(request)
+    coach = await require_assigned_client(request, user_id)
+    
+    cache_key = (coach.user_id, "bitacoras", user_id, limit)
+    version = await dashboard_cache.version(f"client:{user_id}")
+    hit = dashboard_cache.get(cache_key, version)
+    if hit:
+        return serialized_response(request, hit[0])
     
     bitacoras = await db.bitacoras.find(
         {"user_id": user_id},
         {"_id": 0}
     ).sort("created_at", -1).limit(limit).to_list(limit)
     
-    return [DailyBitacora(**b) for b in bitacoras]
+    body = BITACORA_LIST.dump_json([DailyBitacora(**b) for b in bitacoras])
+    dashboard_cache.put(cache_key, version, body)
+    return serialized_response(request, body)
 
 @api_router.get("/coach/client/{user_id}/checkins", response_model=List[DailyCheckIn])
 async def get_client_checkins(user_id: str, request: Request, limit: int = 30):
     """Get check-ins for a specific client"""
-    await require_coach(request)
+    coach = await require_assigned_client(request, user_id)
+    
+    cache_key = (coach.user_id, "checkins", user_id, limit)
+    version = await dashboard_cache.version(f"client:{user_id}")
+    hit = dashboard_cache.get(cache_key, version)
+    if hit:
+        return serialized_response(request, hit[0])
     
     checkins = await db.checkins.find(
         {"user_id": user_id},
         {"_id": 0}
     ).sort("created_at", -1).limit(limit).to_list(limit)
     
-    return [DailyCheckIn(**c) for c in checkins]
+    body = CHECKIN_LIST.dump_json([DailyCheckIn(**c) for c in checkins])
+    dashboard_cache.put(cache_key, version, body)
+    return serialized_response(request, body)
+
+@api_router.get("/coach/bedtimes/late", response_model=List[LateBedtime])
+async def get_late_bedtimes(request: Request, after: str = "21:00", days: int = 7):
+    """Get the coach's clients put to bed after a given time in the last days"""
+    coach = await require_coach(request)
+    
+    after_min = parse_clock(after)
+    if after_min is None:
+        raise HTTPException(status_code=400, detail="Hora inválida, usa HH:MM")
+    
+    # Bedtimes after midnight (before noon) are later than any evening time
+    bedtime_filter = {"laid_down_for_bed_min": {"$gte": after_min}}
+    if after_min >= 12 * 60:
+        bedtime_filter = {"$or": [bedtime_filter, {"laid_down_for_bed_min": {"$lt": 12 * 60}}]}
+    
+    client_ids = await coach_registry.caseload(coach.user_id)
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
+    
+    # A report over days of entries: a secondary up to a couple of minutes behind is fine
+    analytics_db = read_router.db_for(ANALYTICS)
+    bitacoras = await analytics_db.bitacoras.find(
+        {"user_id": {"$in": client_ids}, "date": {"$gte": since}, **bedtime_filter},
+        {"_id": 0, "user_id": 1, "date": 1, "laid_down_for_bed": 1, "laid_down_for_bed_min": 1}
+    ).sort("date", -1).to_list(None)
+    
+    names = {
+        u["user_id"]: u["name"]
+        for u in await analytics_db.users.find(
+            {"user_id": {"$in": list({b["user_id"] for b in bitacoras})}},
+            {"_id": 0, "user_id": 1, "name": 1}
+        ).to_list(None)
+    }
+    return [LateBedtime(user_name=names.get(b["user_id"], ""), **b) for b in bitacoras]
+
+@api_router.get("/coach/search", response_model=List[SearchHit])
+async def search_client_entries(
+    request: Request,
+    q: str,
+    client_id: Optional[str] = None,
+    kind: Optional[str] = None,
+    limit: int = 20
+):
+    """Search the notes, brain dumps and messages of the coach's clients"""
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Escribe algo para buscar")
+    if kind is not None and kind not in SEARCH_SOURCES:
+        raise HTTPException(status_code=400, detail="Tipo de búsqueda inválido")
+    
+    if client_id:
+        coach = await require_assigned_client(request, client_id)
+        client_ids = [client_id]
+    else:
+        coach = await require_coach(request)
+        client_ids = await coach_registry.caseload(coach.user_id)
+    
+    hits = await coach_search.search(
+        coach.user_id, client_ids, q, kinds=[kind] if kind else None, limit=min(limit, 100)
+    )
+    
+    names = {
+        u["user_id"]: u["name"]
+        for u in await read_router.db_for(SEARCH).users.find(
+            {"user_id": {"$in": list({h["user_id"] for h in hits})}},
+            {"_id": 0, "user_id": 1, "name": 1}
+        ).to_list(None)
+    }
+    return [SearchHit(user_name=names.get(h["user_id"], ""), **h) for h in hits]
 
 @api_router.put("/coach/client/{user_id}/role")
 async def update_client_role(user_id: str, request: Request):
     """Toggle client premium status"""
-    await require_coach(request)
+    coach = await require_assigned_client(request, user_id)
     
     body = await request.json()
     new_role = body.get("role", "user")
@@ -641,24 +1150,51 @@ async def update_client_role(user_id: str, request: Request):
         raise HTTPException(status_code=400, detail="Rol inválido")
     
     result = await db.users.update_one(
-        {"user_id": user_id},
+        {"user_id": user_id, "role": {"$ne": "coach"}},
         {"$set": {"role": new_role}}
     )
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     
+    event_bus.publish(RoleChanged(user_id, new_role, changed_by=coach.user_id))
     return {"message": f"Rol actualizado a {new_role}"}
 
+@api_router.get("/coach/alerts", response_model=List[CrisisAlert])
+async def get_crisis_alerts(request: Request, include_acknowledged: bool = False, limit: int = 50):
+    """Get crisis alerts raised for the coach's clients, newest first"""
+    coach = await require_coach(request)
+    
+    query = {"coach_id": coach.user_id}
+    if not include_acknowledged:
+        query["acknowledged_at"] = None
+    
+    alerts = await db.crisis_alerts.find(query, {"_id": 0}).sort("created_at", -1).limit(limit).to_list(limit)
+    return [CrisisAlert(**a) for a in alerts]
+
+@api_router.post("/coach/alerts/{alert_id}/acknowledge", response_model=CrisisAlert)
+async def acknowledge_crisis_alert(alert_id: str, request: Request):
+    """Mark a crisis alert as handled"""
+    coach = await require_coach(request)
+    
+    alert = await db.crisis_alerts.find_one_and_update(
+        {"id": alert_id, "coach_id": coach.user_id},
+        {"$set": {"acknowledged_at": datetime.now(timezone.utc)}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if not alert:
+        raise HTTPException(status_code=404, detail="Alerta no encontrada")
+    return CrisisAlert(**alert)
+
 # ==================== EXISTING ROUTES (Updated with auth) ====================
 
 @api_router.get("/")
 async def root():
     return {"message": "MAMÁ RESPIRA API - Bienvenida"}
 
-@api_router.get("/validations/random", response_model=ValidationCard)
-async def get_random_validation(category: Optional[str] = None):
-    """Get a random validation card"""
+async def pick_random_validation(category: Optional[str] = None) -> ValidationCard:
+    """Pick a random validation card, seeding the defaults if none exist"""
     query = {}
     if category:
         query["category"] = category
@@ -674,6 +1210,11 @@ async def get_random_validation(category: Optional[str] = None):
     selected = random.choice(validations)
     return ValidationCard(**selected)
 
+@api_router.get("/validations/random", response_model=ValidationCard)
+async def get_random_validation(category: Optional[str] = None):
+    """Get a random validation card"""
+    return await pick_random_validation(category)
+
 @api_router.get("/validations", response_model=List[ValidationCard])
 async def get_all_validations():
     """Get all validation cards"""
@@ -691,28 +1232,86 @@ async def create_checkin(checkin: DailyCheckInCreate, request: Request):
     user = await get_current_user(request)
     user_id = user.user_id if user else "default_user"
     
-    ai_response = await get_validation_response(checkin.mood, checkin.brain_dump)
+    signal = classify_crisis(checkin.brain_dump)
+    if signal:
+        run_detached(alert_coach(user, signal, "checkin", checkin.brain_dump))
+        ai_response = await generate_with_deadline(
+            get_validation_response(checkin.mood, checkin.brain_dump, PRIORITY_CRISIS, CRISIS_MESSAGE),
+            CRISIS_MESSAGE
+        )
+    else:
+        ai_response = await get_validation_response(checkin.mood, checkin.brain_dump)
     
     checkin_obj = DailyCheckIn(
         **checkin.model_dump(),
         user_id=user_id,
-        ai_response=ai_response
+        ai_response=ai_response,
+        crisis=crisis_support(signal) if signal else None
     )
-    await db.checkins.insert_one(checkin_obj.model_dump())
+    await db.checkins.insert_one(checkin_obj.model_dump(exclude={"crisis"}))
+    event_bus.publish(CheckInCreated(
+        checkin_obj.id, user_id, checkin_obj.mood, crisis_level=signal.level if signal else None
+    ))
     return checkin_obj
 
 @api_router.get("/checkins", response_model=List[DailyCheckIn])
-async def get_checkins(request: Request, limit: int = 7):
+async def get_checkins(request: Request, response: Response, limit: int = 7):
     """Get recent check-ins for current user"""
     user = await get_current_user(request)
     user_id = user.user_id if user else "default_user"
     
+    etag = make_etag("checkins", user_id, limit, *await entries_version(db.checkins, user_id))
+    cached = not_modified(request, response, etag)
+    if cached:
+        return cached
+    
     checkins = await db.checkins.find(
         {"user_id": user_id},
         {"_id": 0}
     ).sort("created_at", -1).limit(limit).to_list(limit)
     return [DailyCheckIn(**c) for c in checkins]
 
+# Messages of the AI chat kept as context for each reply
+CHAT_CONTEXT_MESSAGES = 10
+
+# Turns whose write is still in flight, by (session_id, user_id)
+pending_chat_writes = {}
+
+def persist_chat_turn(session_id: str, user_id: str, messages: List[dict]) -> None:
+    """Store a chat turn in the background with a single append"""
+    key = (session_id, user_id)
+    previous = pending_chat_writes.get(key)
+    
+    async def write():
+        # Turns of the same session are written in order
+        if previous:
+            await asyncio.gather(previous, return_exceptions=True)
+        try:
+            await chat_store.append(session_id, user_id, messages)
+        except Exception as e:
+            logger.error(f"Could not store chat turn of session {session_id}: {e}")
+    
+    task = asyncio.create_task(write())
+    pending_chat_writes[key] = task
+    background_tasks.add(task)
+    
+    def done(finished):
+        background_tasks.discard(finished)
+        if pending_chat_writes.get(key) is finished:
+            del pending_chat_writes[key]
+    task.add_done_callback(done)
+
+async def wait_for_chat_writes(session_id: str, user_id: str) -> None:
+    """Let this worker's in-flight writes for a session land before reading it"""
+    pending = pending_chat_writes.get((session_id, user_id))
+    if pending:
+        await asyncio.gather(pending, return_exceptions=True)
+
+async def load_chat_context(session_id: str, user_id: str) -> List[dict]:
+    """Previous turns of a session to send along with a new message"""
+    await wait_for_chat_writes(session_id, user_id)
+    return await chat_store.history(session_id, user_id, CHAT_CONTEXT_MESSAGES)
+
 @api_router.post("/chat", response_model=ChatMessage)
 async def send_chat_message(message: ChatMessageCreate, request: Request):
     """Send a message to the AI chatbot"""
@@ -725,9 +1324,21 @@ async def send_chat_message(message: ChatMessageCreate, request: Request):
         role="user",
         content=message.content
     )
-    await db.chat_messages.insert_one(user_msg.model_dump())
     
-    ai_response = await get_ai_response(message.content, message.session_id, user_id)
+    # History is read before this turn is stored, so it holds previous turns only
+    history = await load_chat_context(message.session_id, user_id)
+    
+    # Crisis signals are detected locally before calling Claude: the coach is
+    # alerted right away and the reply jumps the queue with a bounded wait
+    signal = classify_crisis(message.content)
+    if signal:
+        run_detached(alert_coach(user, signal, "chat", message.content))
+        ai_response = await generate_with_deadline(
+            get_ai_response(message.content, history, PRIORITY_CRISIS, CRISIS_MESSAGE),
+            CRISIS_MESSAGE
+        )
+    else:
+        ai_response = await get_ai_response(message.content, history)
     
     ai_msg = ChatMessage(
         session_id=message.session_id,
@@ -735,83 +1346,129 @@ async def send_chat_message(message: ChatMessageCreate, request: Request):
         role="assistant",
         content=ai_response
     )
-    await db.chat_messages.insert_one(ai_msg.model_dump())
+    
+    # Both messages are stored with one write that does not delay the reply
+    persist_chat_turn(message.session_id, user_id, [
+        user_msg.model_dump(exclude={"crisis"}),
+        ai_msg.model_dump(exclude={"crisis"})
+    ])
+    if signal:
+        ai_msg.crisis = crisis_support(signal)
     
     return ai_msg
 
 @api_router.get("/chat/{session_id}", response_model=List[ChatMessage])
-async def get_chat_history(session_id: str, request: Request, limit: int = 50):
+async def get_chat_history(session_id: str, request: Request, response: Response, limit: int = 50):
     """Get chat history for a session"""
     user = await get_current_user(request)
     user_id = user.user_id if user else "default_user"
     
-    messages = await db.chat_messages.find(
-        {"session_id": session_id, "user_id": user_id},
-        {"_id": 0}
-    ).sort("created_at", 1).limit(limit).to_list(limit)
+    await wait_for_chat_writes(session_id, user_id)
+    etag = make_etag("chat", user_id, session_id, limit, await chat_store.version(session_id, user_id))
+    cached = not_modified(request, response, etag)
+    if cached:
+        return cached
+    
+    messages = await chat_store.history(session_id, user_id, limit)
+    if len(messages) < limit:
+        # Older turns may have been compacted into the archive
+        live_ids = {m["id"] for m in messages}
+        older = await chat_archive.history(session_id, user_id, limit - len(messages))
+        messages = [m for m in older if m["id"] not in live_ids] + messages
     return [ChatMessage(**m) for m in messages]
 
-@api_router.get("/community/presence", response_model=CommunityPresence)
-async def get_community_presence():
-    """Get simulated community presence"""
-    current_hour = datetime.now().hour
-    
-    if 20 <= current_hour or current_hour < 6:
-        base_count = random.randint(45, 120)
-    elif 6 <= current_hour < 12:
-        base_count = random.randint(25, 60)
-    else:
-        base_count = random.randint(15, 40)
+async def build_community_presence() -> CommunityPresence:
+    """Build the presence payload from the precomputed online count"""
+    online_count = await presence.current_count(state_backend)
     
     names = ["Marta", "Ana", "Lucía", "Carmen", "María", "Paula", "Laura",
              "Elena", "Sara", "Isabel", "Sofía", "Alba", "Nuria", "Andrea"]
     
     sample = random.sample(names, min(3, len(names)))
     
+    if online_count > 1:
+        message = f"{sample[0]} y {online_count - 1} mamás más están despiertas contigo ahora mismo."
+    else:
+        message = "No estás sola. Cada noche, muchas mamás pasan por lo mismo que tú."
+    
     return CommunityPresence(
-        online_count=base_count,
+        online_count=online_count,
         sample_names=sample,
-        message=f"{sample[0]} y {base_count - 1} mamás más están despiertas contigo ahora mismo."
+        message=message
     )
 
+@api_router.get("/community/presence", response_model=CommunityPresence)
+async def get_community_presence():
+    """Get community presence: distinct mamás active in the last minutes"""
+    return await build_community_presence()
+
 @api_router.post("/bitacora", response_model=DailyBitacora)
 async def create_bitacora(bitacora: DailyBitacoraCreate, request: Request):
-    """Create a new daily bitácora entry"""
+    """Create the daily bitácora entry, or update it if the date was already logged"""
     user = await get_current_user(request)
     user_id = user.user_id if user else "default_user"
     
-    count = await db.bitacoras.count_documents({"user_id": user_id})
+    # One entry per (user_id, date): reuse the existing day number when editing
+    existing = await db.bitacoras.find_one(
+        {"user_id": user_id, "date": bitacora.date},
+        {"_id": 0, "day_number": 1}
+    )
+    if existing:
+        day_number = existing["day_number"]
+    else:
+        day_number = await next_counter_value(db, user_id, BITACORA_DAY_FIELD)
     
     bitacora_obj = DailyBitacora(
-        **bitacora.model_dump(),
+        **bitacora.model_dump(exclude={"day_number"}),
         user_id=user_id,
-        day_number=count + 1
+        day_number=day_number
     )
     
-    ai_summary = await generate_bitacora_summary(bitacora_obj)
-    bitacora_obj.ai_summary = ai_summary
+    # The coach summary is generated after the response (see
+    # on_bitacora_created) or with the nightly batch. An edit also drops any
+    # batch or background claim on the previous version so a stale summary is
+    # not written back.
+    bitacora_obj.ai_pending = True
     
-    await db.bitacoras.insert_one(bitacora_obj.model_dump())
-    return bitacora_obj
+    # Upsert keyed by (user_id, date); identity fields are only written on insert
+    doc = bitacora_obj.model_dump()
+    on_insert = {key: doc.pop(key) for key in ("id", "day_number", "created_at", "client_id")}
+    key = {"user_id": user_id, "date": bitacora.date}
+    update = {"$set": doc, "$setOnInsert": on_insert, "$unset": {**SUMMARY_CLAIM_UNSET, **AI_CLAIM_UNSET}}
+    try:
+        saved = await db.bitacoras.find_one_and_update(
+            key, update, projection={"_id": 0}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # A concurrent request inserted the same date first: this becomes an
+        # edit of its entry (the day number reserved here is left unused)
+        saved = await db.bitacoras.find_one_and_update(
+            key, update, projection={"_id": 0}, return_document=ReturnDocument.AFTER
+        )
+    await invalidate_client_views(user_id)
+    # Our id is only stored when this request inserted the entry
+    event_bus.publish(BitacoraCreated(saved["id"], user_id, saved["date"], is_new=saved["id"] == on_insert["id"]))
+    return DailyBitacora(**saved)
 
 @api_router.get("/bitacora", response_model=List[DailyBitacora])
-async def get_bitacoras(request: Request, limit: int = 30):
+async def get_bitacoras(request: Request, response: Response, limit: int = 30):
     """Get recent bitácora entries for current user"""
     user = await get_current_user(request)
     user_id = user.user_id if user else "default_user"
     
+    etag = make_etag("bitacora", user_id, limit, *await entries_version(db.bitacoras, user_id))
+    cached = not_modified(request, response, etag)
+    if cached:
+        return cached
+    
     bitacoras = await db.bitacoras.find(
         {"user_id": user_id},
         {"_id": 0}
     ).sort("created_at", -1).limit(limit).to_list(limit)
     return [DailyBitacora(**b) for b in bitacoras]
 
-@api_router.get("/bitacora/today", response_model=Optional[DailyBitacora])
-async def get_today_bitacora(request: Request):
-    """Get today's bitácora if exists"""
-    user = await get_current_user(request)
-    user_id = user.user_id if user else "default_user"
-    
+async def find_today_bitacora(user_id: str) -> Optional[DailyBitacora]:
+    """Look up the bitácora logged today (UTC) by a user"""
     today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
     bitacora = await db.bitacoras.find_one(
         {"user_id": user_id, "date": today},
@@ -821,23 +1478,806 @@ async def get_today_bitacora(request: Request):
         return DailyBitacora(**bitacora)
     return None
 
-# Include the router
-app.include_router(api_router)
+@api_router.get("/bitacora/today", response_model=Optional[DailyBitacora])
+async def get_today_bitacora(request: Request):
+    """Get today's bitácora if exists"""
+    user = await get_current_user(request)
+    user_id = user.user_id if user else "default_user"
+    return await find_today_bitacora(user_id)
+
+# ==================== APP BOOTSTRAP ====================
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+@api_router.get("/bootstrap", response_model=AppBootstrap)
+async def get_bootstrap(request: Request):
+    """Everything the app needs on launch in one round trip
+    
+    Authenticates once and runs the launch queries concurrently. A failing
+    section is returned as null and listed in ``errors`` instead of failing
+    the whole response.
+    """
+    user = await require_auth(request)
+    
+    sections = {
+        "bitacora_today": find_today_bitacora(user.user_id),
+        "unread_count": read_receipts.total_unread(user.user_id),
+        "coach": find_coach(user.user_id if user.role != "coach" else None),
+        "validation": pick_random_validation(),
+        "presence": build_community_presence(),
+    }
+    results = await asyncio.gather(*sections.values(), return_exceptions=True)
+    
+    payload = {"user": user.model_dump(exclude={'password_hash'}), "errors": {}}
+    for name, result in zip(sections, results):
+        if isinstance(result, Exception):
+            logger.error(f"Bootstrap section {name} failed: {result}")
+            payload[name] = None
+            payload["errors"][name] = type(result).__name__
+        else:
+            payload[name] = result
+    return AppBootstrap(**payload)
+
+# ==================== OFFLINE SYNC ====================
+
+# Largest batch accepted by POST /sync
+SYNC_MAX_ENTRIES = 100
+
+# Pull watermarks trail the query time so writes in flight are not skipped;
+# clients upsert by id, so the overlap only repeats a few entries
+SYNC_WATERMARK_OVERLAP = timedelta(seconds=5)
+
+# A worker that claimed an entry's AI generation and has not finished within
+# this long is presumed dead; the entry can then be claimed again
+AI_CLAIM_TIMEOUT = timedelta(minutes=10)
+AI_CLAIM_UNSET = {"ai_claimed_at": ""}
+
+def unclaimed_ai_filter(now: datetime) -> dict:
+    """Match entries no live worker is generating AI content for"""
+    return {"$or": [
+        {"ai_claimed_at": {"$exists": False}},
+        {"ai_claimed_at": {"$lt": now - AI_CLAIM_TIMEOUT}},
+    ]}
+
+async def claim_ai_work(collection, entry_id: str, projection: dict) -> Optional[dict]:
+    """
+    Claim a pending entry's AI generation for this worker
+    
+    Every worker may queue the same entry (startup sweeps, replays), so the
+    claim is taken atomically before Claude is called and only one of them
+    generates it.
+    
+    Args:
+        collection: db.checkins or db.bitacoras
+        entry_id: Entry id
+        projection: Fields of the document to return
+    
+    Returns:
+        The claimed document with its ``ai_claimed_at``, or None if the entry
+        is done or claimed by another worker
+    """
+    now = datetime.now(timezone.utc)
+    return await collection.find_one_and_update(
+        {"id": entry_id, "ai_pending": True, **unclaimed_ai_filter(now)},
+        {"$set": {"ai_claimed_at": now}},
+        projection={**projection, "ai_claimed_at": 1},
+        return_document=ReturnDocument.AFTER
+    )
+
+def as_utc(value: datetime) -> datetime:
+    """Mongo returns naive UTC datetimes; make them comparable with aware ones"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+def checkin_ai_job(checkin_id: str, mood: int, brain_dump: Optional[str]):
+    """Background job generating the validation response of a synced check-in"""
+    async def job():
+        claim = await claim_ai_work(db.checkins, checkin_id, {"_id": 0, "user_id": 1})
+        if not claim:
+            return
+        claimed = {"id": checkin_id, "ai_claimed_at": claim["ai_claimed_at"]}
+        try:
+            if classify_crisis(brain_dump):
+                ai_response = await get_validation_response(mood, brain_dump, PRIORITY_CRISIS, CRISIS_MESSAGE)
+            else:
+                ai_response = await get_validation_response(mood, brain_dump, PRIORITY_BACKGROUND)
+        except Exception:
+            await db.checkins.update_one(claimed, {"$unset": AI_CLAIM_UNSET})
+            raise
+        result = await db.checkins.find_one_and_update(
+            claimed,
+            {
+                "$set": {"ai_response": ai_response, "ai_pending": False, "updated_at": datetime.now(timezone.utc)},
+                "$unset": AI_CLAIM_UNSET,
+            },
+            projection={"_id": 0, "user_id": 1}
+        )
+        if result:
+            await invalidate_client_views(result["user_id"])
+    return job
+
+def bitacora_ai_job(bitacora_id: str):
+    """Background job generating the coach summary of a synced bitácora"""
+    async def job():
+        doc = await claim_ai_work(db.bitacoras, bitacora_id, {"_id": 0})
+        if not doc:
+            return
+        claimed = {"id": bitacora_id, "ai_claimed_at": doc["ai_claimed_at"]}
+        try:
+            ai_summary = await generate_bitacora_summary(DailyBitacora(**doc), PRIORITY_BACKGROUND)
+        except Exception:
+            await db.bitacoras.update_one(claimed, {"$unset": AI_CLAIM_UNSET})
+            raise
+        # An edit made meanwhile drops the claim, so its stale summary is not written
+        await db.bitacoras.update_one(
+            claimed,
+            {
+                "$set": {"ai_summary": ai_summary, "ai_pending": False, "updated_at": datetime.now(timezone.utc)},
+                "$unset": AI_CLAIM_UNSET,
+            }
+        )
+        await invalidate_client_views(doc["user_id"])
+    return job
+
+async def requeue_pending_ai_jobs(limit: int = 500):
+    """Queue AI work left pending by a restart or a full queue (the jobs claim each entry)"""
+    unclaimed = unclaimed_ai_filter(datetime.now(timezone.utc))
+    pending_checkins = await db.checkins.find(
+        {"ai_pending": True, **unclaimed}, {"_id": 0, "id": 1, "mood": 1, "brain_dump": 1}
+    ).limit(limit).to_list(limit)
+    for c in pending_checkins:
+        ai_jobs.submit(checkin_ai_job(c["id"], c["mood"], c.get("brain_dump")))
+    
+    # In batch mode pending bitácoras wait for the nightly batch instead
+    if summaries_are_batched():
+        return
+    pending_bitacoras = await db.bitacoras.find(
+        {"ai_pending": True, **unclaimed}, {"_id": 0, "id": 1}
+    ).limit(limit).to_list(limit)
+    for b in pending_bitacoras:
+        ai_jobs.submit(bitacora_ai_job(b["id"]))
+
+async def sync_checkins(user: User, entries: List[SyncCheckIn]) -> List[SyncItemResult]:
+    """Insert offline check-ins once per client_id with a single bulk write"""
+    user_id = user.user_id
+    now = datetime.now(timezone.utc)
+    by_client_id = {entry.client_id: entry for entry in entries}
+    
+    checkins = []
+    for entry in by_client_id.values():
+        created_at = min(as_utc(entry.created_at), now) if entry.created_at else now
+        checkins.append(DailyCheckIn(
+            **entry.model_dump(exclude={"client_id", "created_at"}),
+            user_id=user_id,
+            client_id=entry.client_id,
+            ai_pending=True,
+            created_at=created_at,
+            updated_at=now
+        ))
+    
+    result = await db.checkins.bulk_write([
+        UpdateOne(
+            {"user_id": user_id, "client_id": c.client_id},
+            {"$setOnInsert": c.model_dump(exclude={"crisis"})},
+            upsert=True
+        )
+        for c in checkins
+    ], ordered=True)
+    created = {checkins[index].client_id for index in result.upserted_ids}
+    
+    stored = await db.checkins.find(
+        {"user_id": user_id, "client_id": {"$in": list(by_client_id)}},
+        {"_id": 0, "id": 1, "client_id": 1}
+    ).to_list(None)
+    ids = {doc["client_id"]: doc["id"] for doc in stored}
+    
+    for c in checkins:
+        if c.client_id not in created:
+            continue
+        signal = classify_crisis(c.brain_dump)
+        event_bus.publish(CheckInCreated(c.id, user_id, c.mood, crisis_level=signal.level if signal else None))
+        if signal:
+            # Crisis entries skip the background queue and alert the coach
+            run_detached(alert_coach(user, signal, "sync", c.brain_dump))
+            run_detached(checkin_ai_job(c.id, c.mood, c.brain_dump)())
+        else:
+            ai_jobs.submit(checkin_ai_job(c.id, c.mood, c.brain_dump))
+    
+    return [
+        SyncItemResult(
+            kind="checkin",
+            client_id=c.client_id,
+            id=ids.get(c.client_id, c.id),
+            status="created" if c.client_id in created else "duplicate"
+        )
+        for c in checkins
+    ]
+
+# Client ids of the latest offline edits applied to a bitácora, kept so a
+# replay of any of them is recognized
+SYNC_CLIENT_ID_HISTORY = 20
+
+# Fields logged by the mamá; a change in any of them needs a new summary
+BITACORA_CONTENT_FIELDS = set(BitacoraFields.model_fields)
+
+async def sync_bitacoras(user_id: str, entries: List[SyncBitacora]) -> List[SyncItemResult]:
+    """Upsert offline bitácoras by (user_id, date) with a single bulk write
+    
+    An entry whose client_id was already applied to its date is a replay and
+    is not written again. An entry with the content already stored only
+    records its client_id, so the summary is regenerated only on a change.
+    """
+    now = datetime.now(timezone.utc)
+    by_date = {entry.date: entry for entry in entries}
+    
+    existing = await db.bitacoras.find(
+        {"user_id": user_id, "date": {"$in": list(by_date)}},
+        {"_id": 0, "id": 1, "client_id": 1, "sync_client_ids": 1, **{field: 1 for field in BITACORA_CONTENT_FIELDS}}
+    ).to_list(None)
+    stored = {doc["date"]: doc for doc in existing}
+    
+    # Reserve day numbers for all new dates with one counter update
+    new_dates = sorted(date for date in by_date if date not in stored)
+    day_numbers = {}
+    if new_dates:
+        first = await reserve_counter_values(db, user_id, BITACORA_DAY_FIELD, len(new_dates))
+        day_numbers = {date: first + offset for offset, date in enumerate(new_dates)}
+    
+    operations = []
+    operation_dates = []
+    changed = []
+    for date, entry in by_date.items():
+        current = stored.get(date)
+        if current and entry.client_id in (current.get("client_id"), *current.get("sync_client_ids", [])):
+            continue
+        record_client_id = {"sync_client_ids": {"$each": [entry.client_id], "$slice": -SYNC_CLIENT_ID_HISTORY}}
+        content = entry.model_dump(include=BITACORA_CONTENT_FIELDS)
+        if current and all(current.get(field) == value for field, value in content.items()):
+            operations.append(UpdateOne({"user_id": user_id, "date": date}, {"$push": record_client_id}))
+            operation_dates.append(date)
+            continue
+        
+        bitacora = DailyBitacora(
+            **entry.model_dump(exclude={"day_number", "client_id"}),
+            user_id=user_id,
+            client_id=entry.client_id,
+            day_number=day_numbers.get(date, 0),
+            ai_pending=True,
+            created_at=now,
+            updated_at=now
+        )
+        doc = bitacora.model_dump()
+        on_insert = {key: doc.pop(key) for key in ("id", "day_number", "created_at", "client_id")}
+        operations.append(UpdateOne(
+            {"user_id": user_id, "date": date},
+            {
+                "$set": doc,
+                "$setOnInsert": on_insert,
+                "$unset": {**SUMMARY_CLAIM_UNSET, **AI_CLAIM_UNSET},
+                "$push": record_client_id,
+            },
+            upsert=True
+        ))
+        operation_dates.append(date)
+        changed.append(date)
+    
+    created = set()
+    if operations:
+        result = await db.bitacoras.bulk_write(operations, ordered=True)
+        created = {operation_dates[index] for index in result.upserted_ids}
+    ids = {date: doc["id"] for date, doc in stored.items()}
+    if changed:
+        await invalidate_client_views(user_id)
+        # Dates inserted here, or by a concurrent request since the read above
+        missing = [date for date in changed if date not in ids]
+        if missing:
+            inserted = await db.bitacoras.find(
+                {"user_id": user_id, "date": {"$in": missing}},
+                {"_id": 0, "id": 1, "date": 1}
+            ).to_list(None)
+            ids.update({doc["date"]: doc["id"] for doc in inserted})
+        for date in changed:
+            event_bus.publish(BitacoraCreated(ids[date], user_id, date, is_new=date in created))
+    
+    return [
+        SyncItemResult(
+            kind="bitacora",
+            client_id=entry.client_id,
+            id=ids[date],
+            status="created" if date in created else "updated" if date in changed else "duplicate"
+        )
+        for date, entry in by_date.items()
+    ]
+
+@api_router.post("/sync", response_model=SyncPushResponse)
+async def push_sync(batch: SyncPushRequest, request: Request):
+    """Store a batch of check-ins and bitácoras logged while offline
+    
+    Entries carry a client-generated ``client_id`` so replaying a batch is
+    safe. AI responses are generated in the background; entries come back
+    with ``ai_pending`` set and show up in the next pull once ready.
+    """
+    user = await require_auth(request)
+    
+    if len(batch.checkins) + len(batch.bitacoras) > SYNC_MAX_ENTRIES:
+        raise HTTPException(status_code=413, detail=f"Máximo {SYNC_MAX_ENTRIES} registros por sincronización")
+    
+    results = []
+    if batch.checkins:
+        results += await sync_checkins(user, batch.checkins)
+    if batch.bitacoras:
+        results += await sync_bitacoras(user.user_id, batch.bitacoras)
+    return SyncPushResponse(results=results)
+
+@api_router.get("/sync", response_model=SyncPullResponse)
+async def pull_sync(request: Request, since: Optional[datetime] = None, since_id: Optional[str] = None,
+                    limit: int = 200):
+    """Get check-ins and bitácoras changed since the device's last sync
+    
+    Entries are paged in ``(updated_at, id)`` order: the entries of one sync
+    batch share ``updated_at``, so a page can end in the middle of them and
+    the next one continues after the id it stopped at.
+    """
+    user = await require_auth(request)
+    started = datetime.now(timezone.utc)
+    
+    query = {"user_id": user.user_id}
+    if since:
+        query["$or"] = [
+            {"updated_at": {"$gt": since}},
+            {"updated_at": since, "id": {"$gt": since_id or ""}},
+        ]
+    order = [("updated_at", 1), ("id", 1)]
+    
+    checkins, bitacoras = await asyncio.gather(
+        db.checkins.find(query, {"_id": 0}).sort(order).limit(limit).to_list(limit),
+        db.bitacoras.find(query, {"_id": 0}).sort(order).limit(limit).to_list(limit)
+    )
+    
+    # When a page is full, continue after the oldest last entry of the full
+    # pages; an empty id resumes with every entry of the watermark's instant
+    cursor = (started - SYNC_WATERMARK_OVERLAP, "")
+    full_pages = [docs for docs in (checkins, bitacoras) if len(docs) == limit]
+    for docs in full_pages:
+        last = docs[-1]
+        cursor = min(cursor, (as_utc(last.get("updated_at") or last["created_at"]), last["id"]))
+    
+    return SyncPullResponse(
+        checkins=[DailyCheckIn(**c) for c in checkins],
+        bitacoras=[DailyBitacora(**b) for b in bitacoras],
+        watermark=cursor[0],
+        watermark_id=cursor[1] or None,
+        has_more=bool(full_pages)
+    )
+
+# ==================== NIGHTLY SUMMARY BATCHES ====================
+
+# Claim fields marking bitácoras included in an in-flight summary batch
+SUMMARY_CLAIM_UNSET = {"summary_batch": "", "summary_claimed_at": ""}
+
+# Batches end within 24h; older claims belong to a run that died before
+# recording its batch and are picked up again
+SUMMARY_CLAIM_TIMEOUT = timedelta(hours=25)
+
+def summaries_are_batched() -> bool:
+    """Whether bitácora summaries wait for the nightly batch (BITACORA_SUMMARY_MODE=batch)"""
+    return os.environ.get('BITACORA_SUMMARY_MODE', 'realtime').lower() == "batch"
+
+def summary_batch_runner() -> MessageBatchRunner:
+    return MessageBatchRunner(
+        claude_client,
+        poll_interval=float(os.environ.get('BITACORA_BATCH_POLL_SECONDS', '60'))
+    )
+
+async def collect_summary_batch(batch_id: str, token: str) -> dict:
+    """Wait for a summary batch and write its results back with one bulk write"""
+    runner = summary_batch_runner()
+    if not await runner.wait(batch_id):
+        return {"batch_id": batch_id, "status": "pending"}
+    texts = await runner.results(batch_id)
+    
+    now = datetime.now(timezone.utc)
+    operations = []
+    for bitacora_id, text in texts.items():
+        if text:
+            update = {"$set": {"ai_summary": text, "ai_pending": False, "updated_at": now}, "$unset": SUMMARY_CLAIM_UNSET}
+        else:
+            # Released so the next night's batch retries it
+            update = {"$unset": SUMMARY_CLAIM_UNSET}
+        # Matching the claim skips entries edited after submission
+        operations.append(UpdateOne({"id": bitacora_id, "summary_batch": token}, update))
+    if operations:
+        await db.bitacoras.bulk_write(operations, ordered=False)
+        summarized = [bitacora_id for bitacora_id, text in texts.items() if text]
+        await invalidate_client_views(*await db.bitacoras.distinct("user_id", {"id": {"$in": summarized}}))
+    # Entries missing from the results are released too
+    await db.bitacoras.update_many({"summary_batch": token}, {"$unset": SUMMARY_CLAIM_UNSET})
+    
+    succeeded = sum(1 for text in texts.values() if text)
+    await db.summary_batches.update_one(
+        {"id": batch_id},
+        {"$set": {"status": "ended", "ended_at": now, "succeeded": succeeded, "failed": len(texts) - succeeded}}
+    )
+    logger.info(f"Summary batch {batch_id}: {succeeded} summaries written, {len(texts) - succeeded} failed")
+    return {"batch_id": batch_id, "status": "ended", "succeeded": succeeded, "failed": len(texts) - succeeded}
+
+async def summarize_pending_bitacoras() -> Optional[dict]:
+    """Claim every pending bitácora, submit one summary batch and write the results back"""
+    if not claude_client.enabled:
+        logger.warning("Anthropic API key not configured - skipping summary batch")
+        return None
+    
+    # Claims are per document, so concurrent workers never batch the same entry
+    token = str(uuid.uuid4())
+    now = datetime.now(timezone.utc)
+    await db.bitacoras.update_many(
+        {"ai_pending": True, "$or": [
+            {"summary_claimed_at": None},
+            {"summary_claimed_at": {"$lt": now - SUMMARY_CLAIM_TIMEOUT}}
+        ]},
+        {"$set": {"summary_batch": token, "summary_claimed_at": now}}
+    )
+    docs = await db.bitacoras.find({"summary_batch": token}, {"_id": 0}).to_list(None)
+    if not docs:
+        return None
+    
+    runner = summary_batch_runner()
+    requests = []
+    empty = []
+    for doc in docs:
+        bitacora = DailyBitacora(**doc)
+        prompt = build_bitacora_summary_prompt(bitacora)
+        if prompt:
+            requests.append(runner.build_request(
+                bitacora.id, BITACORA_SUMMARY_SYSTEM_PROMPT, prompt, ROUTE_BITACORA_SUMMARY
+            ))
+        else:
+            empty.append(bitacora.id)
+    
+    if empty:
+        await db.bitacoras.update_many(
+            {"id": {"$in": empty}, "summary_batch": token},
+            {"$set": {"ai_summary": "Registro guardado. La coach revisará los datos.", "ai_pending": False, "updated_at": now},
+             "$unset": SUMMARY_CLAIM_UNSET}
+        )
+        await invalidate_client_views(*{doc["user_id"] for doc in docs if doc["id"] in empty})
+    if not requests:
+        return None
+    
+    try:
+        batch_id = await runner.submit(requests)
+    except Exception:
+        await db.bitacoras.update_many({"summary_batch": token}, {"$unset": SUMMARY_CLAIM_UNSET})
+        raise
+    await db.summary_batches.insert_one({
+        "id": batch_id, "token": token, "status": "submitted", "requests": len(requests), "created_at": now
+    })
+    return await collect_summary_batch(batch_id, token)
+
+def seconds_until_batch_time() -> float:
+    """Seconds until the next BITACORA_BATCH_TIME (HH:MM, UTC)"""
+    hour, minute = (int(part) for part in os.environ.get('BITACORA_BATCH_TIME', '03:00').split(":"))
+    now = datetime.now(timezone.utc)
+    next_run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+async def run_summary_batches():
+    """Resume batches left in flight by a restart, then submit a new one every night"""
+    for batch in await db.summary_batches.find({"status": "submitted"}, {"_id": 0}).to_list(None):
+        try:
+            await collect_summary_batch(batch["id"], batch["token"])
+        except Exception as e:
+            logger.error(f"Could not collect summary batch {batch['id']}: {e}")
+    while True:
+        await asyncio.sleep(seconds_until_batch_time())
+        try:
+            await summarize_pending_bitacoras()
+        except Exception as e:
+            logger.error(f"Nightly summary batch failed: {e}")
+
+# ==================== DOMAIN EVENT CONSUMERS ====================
+
+async def on_direct_message_event(event):
+    """Keep unread counters and read marks current, in publish order"""
+    # Cached conversation lists are dropped once the counters are current
+    if isinstance(event, MessageSent):
+        await read_receipts.record_message(event.sender_id, event.receiver_id)
+        await invalidate_coach_views(event.sender_id, event.receiver_id)
+    elif isinstance(event, ConversationRead):
+        if await read_receipts.mark_conversation_read(event.reader_id, event.other_id, event.read_up_to):
+            await invalidate_coach_views(event.reader_id)
+
+async def on_bitacora_created(event: BitacoraCreated):
+    """Queue the coach summary of a saved bitácora (unless batched nightly)"""
+    if not summaries_are_batched():
+        ai_jobs.submit(bitacora_ai_job(event.bitacora_id))
+
+async def on_checkin_created(event: CheckInCreated):
+    """Drop the coach's cached views of the client's check-ins"""
+    await invalidate_client_views(event.user_id)
+
+async def on_role_changed(event: RoleChanged):
+    """Reload the coach registry in every worker and drop the assigned coach's cached views"""
+    await coach_registry.invalidate()
+    coach_id = await coach_registry.assigned_coach_id(event.user_id)
+    if coach_id:
+        await invalidate_coach_views(coach_id)
+
+async def on_message_sent_push(event: MessageSent):
+    """Notify the receiver of a direct message (coalesced per recipient)"""
+    sender = await db.users.find_one({"user_id": event.sender_id}, {"_id": 0, "name": 1, "role": 1})
+    if not sender:
+        return
+    # The message itself stays out of the notification, as it may be private
+    title = "Tu coach te escribió" if sender.get("role") == "coach" else "Nuevo mensaje"
+    push_dispatcher.notify(event.receiver_id, PushNotification(
+        "message",
+        title,
+        f"{sender['name']} te envió un mensaje",
+        {"sender_id": event.sender_id}
+    ))
+
+# One worker, so a read mark is never applied before the message it covers
+event_bus.subscribe("read_receipts", on_direct_message_event, MessageSent, ConversationRead)
+event_bus.subscribe("bitacora_summaries", on_bitacora_created, BitacoraCreated)
+event_bus.subscribe("push_notifications", on_message_sent_push, MessageSent)
+event_bus.subscribe("checkin_views", on_checkin_created, CheckInCreated)
+event_bus.subscribe("coach_registry", on_role_changed, RoleChanged)
+
+# ==================== HEALTH & METRICS ROUTES ====================
+
+async def ping_mongo() -> dict:
+    """Ping Mongo within the readiness budget and report the latency"""
+    # Readiness fails when Mongo does not answer a ping within this budget
+    timeout_ms = int(os.environ.get('READINESS_MONGO_TIMEOUT_MS', '500'))
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(db.command("ping"), timeout=timeout_ms / 1000)
+        return {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+    except Exception as e:
+        return {"ok": False, "error": type(e).__name__, "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+@ops_router.get("/healthz")
+async def healthz():
+    """Liveness probe: the worker is up and serving requests"""
+    return {"status": "ok"}
+
+@ops_router.get("/readyz")
+async def readyz(response: Response):
+    """Readiness probe: Mongo answers in time; an open Claude circuit only degrades"""
+    mongo = await ping_mongo()
+    claude = claude_client.circuit.snapshot()
+    
+    if not mongo["ok"]:
+        status = "unavailable"
+        response.status_code = 503
+    elif claude["state"] != "closed":
+        status = "degraded"
+    else:
+        status = "ok"
+    
+    return {"status": status, "mongo": mongo, "claude": claude}
+
+def require_ops_admin(request: Request) -> None:
+    """Require the OPS_ADMIN_TOKEN bearer token; the routes do not exist without it"""
+    expected = os.environ.get('OPS_ADMIN_TOKEN', '')
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+    token = extract_token_from_header(request.headers.get("Authorization")) or ""
+    if not secrets.compare_digest(token.encode(), expected.encode()):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+@ops_router.get("/metrics")
+async def metrics(request: Request):
+    """Connection pool and dependency metrics for sizing workers (admin only)"""
+    require_ops_admin(request)
+    return {
+        "mongo_pool": mongo_pool_metrics.snapshot(),
+        "claude_circuit": claude_client.circuit.snapshot(),
+        "claude_requests": claude_client.limiter.snapshot(),
+        "claude_route_table": {name: route.as_dict() for name, route in claude_client.routes.items()},
+        "claude_routes": claude_client.route_metrics.snapshot(),
+        "events": event_bus.snapshot(),
+        "push": push_dispatcher.snapshot(),
+        "dashboard_cache": dashboard_cache.snapshot(),
+        "retention": compactor.snapshot(),
+        "read_routing": read_router.snapshot(),
+        "event_loop": loop_monitor.snapshot(),
+        "admission": admission.snapshot(),
+    }
+
+# ==================== PROFILING (admin only) ====================
+
+MAX_PROFILE_SECONDS = 60
+
+# One profile per worker at a time
+profile_lock = asyncio.Lock()
+
+@ops_router.get("/debug/profile", response_class=PlainTextResponse)
+async def profile_worker(request: Request, seconds: float = 10, interval_ms: float = 5, all_threads: bool = False):
+    """Sample this worker's stacks for a while and return them as folded stacks"""
+    require_ops_admin(request)
+    if not 0 < seconds <= MAX_PROFILE_SECONDS or not 1 <= interval_ms <= 1000:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {MAX_PROFILE_SECONDS}], interval_ms in [1, 1000]")
+    if profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running on this worker")
+    
+    async with profile_lock:
+        # Sampled from a thread so the loop keeps serving the traffic being profiled
+        thread_ids = None if all_threads else [loop_monitor.loop_thread_id]
+        counts = await asyncio.to_thread(sample_stacks, seconds, interval_ms / 1000, thread_ids)
+    return PlainTextResponse(folded(counts), headers={"X-Worker-Pid": str(os.getpid())})
+
+@ops_router.get("/debug/loop")
+async def event_loop_stalls(request: Request):
+    """Event-loop lag percentiles and the stacks of recent stalls on this worker"""
+    require_ops_admin(request)
+    return {"pid": os.getpid(), **loop_monitor.snapshot(), "recent_stalls": loop_monitor.recent_stalls()}
+
+# ==================== APP FACTORY ====================
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+async def warn_pending_migrations():
+    """Log schema migrations the database is missing (they are applied by db/migrate.py, not here)"""
+    try:
+        pending = await MigrationRunner(db).pending()
+    except Exception as e:
+        logger.warning(f"Could not check schema migrations: {e}")
+        return
+    if pending:
+        versions = ", ".join(f"{m.version:03d} {m.name}" for m in pending)
+        logger.warning(f"{len(pending)} schema migration(s) pending ({versions}) - run python -m db.migrate")
+
+async def purge_expired_state(interval: float = 60):
+    """Delete expired state keys every ``interval`` seconds (keys never rewritten are not dropped otherwise)"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            removed = await state_backend.purge_expired()
+            if removed:
+                logger.debug(f"Purged {removed} expired state key(s)")
+        except Exception as e:
+            logger.error(f"State expiry sweep failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the Mongo and Claude clients when the worker starts serving"""
+    global client, db, claude_client, state_backend, read_receipts, coach_registry, chat_store, coach_search
+    global push_dispatcher, dashboard_cache, chat_archive, compactor, read_router
+    
+    # MongoDB connection (pool sizes and timeouts come from MONGO_* env vars)
+    client = create_mongo_client(os.environ['MONGO_URL'], mongo_pool_metrics)
+    db = client[os.environ.get('DB_NAME', 'mama_respira')]
+    await warn_pending_migrations()
+    
+    # Analytics and search reads may go to secondaries (MONGO_SECONDARY_READS)
+    read_router = create_read_router(db)
+    
+    # Claude client (the Anthropic SDK itself is imported on first use)
+    claude_client = ClaudeClient(os.environ.get('ANTHROPIC_API_KEY', ''))
+    
+    # Caches and counters live in the configured state backend (STATE_BACKEND)
+    # so they stay consistent when running several workers
+    state_backend = create_state_backend()
+    
+    # Read high-water marks and cached unread counters for direct messages
+    read_receipts = ReadReceipts(db, state_backend)
+    
+    # Coaches kept in memory; clients routed to their assigned coach
+    coach_registry = CoachRegistry(db, state_backend)
+    
+    # AI chat history layout (CHAT_STORAGE=documents|buckets), old turns archived
+    chat_store = create_chat_store(db)
+    chat_archive = ChatArchive(db)
+    
+    # Serialized coach views, invalidated through versions in the state backend
+    dashboard_cache = DashboardCache(state_backend, int(os.environ.get('DASHBOARD_CACHE_ENTRIES', '2000')))
+    
+    # Coach search over client notes, brain dumps and messages
+    coach_search = CoachSearch(read_router.db_for(SEARCH))
+    
+    # Push notifications coalesced per recipient and sent in batches to Expo
+    push_dispatcher = PushDispatcher(db, window_seconds=float(os.environ.get('PUSH_WINDOW_SECONDS', '3')))
+    push_task = asyncio.create_task(push_dispatcher.run())
+    
+    # Presence aggregates are recomputed in the background, not per poll
+    presence_task = asyncio.create_task(presence.run(state_backend))
+    
+    # Expired presence buckets, cooldowns and counters removed from the state backend
+    expiry_task = asyncio.create_task(
+        purge_expired_state(float(os.environ.get('STATE_PURGE_INTERVAL_SECONDS', '60')))
+    )
+    
+    # Old chat turns (and optionally check-ins and messages) moved out of the hot collections
+    compactor = Compactor(
+        db,
+        RetentionPolicy.from_env(),
+        max_rate=float(os.environ.get('RETENTION_MAX_RATE', '500')),
+        interval=float(os.environ.get('RETENTION_INTERVAL_HOURS', '24')) * 3600
+    )
+    retention_task = asyncio.create_task(compactor.run(state_backend))
+    
+    # Event-loop lag and stall detection for this worker
+    loop_monitor.start()
+    
+    # Event consumers, then background AI generation resuming unfinished work
+    event_bus.start()
+    ai_jobs.start()
+    requeue_task = asyncio.create_task(requeue_pending_ai_jobs())
+    
+    # Bitácora summaries submitted as one Message Batch per night
+    summary_task = asyncio.create_task(run_summary_batches()) if summaries_are_batched() else None
+    
+    try:
+        yield
+    finally:
+        # Let chat turns still being written reach Mongo before closing it
+        if pending_chat_writes:
+            await asyncio.gather(*pending_chat_writes.values(), return_exceptions=True)
+        presence_task.cancel()
+        expiry_task.cancel()
+        retention_task.cancel()
+        requeue_task.cancel()
+        if summary_task:
+            summary_task.cancel()
+        await event_bus.stop()
+        await loop_monitor.stop()
+        push_task.cancel()
+        await push_dispatcher.close()
+        await ai_jobs.stop()
+        await state_backend.close()
+        client.close()
+
+def create_app() -> FastAPI:
+    """
+    Build the FastAPI application
+    
+    Only configuration and routing happen here; network clients are created
+    by the lifespan hook once the worker starts, which keeps imports cheap.
+    """
+    global ai_jobs, admission, loop_monitor
+    load_dotenv(ROOT_DIR / '.env')
+    
+    # Settings read from the environment must be built after load_dotenv
+    ai_jobs = AIJobQueue(workers=int(os.environ.get('AI_BACKGROUND_WORKERS', '2')))
+    admission = AdaptiveLimit(
+        initial=float(os.environ.get('ADMISSION_INITIAL_LIMIT', '64')),
+        min_limit=float(os.environ.get('ADMISSION_MIN_LIMIT', '8')),
+        max_limit=float(os.environ.get('ADMISSION_MAX_LIMIT', '1000')),
+        target_latency=float(os.environ.get('ADMISSION_TARGET_LATENCY_MS', '300')) / 1000
+    )
+    loop_monitor = LoopLagMonitor(
+        interval=float(os.environ.get('LOOP_LAG_INTERVAL_MS', '100')) / 1000,
+        stall_threshold=float(os.environ.get('LOOP_STALL_THRESHOLD_MS', '250')) / 1000
+    )
+    
+    logging.basicConfig(
+        level=os.environ.get('LOG_LEVEL', 'INFO'),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    
+    app = FastAPI(title="MAMÁ RESPIRA API", lifespan=lifespan)
+    
+    # Include the routers
+    app.include_router(api_router)
+    app.include_router(ops_router)
+    
+    # Inside CORS, so shed responses still carry the CORS headers
+    app.add_middleware(
+        AdmissionMiddleware,
+        limiter=admission,
+        enabled=os.environ.get('ADMISSION_CONTROL', 'on').lower() not in ('0', 'off', 'false', 'no')
+    )
+    
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+        # Web clients need to read the ETag to send If-None-Match
+        expose_headers=["ETag", "Retry-After"],
+    )
+    return app
+
+app = create_app()
@@ -0,0 +1 @@
+# Shared state module for caches, counters and pub/sub
\ No newline at end of file
@@ -0,0 +1,91 @@
+"""Interface shared by all state backends"""
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, Optional
+
+
+class StateBackend(ABC):
+    """
+    Small Redis-like key/value store used for caches, counters and pub/sub
+
+    Values are strings (counters are stored as their decimal representation),
+    hashes map string fields to string values, and every key may carry a TTL
+    in seconds. Implementations decide whether the state is private to the
+    worker process or shared between all workers on the node. Every method
+    but ``close`` is abstract, so a backend missing one cannot be built.
+    """
+
+    #: Whether every worker process sees the same state
+    shared = False
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        """Get a string value, or None if missing or expired"""
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        """Set a string value, optionally expiring after ttl seconds"""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Delete a key (string or hash)"""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Whether a key (string or hash) is present and not expired"""
+
+    @abstractmethod
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """
+        Atomically add to an integer value and return the result
+
+        The TTL is only applied when the increment creates the key, so a
+        fixed window counter expires at the end of its window.
+        """
+
+    @abstractmethod
+    async def expire(self, key: str, ttl: float) -> None:
+        """Set or refresh the TTL of an existing key"""
+
+    @abstractmethod
+    async def hget(self, key: str, field: str) -> Optional[str]:
+        """Get one field of a hash"""
+
+    @abstractmethod
+    async def hset(self, key: str, field: str, value: str) -> None:
+        """Set one field of a hash"""
+
+    @abstractmethod
+    async def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        """Atomically add to an integer hash field and return the result"""
+
+    @abstractmethod
+    async def hgetall(self, key: str) -> Dict[str, str]:
+        """Get every field of a hash (empty dict when missing)"""
+
+    @abstractmethod
+    async def hdel(self, key: str, field: str) -> None:
+        """Delete one field of a hash"""
+
+    @abstractmethod
+    async def publish(self, channel: str, message: str) -> None:
+        """Send a message to every current subscriber of a channel"""
+
+    @abstractmethod
+    def subscribe(self, channel: str) -> AsyncIterator[str]:
+        """Iterate over messages published to a channel from now on"""
+
+    @abstractmethod
+    async def purge_expired(self) -> int:
+        """
+        Delete every key whose TTL has passed
+
+        Expired keys are otherwise only dropped when touched again, so keys
+        never rewritten (per-minute buckets, cooldowns) would pile up. Call
+        it periodically; backends with native expiry return 0.
+
+        Returns:
+            Number of keys removed
+        """
+
+    async def close(self) -> None:
+        """Release connections and files held by the backend"""
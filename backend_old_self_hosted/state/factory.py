@@ -0,0 +1,41 @@
+"""Select the state backend from the environment"""
+import logging
+import os
+
+from state.base import StateBackend
+
+logger = logging.getLogger(__name__)
+
+STATE_BACKENDS = ("memory", "shm", "redis")
+
+
+def create_state_backend() -> StateBackend:
+    """
+    Build the backend named by STATE_BACKEND
+
+    - ``memory``: per-process dicts (default; single worker only)
+    - ``shm``: SQLite file on /dev/shm shared by all workers on the node
+      (path from STATE_SHM_PATH)
+    - ``redis``: local Redis-compatible server at STATE_REDIS_URL
+
+    Returns:
+        Configured StateBackend
+    """
+    name = os.environ.get('STATE_BACKEND', 'memory').lower()
+    if name == "memory":
+        from state.memory import MemoryStateBackend
+        backend = MemoryStateBackend()
+        workers = int(os.environ.get('WEB_CONCURRENCY', '1'))
+        if workers > 1:
+            logger.warning(
+                "STATE_BACKEND=memory with %d workers: caches and counters are per process; "
+                "use STATE_BACKEND=shm or redis", workers
+            )
+        return backend
+    if name == "shm":
+        from state.shared_memory import SharedMemoryStateBackend
+        return SharedMemoryStateBackend(os.environ.get('STATE_SHM_PATH') or None)
+    if name == "redis":
+        from state.redis_backend import RedisStateBackend
+        return RedisStateBackend(os.environ.get('STATE_REDIS_URL', 'redis://localhost:6379/0'))
+    raise ValueError(f"Unknown STATE_BACKEND '{name}' (expected one of {', '.join(STATE_BACKENDS)})")
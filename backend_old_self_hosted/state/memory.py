@@ -0,0 +1,112 @@
+"""Process-local in-memory state backend"""
+import asyncio
+import time
+from typing import AsyncIterator, Dict, Optional, Set
+
+from state.base import StateBackend
+
+
+class MemoryStateBackend(StateBackend):
+    """
+    State kept in plain dicts inside the worker process
+
+    The fastest option and the right one for a single worker (local
+    development, tests). With several workers every process has its own copy,
+    so counters and caches diverge between them.
+    """
+
+    shared = False
+
+    def __init__(self):
+        self._values: Dict[str, str] = {}
+        self._hashes: Dict[str, Dict[str, str]] = {}
+        self._expires: Dict[str, float] = {}
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def _purge_if_expired(self, key: str) -> None:
+        """Drop a key whose TTL has passed"""
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._values.pop(key, None)
+            self._hashes.pop(key, None)
+            self._expires.pop(key, None)
+
+    async def purge_expired(self) -> int:
+        now = time.monotonic()
+        expired = [key for key, expires_at in self._expires.items() if expires_at <= now]
+        for key in expired:
+            self._purge_if_expired(key)
+        return len(expired)
+
+    async def get(self, key: str) -> Optional[str]:
+        self._purge_if_expired(key)
+        return self._values.get(key)
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        self._values[key] = value
+        if ttl is None:
+            self._expires.pop(key, None)
+        else:
+            self._expires[key] = time.monotonic() + ttl
+
+    async def delete(self, key: str) -> None:
+        self._values.pop(key, None)
+        self._hashes.pop(key, None)
+        self._expires.pop(key, None)
+
+    async def exists(self, key: str) -> bool:
+        self._purge_if_expired(key)
+        return key in self._values or key in self._hashes
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        self._purge_if_expired(key)
+        created = key not in self._values
+        value = int(self._values.get(key, "0")) + amount
+        self._values[key] = str(value)
+        if created and ttl is not None:
+            self._expires[key] = time.monotonic() + ttl
+        return value
+
+    async def expire(self, key: str, ttl: float) -> None:
+        if await self.exists(key):
+            self._expires[key] = time.monotonic() + ttl
+
+    async def hget(self, key: str, field: str) -> Optional[str]:
+        self._purge_if_expired(key)
+        return self._hashes.get(key, {}).get(field)
+
+    async def hset(self, key: str, field: str, value: str) -> None:
+        self._purge_if_expired(key)
+        self._hashes.setdefault(key, {})[field] = value
+
+    async def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        self._purge_if_expired(key)
+        fields = self._hashes.setdefault(key, {})
+        value = int(fields.get(field, "0")) + amount
+        fields[field] = str(value)
+        return value
+
+    async def hgetall(self, key: str) -> Dict[str, str]:
+        self._purge_if_expired(key)
+        return dict(self._hashes.get(key, {}))
+
+    async def hdel(self, key: str, field: str) -> None:
+        self._purge_if_expired(key)
+        fields = self._hashes.get(key)
+        if fields is not None:
+            fields.pop(field, None)
+            if not fields:
+                await self.delete(key)
+
+    async def publish(self, channel: str, message: str) -> None:
+        for queue in self._subscribers.get(channel, ()):
+            queue.put_nowait(message)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[str]:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(channel, set()).add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers[channel].discard(queue)
@@ -0,0 +1,88 @@
+"""State backend for a local Redis (or Redis-compatible server such as Valkey)"""
+from typing import AsyncIterator, Dict, Optional
+
+from state.base import StateBackend
+
+
+class RedisStateBackend(StateBackend):
+    """
+    State stored in a Redis-compatible server, shared by every worker
+
+    Needs the optional ``redis`` package (``pip install redis``). Every
+    operation maps to the native Redis command, so counters and hashes are
+    atomic across processes and hosts.
+    """
+
+    shared = True
+
+    def __init__(self, url: str):
+        """
+        Args:
+            url: Redis connection URL, e.g. redis://localhost:6379/0
+        """
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("STATE_BACKEND=redis requires the 'redis' package (pip install redis)") from e
+        self.url = url
+        self._redis = redis_asyncio.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._redis.get(key)
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        await self._redis.set(key, value, px=int(ttl * 1000) if ttl is not None else None)
+
+    async def delete(self, key: str) -> None:
+        await self._redis.delete(key)
+
+    async def exists(self, key: str) -> bool:
+        return bool(await self._redis.exists(key))
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        if ttl is None:
+            return await self._redis.incrby(key, amount)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.incrby(key, amount)
+            pipe.pexpire(key, int(ttl * 1000), nx=True)
+            value, _ = await pipe.execute()
+        return value
+
+    async def expire(self, key: str, ttl: float) -> None:
+        await self._redis.pexpire(key, int(ttl * 1000))
+
+    async def hget(self, key: str, field: str) -> Optional[str]:
+        return await self._redis.hget(key, field)
+
+    async def hset(self, key: str, field: str, value: str) -> None:
+        await self._redis.hset(key, field, value)
+
+    async def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        return await self._redis.hincrby(key, field, amount)
+
+    async def hgetall(self, key: str) -> Dict[str, str]:
+        return await self._redis.hgetall(key)
+
+    async def hdel(self, key: str, field: str) -> None:
+        await self._redis.hdel(key, field)
+
+    async def publish(self, channel: str, message: str) -> None:
+        await self._redis.publish(channel, message)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[str]:
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(channel)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    yield message["data"]
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.close()
+
+    async def purge_expired(self) -> int:
+        # Redis expires keys itself
+        return 0
+
+    async def close(self) -> None:
+        await self._redis.close()
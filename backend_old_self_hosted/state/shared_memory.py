@@ -0,0 +1,269 @@
+"""Node-local state shared by all workers through SQLite on a tmpfs"""
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import AsyncIterator, Dict, Optional
+
+from state.base import StateBackend
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS hashes (
+    key TEXT NOT NULL, field TEXT NOT NULL, value TEXT NOT NULL,
+    PRIMARY KEY (key, field)
+);
+CREATE TABLE IF NOT EXISTS expiries (key TEXT PRIMARY KEY, expires_at REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL, payload TEXT NOT NULL, created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_channel_id ON messages (channel, id);
+"""
+
+# Published messages are kept this long for subscribers polling the table
+MESSAGE_RETENTION_SECONDS = 60.0
+
+
+def default_state_path() -> str:
+    """Path of the state file: /dev/shm when available, else the temp dir"""
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, "mama-respira-state.sqlite3")
+
+
+class SharedMemoryStateBackend(StateBackend):
+    """
+    State in a SQLite database stored on a RAM-backed filesystem
+
+    Every worker on the node opens the same file, so counters and caches are
+    consistent between processes without running an extra server. Writes
+    take SQLite's file lock (``BEGIN IMMEDIATE``), which makes read-modify-
+    write operations such as ``incr`` atomic across processes. Calls run in a
+    worker thread so lock waits never block the event loop. Wall-clock time
+    is used for TTLs because monotonic clocks are not comparable between
+    processes.
+    """
+
+    shared = True
+
+    def __init__(self, path: Optional[str] = None, poll_interval: float = 0.2):
+        """
+        Args:
+            path: SQLite file path (defaults to default_state_path())
+            poll_interval: Seconds between polls for pub/sub subscribers
+        """
+        self.path = path or default_state_path()
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.executescript(SCHEMA)
+
+    async def _run(self, fn, *args):
+        """Run a blocking database function in a thread"""
+        return await asyncio.to_thread(self._locked, fn, *args)
+
+    def _locked(self, fn, *args):
+        with self._lock:
+            return fn(*args)
+
+    def _write(self, fn, *args):
+        """Run fn inside a write transaction"""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(*args)
+            self._conn.execute("COMMIT")
+            return result
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _alive(self, key: str) -> bool:
+        """Purge the key if expired; must run inside a write transaction"""
+        row = self._conn.execute("SELECT expires_at FROM expiries WHERE key = ?", (key,)).fetchone()
+        if row and row[0] <= time.time():
+            self._delete(key)
+            return False
+        return True
+
+    def _expired(self, key: str) -> bool:
+        """Read-only expiry check"""
+        row = self._conn.execute("SELECT expires_at FROM expiries WHERE key = ?", (key,)).fetchone()
+        return bool(row) and row[0] <= time.time()
+
+    def _delete(self, key: str) -> None:
+        self._conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+        self._conn.execute("DELETE FROM hashes WHERE key = ?", (key,))
+        self._conn.execute("DELETE FROM expiries WHERE key = ?", (key,))
+
+    def _purge_expired(self) -> int:
+        """Delete the rows of every expired key from all tables"""
+        now = time.time()
+        removed = self._conn.execute("SELECT COUNT(*) FROM expiries WHERE expires_at <= ?", (now,)).fetchone()[0]
+        if removed:
+            expired = "SELECT key FROM expiries WHERE expires_at <= ?"
+            self._conn.execute(f"DELETE FROM kv WHERE key IN ({expired})", (now,))
+            self._conn.execute(f"DELETE FROM hashes WHERE key IN ({expired})", (now,))
+            self._conn.execute("DELETE FROM expiries WHERE expires_at <= ?", (now,))
+        self._conn.execute("DELETE FROM messages WHERE created_at < ?", (now - MESSAGE_RETENTION_SECONDS,))
+        return removed
+
+    def _set_expiry(self, key: str, ttl: float) -> None:
+        self._conn.execute(
+            "INSERT INTO expiries (key, expires_at) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET expires_at = excluded.expires_at",
+            (key, time.time() + ttl)
+        )
+
+    # ---- strings ----
+
+    def _get(self, key: str) -> Optional[str]:
+        if self._expired(key):
+            return None
+        row = self._conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value: str, ttl: Optional[float]) -> None:
+        self._conn.execute(
+            "INSERT INTO kv (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value)
+        )
+        if ttl is None:
+            self._conn.execute("DELETE FROM expiries WHERE key = ?", (key,))
+        else:
+            self._set_expiry(key, ttl)
+
+    def _incr(self, key: str, amount: int, ttl: Optional[float]) -> int:
+        self._alive(key)
+        row = self._conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        value = (int(row[0]) if row else 0) + amount
+        self._conn.execute(
+            "INSERT INTO kv (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, str(value))
+        )
+        if row is None and ttl is not None:
+            self._set_expiry(key, ttl)
+        return value
+
+    def _exists(self, key: str) -> bool:
+        if self._expired(key):
+            return False
+        return bool(
+            self._conn.execute("SELECT 1 FROM kv WHERE key = ?", (key,)).fetchone()
+            or self._conn.execute("SELECT 1 FROM hashes WHERE key = ? LIMIT 1", (key,)).fetchone()
+        )
+
+    def _expire(self, key: str, ttl: float) -> None:
+        if self._alive(key) and self._exists(key):
+            self._set_expiry(key, ttl)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._run(self._get, key)
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        await self._run(self._write, self._set, key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        await self._run(self._write, self._delete, key)
+
+    async def exists(self, key: str) -> bool:
+        return await self._run(self._exists, key)
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        return await self._run(self._write, self._incr, key, amount, ttl)
+
+    async def expire(self, key: str, ttl: float) -> None:
+        await self._run(self._write, self._expire, key, ttl)
+
+    async def purge_expired(self) -> int:
+        return await self._run(self._write, self._purge_expired)
+
+    # ---- hashes ----
+
+    def _hget(self, key: str, field: str) -> Optional[str]:
+        if self._expired(key):
+            return None
+        row = self._conn.execute(
+            "SELECT value FROM hashes WHERE key = ? AND field = ?", (key, field)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _hset(self, key: str, field: str, value: str) -> None:
+        self._alive(key)
+        self._conn.execute(
+            "INSERT INTO hashes (key, field, value) VALUES (?, ?, ?) "
+            "ON CONFLICT(key, field) DO UPDATE SET value = excluded.value",
+            (key, field, value)
+        )
+
+    def _hincrby(self, key: str, field: str, amount: int) -> int:
+        self._alive(key)
+        row = self._conn.execute(
+            "SELECT value FROM hashes WHERE key = ? AND field = ?", (key, field)
+        ).fetchone()
+        value = (int(row[0]) if row else 0) + amount
+        self._hset(key, field, str(value))
+        return value
+
+    def _hgetall(self, key: str) -> Dict[str, str]:
+        if self._expired(key):
+            return {}
+        rows = self._conn.execute("SELECT field, value FROM hashes WHERE key = ?", (key,)).fetchall()
+        return dict(rows)
+
+    def _hdel(self, key: str, field: str) -> None:
+        self._conn.execute("DELETE FROM hashes WHERE key = ? AND field = ?", (key, field))
+
+    async def hget(self, key: str, field: str) -> Optional[str]:
+        return await self._run(self._hget, key, field)
+
+    async def hset(self, key: str, field: str, value: str) -> None:
+        await self._run(self._write, self._hset, key, field, value)
+
+    async def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        return await self._run(self._write, self._hincrby, key, field, amount)
+
+    async def hgetall(self, key: str) -> Dict[str, str]:
+        return await self._run(self._hgetall, key)
+
+    async def hdel(self, key: str, field: str) -> None:
+        await self._run(self._write, self._hdel, key, field)
+
+    # ---- pub/sub ----
+
+    def _publish(self, channel: str, message: str) -> None:
+        now = time.time()
+        self._conn.execute(
+            "INSERT INTO messages (channel, payload, created_at) VALUES (?, ?, ?)",
+            (channel, message, now)
+        )
+        self._conn.execute("DELETE FROM messages WHERE created_at < ?", (now - MESSAGE_RETENTION_SECONDS,))
+
+    def _last_message_id(self) -> int:
+        row = self._conn.execute("SELECT MAX(id) FROM messages").fetchone()
+        return row[0] or 0
+
+    def _messages_after(self, channel: str, last_id: int) -> list:
+        return self._conn.execute(
+            "SELECT id, payload FROM messages WHERE channel = ? AND id > ? ORDER BY id",
+            (channel, last_id)
+        ).fetchall()
+
+    async def publish(self, channel: str, message: str) -> None:
+        await self._run(self._write, self._publish, channel, message)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[str]:
+        last_id = await self._run(self._last_message_id)
+        while True:
+            rows = await self._run(self._messages_after, channel, last_id)
+            for message_id, payload in rows:
+                last_id = message_id
+                yield payload
+            if not rows:
+                await asyncio.sleep(self.poll_interval)
+
+    async def close(self) -> None:
+        await self._run(self._conn.close)
@@ -0,0 +1,124 @@
+"""Tests for the bitácora dedupe/renumber plan of migration 002"""
+import asyncio
+from datetime import datetime
+
+from db.counters import set_counter_floor
+from db.migrations.v002_bitacora_day_numbers import plan_user_fixes
+
+
+def entry(_id, date, day_number, updated_at=None, created_at=None):
+    doc = {"_id": _id, "date": date, "day_number": day_number}
+    if updated_at:
+        doc["updated_at"] = updated_at
+    if created_at:
+        doc["created_at"] = created_at
+    return doc
+
+
+def sets(operations):
+    """_id -> $set of every update operation"""
+    return {op._filter["_id"]: op._doc["$set"] for op in operations}
+
+
+def test_keeps_the_most_recently_updated_duplicate():
+    removed, operations, day_count = plan_user_fixes([
+        entry(1, "2024-03-12", 1, updated_at=datetime(2024, 3, 13)),
+        entry(2, "2024-03-12", 2, updated_at=datetime(2024, 3, 12)),
+    ])
+    assert removed == [2]
+    assert operations == []
+    assert day_count == 1
+
+
+def test_newer_duplicate_replaces_the_one_seen_first():
+    removed, operations, day_count = plan_user_fixes([
+        entry(1, "2024-03-12", 1, updated_at=datetime(2024, 3, 12)),
+        entry(2, "2024-03-12", 2, updated_at=datetime(2024, 3, 14)),
+    ])
+    assert removed == [1]
+    assert sets(operations) == {2: {"day_number": 1}}
+    assert day_count == 1
+
+
+def test_created_at_is_used_without_updated_at():
+    removed, _, _ = plan_user_fixes([
+        entry(1, "2024-03-12", 1, created_at=datetime(2024, 3, 12, 8)),
+        entry(2, "2024-03-12", 1, created_at=datetime(2024, 3, 12, 9)),
+    ])
+    assert removed == [1]
+
+
+def test_entry_with_a_timestamp_wins_over_one_without():
+    removed, _, _ = plan_user_fixes([
+        entry(1, "2024-03-12", 1),
+        entry(2, "2024-03-12", 2, updated_at=datetime(2024, 3, 12)),
+    ])
+    assert removed == [1]
+
+
+def test_duplicates_without_any_timestamp_keep_the_first():
+    removed, _, day_count = plan_user_fixes([
+        entry(1, "2024-03-12", 1),
+        entry(2, "2024-03-12", 2),
+    ])
+    assert removed == [2]
+    assert day_count == 1
+
+
+def test_dates_written_differently_are_the_same_day():
+    removed, operations, day_count = plan_user_fixes([
+        entry(1, "12/03/2024", 1, updated_at=datetime(2024, 3, 13)),
+        entry(2, "2024-03-12", 2, updated_at=datetime(2024, 3, 12)),
+    ])
+    assert removed == [2]
+    assert sets(operations) == {1: {"date": "2024-03-12"}}
+    assert day_count == 1
+
+
+def test_renumbers_in_date_order():
+    removed, operations, day_count = plan_user_fixes([
+        entry(1, "2024-03-14", 1),
+        entry(2, "2024-03-10", 4),
+        entry(3, "12/03/2024", 5),
+    ])
+    assert removed == []
+    assert [op._filter["_id"] for op in operations] == [2, 3, 1]
+    assert sets(operations) == {
+        2: {"day_number": 1},
+        3: {"date": "2024-03-12", "day_number": 2},
+        1: {"day_number": 3},
+    }
+    assert day_count == 3
+
+
+def test_correct_entries_need_no_writes():
+    removed, operations, day_count = plan_user_fixes([
+        entry(1, "2024-03-10", 1),
+        entry(2, "2024-03-11", 2),
+    ])
+    assert (removed, operations, day_count) == ([], [], 2)
+
+
+def test_no_entries():
+    assert plan_user_fixes([]) == ([], [], 0)
+
+
+class FakeCounters:
+    """Records the update sent to db.counters"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def update_one(self, query, update, upsert=False):
+        self.calls.append((query, update, upsert))
+
+
+class FakeDb:
+    def __init__(self):
+        self.counters = FakeCounters()
+
+
+def test_counter_floor_never_moves_a_counter_backwards():
+    db = FakeDb()
+    asyncio.run(set_counter_floor(db, "user-1", "bitacora_day", 3))
+    assert db.counters.calls == [({"_id": "user-1"}, {"$max": {"bitacora_day": 3}}, True)]
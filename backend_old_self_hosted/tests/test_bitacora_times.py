@@ -0,0 +1,97 @@
+"""Tests for the clock time and date parsers behind migration 003"""
+import pytest
+
+from bitacora.times import clock_updates, format_clock, normalize_date, parse_clock
+
+
+@pytest.mark.parametrize("value, minutes", [
+    ("21:30", 21 * 60 + 30),
+    (" 07:05 ", 7 * 60 + 5),
+    ("7", 7 * 60),
+    ("21:30:00", 21 * 60 + 30),
+    ("21h30", 21 * 60 + 30),
+    ("21h", 21 * 60),
+    ("21.30", 21 * 60 + 30),
+    ("9pm", 21 * 60),
+    ("9 PM", 21 * 60),
+    ("9:30 pm", 21 * 60 + 30),
+    ("9 p.m.", 21 * 60),
+    ("7 a.m.", 7 * 60),
+    ("2024-03-12T21:45:00Z", 21 * 60 + 45),
+    # Noon and midnight
+    ("12pm", 12 * 60),
+    ("12:30 pm", 12 * 60 + 30),
+    ("12am", 0),
+    ("12:30 am", 30),
+    ("00:00", 0),
+    ("0:00", 0),
+    ("24:00", 0),
+    ("23:59", 1439),
+])
+def test_parse_clock_accepts(value, minutes):
+    assert parse_clock(value) == minutes
+
+
+@pytest.mark.parametrize("value", [
+    None,
+    "",
+    "abc",
+    "25:00",
+    "24:30",
+    "9:60",
+    "9:5",
+    "13pm",
+    "0am",
+])
+def test_parse_clock_rejects(value):
+    assert parse_clock(value) is None
+
+
+@pytest.mark.parametrize("minutes, text", [(0, "00:00"), (75, "01:15"), (1439, "23:59")])
+def test_format_clock(minutes, text):
+    assert format_clock(minutes) == text
+    assert parse_clock(text) == minutes
+
+
+@pytest.mark.parametrize("value, normalized", [
+    ("2024-03-12", "2024-03-12"),
+    ("2024-03-12T10:00:00", "2024-03-12"),
+    ("12/03/2024", "2024-03-12"),
+    ("12-03-2024", "2024-03-12"),
+    ("12/03/24", "2024-03-12"),
+    (" 2024-03-12 ", "2024-03-12"),
+])
+def test_normalize_date_accepts(value, normalized):
+    assert normalize_date(value) == normalized
+
+
+@pytest.mark.parametrize("value", [None, "", "hoy", "31/02/2024", "03/12", "2024-3-12"])
+def test_normalize_date_rejects(value):
+    assert normalize_date(value) is None
+
+
+def test_clock_updates_fills_missing_minutes():
+    updates = clock_updates({
+        "date": "12/03/2024",
+        "laid_down_for_bed": "9pm",
+        "fell_asleep_at": "21:40",
+        "fell_asleep_at_min": 1300,
+        "morning_wake_time": "ni idea",
+        "nap_1": {"laid_down_time": "12:30 pm"},
+        "night_wakings": [{"time": "12am"}, {"time": "3:15", "time_min": 195}],
+    })
+    assert updates == {
+        "date": "2024-03-12",
+        "laid_down_for_bed_min": 21 * 60,
+        "nap_1.laid_down_min": 12 * 60 + 30,
+        "night_wakings": [{"time": "12am", "time_min": 0}, {"time": "3:15", "time_min": 195}],
+    }
+
+
+def test_clock_updates_leaves_up_to_date_entries_alone():
+    assert clock_updates({
+        "date": "2024-03-12",
+        "laid_down_for_bed": "21:00",
+        "laid_down_for_bed_min": 1260,
+        "night_wakings": [{"time": "02:00", "time_min": 120}],
+    }) == {}
@@ -0,0 +1,30 @@
+"""Regression tests for the local crisis classifier"""
+import pytest
+
+from safety.crisis import CONCERN, URGENT, classify_crisis
+
+
+@pytest.mark.parametrize("text, level", [
+    ("No, no quiero vivir así", URGENT),
+    ("no... no quiero seguir viviendo", URGENT),
+    ("no sé, no quiero a mi bebé", CONCERN),
+    ("la verdad no, no siento nada por mi bebé", CONCERN),
+    ("Quiero morirme", URGENT),
+    ("nunca, jamás. Me quiero morir", URGENT),
+    ("tengo ganas de cortarme las venas", URGENT),
+])
+def test_flags_crisis_phrases(text, level):
+    signal = classify_crisis(text)
+    assert signal is not None
+    assert signal.level == level
+
+
+@pytest.mark.parametrize("text", [
+    "ganas de cortarme el pelo",
+    "no quiero morir, solo dormir",
+    "no me quiero morir",
+    "",
+    None,
+])
+def test_ignores_negated_or_harmless_text(text):
+    assert classify_crisis(text) is None